@@ -4,12 +4,26 @@ LangChain agents for vacation planning.
 """
 from .planner import (
     generate_itinerary,
+    agenerate_itinerary,
+    agenerate_itinerary_prefetch,
+    agenerate_itinerary_plan_execute,
     generate_itinerary_fallback,
-    create_planner_agent
+    create_planner_agent,
+    planner_pool
 )
+from .pool import AgentPool, PooledAgent, PoolExhaustedError
+from .orchestrator import plan_itinerary
 
 __all__ = [
     "generate_itinerary",
+    "agenerate_itinerary",
+    "agenerate_itinerary_prefetch",
+    "agenerate_itinerary_plan_execute",
     "generate_itinerary_fallback",
-    "create_planner_agent"
+    "create_planner_agent",
+    "planner_pool",
+    "AgentPool",
+    "PooledAgent",
+    "PoolExhaustedError",
+    "plan_itinerary"
 ]
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""
+Batch pembuatan itinerary (mis. group tour atau corporate offsite).
+Request dikelompokkan per destinasi dan rentang tanggal; setiap kelompok
+berjalan di dalam shared_lookups() sehingga search_hotels, search_activities,
+check_calendar dan get_destination_info dengan argumen sama cukup dihitung
+sekali. Plan dijalankan dengan konkurensi terbatas.
+"""
+import asyncio
+from collections import OrderedDict
+
+from app.agents.orchestrator import plan_itinerary
+from app.tools.memo import normalize_text, shared_lookups
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+_batch_items = metrics.counter("plan_batch_items_total", "Plans generated through the batch endpoint, by outcome")
+
+
+def group_requests(items: list[dict]) -> "OrderedDict[tuple, list[int]]":
+    """Kelompokkan index request berdasarkan (destinasi, start_date, end_date)."""
+    groups: OrderedDict[tuple, list[int]] = OrderedDict()
+    for index, params in enumerate(items):
+        key = (normalize_text(params["destination"]), params["start_date"], params["end_date"])
+        groups.setdefault(key, []).append(index)
+    return groups
+
+
+async def plan_batch(items: list[dict], concurrency: int = 4) -> list[dict]:
+    """
+    Jalankan plan_itinerary untuk setiap item (kwargs plan_itinerary).
+    Hasil dikembalikan sesuai urutan input; kegagalan satu item tidak
+    menggagalkan item lain.
+    """
+    groups = group_requests(items)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results: list[dict] = [None] * len(items)
+
+    async def run_one(index: int):
+        async with semaphore:
+            try:
+                results[index] = await plan_itinerary(**items[index])
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {e}")
+                results[index] = {"success": False, "error": str(e)}
+        _batch_items.inc(outcome="success" if results[index].get("itinerary") else "failed")
+
+    async def run_group(indexes: list[int]):
+        # Task anak mewarisi context ini, termasuk scope lookup kelompoknya
+        with shared_lookups() as scope:
+            await asyncio.gather(*(run_one(i) for i in indexes))
+        logger.debug(f"Batch group of {len(indexes)} plans shared {len(scope)} tool lookups")
+
+    logger.info(f"Planning batch of {len(items)} requests in {len(groups)} groups")
+    await asyncio.gather(*(run_group(indexes) for indexes in groups.values()))
+    return results
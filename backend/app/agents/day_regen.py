@@ -0,0 +1,96 @@
+"""
+Regenerasi satu hari dari itinerary yang sudah ada.
+Lodging, transport dan hari lain tidak disentuh; hanya aktivitas hari itu
+yang disusun ulang (LLM, lalu fallback rule-based) dalam sisa budget, dan
+daily_cost serta total_estimated_cost diperbarui secara inkremental.
+"""
+import copy
+from typing import Optional
+
+from app.agents.planner import agenerate_day_activities, generate_day_activities_fallback
+from app.utils.concurrency import run_sync
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+_regenerations = metrics.counter("plan_day_regenerations_total", "Single-day itinerary regenerations, by planner used")
+
+
+def _activities_cost(activities: list[dict]) -> int:
+    return sum(a.get("estimated_cost", 0) for a in activities)
+
+
+def find_day(itinerary: dict, date: str) -> Optional[dict]:
+    return next((day for day in itinerary.get("days", []) if day.get("date") == date), None)
+
+
+def day_activity_budget(itinerary: dict, date: str, budget_idr: int) -> int:
+    """Budget yang tersisa untuk aktivitas hari ini jika aktivitas lamanya dibuang."""
+    day = find_day(itinerary, date)
+    committed = itinerary.get("total_estimated_cost", 0) - _activities_cost(day.get("activities", []))
+    return max(0, budget_idr - committed)
+
+
+def apply_day_activities(itinerary: dict, date: str, activities: list[dict]) -> tuple[dict, int]:
+    """
+    Ganti aktivitas satu hari dan perbarui biaya hanya dengan selisihnya.
+    Mengembalikan (itinerary baru, selisih biaya); itinerary input tidak diubah.
+    """
+    updated = copy.deepcopy(itinerary)
+    day = find_day(updated, date)
+    delta = _activities_cost(activities) - _activities_cost(day.get("activities", []))
+
+    day["activities"] = activities
+    day["daily_cost"] = day.get("daily_cost", 0) + delta
+    updated["total_estimated_cost"] = updated.get("total_estimated_cost", 0) + delta
+    return updated, delta
+
+
+async def regenerate_day(
+    itinerary: dict,
+    date: str,
+    budget_idr: int,
+    travel_type: str = "culture",
+    travelers: int = 1,
+    preferences: str = ""
+) -> dict:
+    """
+    Susun ulang aktivitas hari `date`. Raise KeyError jika hari tersebut
+    tidak ada di itinerary.
+    """
+    day = find_day(itinerary, date)
+    if day is None:
+        raise KeyError(date)
+
+    other_days = [d for d in itinerary.get("days", []) if d is not day]
+    params = dict(
+        destination=itinerary.get("destination", ""),
+        date=date,
+        activity_budget=day_activity_budget(itinerary, date, budget_idr),
+        travel_type=travel_type,
+        travelers=travelers,
+        preferences=preferences,
+        current=day.get("activities", []),
+        exclude=[a.get("name") for d in other_days for a in d.get("activities", [])]
+    )
+
+    used_fallback = False
+    try:
+        result = await agenerate_day_activities(**params)
+    except Exception as e:
+        logger.warning(f"Day regeneration LLM failed (exception), using fallback: {e}")
+        result = {"success": False, "error": str(e)}
+
+    if not result.get("success"):
+        logger.warning(f"Day regeneration LLM returned no activities, using fallback: {result.get('error')}")
+        agent_metrics, llm_calls = result.get("metrics"), result.get("llm_calls")
+        result = await run_sync(generate_day_activities_fallback, **params)
+        used_fallback = True
+        if agent_metrics:
+            result["metrics"] = agent_metrics
+        if llm_calls is not None:
+            result["llm_calls"] = llm_calls
+
+    result["itinerary"], result["cost_delta"] = apply_day_activities(itinerary, date, result["activities"])
+    result["fallback"] = used_fallback
+    _regenerations.inc(planner="fallback" if used_fallback else "llm")
+    return result
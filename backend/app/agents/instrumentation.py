@@ -0,0 +1,181 @@
+"""
+Instrumentasi per langkah agent.
+PlanInstrumentation adalah callback handler LangChain yang mencatat latency
+dan token setiap panggilan LLM (termasuk token prompt yang dilayani dari
+context cache), latency setiap tool, jumlah iterasi ReAct dan retry karena
+parsing error. Ringkasannya dilampirkan ke hasil plan dan
+diagregasi ke histogram yang bisa di-scrape lewat /metrics.
+"""
+import time
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.agents.prompt_cache import prompt_cache
+from app.utils.metrics import metrics
+
+# Nama tool internal AgentExecutor saat output LLM gagal di-parse
+_PARSE_ERROR_TOOL = "_Exception"
+
+_TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+_ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+
+_llm_latency = metrics.histogram("plan_llm_call_seconds", "Latency of each LLM call made while planning")
+_llm_tokens = metrics.histogram("plan_llm_call_tokens", "Tokens per LLM call, by kind", buckets=_TOKEN_BUCKETS)
+_tool_latency = metrics.histogram("plan_tool_call_seconds", "Latency of each tool call, by tool")
+_iterations = metrics.histogram("plan_agent_iterations", "Agent iterations per plan", buckets=_ITERATION_BUCKETS)
+_plan_duration = metrics.histogram("plan_agent_duration_seconds", "Total planner duration per plan, by mode")
+_parse_errors = metrics.counter("plan_agent_parse_errors_total", "Agent outputs that failed to parse and were retried")
+_cached_tokens = metrics.counter("plan_llm_cached_prompt_tokens_total", "Prompt tokens served from the provider context cache")
+
+
+def _usage_from_result(response: Any) -> tuple[Optional[int], Optional[int], Optional[int]]:
+    """
+    Ambil (prompt_tokens, completion_tokens, cached_prompt_tokens) dari
+    LLMResult bila provider melaporkannya.
+    """
+    prompt_tokens = completion_tokens = cached_tokens = None
+
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens = (prompt_tokens or 0) + usage.get("input_tokens", 0)
+                completion_tokens = (completion_tokens or 0) + usage.get("output_tokens", 0)
+                cache_read = (usage.get("input_token_details") or {}).get("cache_read")
+                if cache_read is not None:
+                    cached_tokens = (cached_tokens or 0) + cache_read
+                continue
+            info = (generation.generation_info or {}).get("usage_metadata") or {}
+            if info:
+                prompt_tokens = (prompt_tokens or 0) + info.get("prompt_token_count", 0)
+                completion_tokens = (completion_tokens or 0) + info.get("candidates_token_count", 0)
+                if "cached_content_token_count" in info:
+                    cached_tokens = (cached_tokens or 0) + info["cached_content_token_count"]
+
+    if prompt_tokens is None:
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens")
+            completion_tokens = usage.get("completion_tokens")
+
+    return prompt_tokens, completion_tokens, cached_tokens
+
+
+class PlanInstrumentation(BaseCallbackHandler):
+    """Callback handler yang mengumpulkan metrics untuk satu plan."""
+
+    # Jalankan langsung di event loop, tanpa pindah ke thread executor
+    run_inline = True
+
+    def __init__(self, mode: str = "react"):
+        self.mode = mode
+        self.started_at = time.perf_counter()
+        self.llm_calls: list[dict] = []
+        self.tool_calls: list[dict] = []
+        self.iterations = 0
+        self.parse_errors = 0
+        # run_id -> (mulai, nama tool atau None untuk LLM)
+        self._pending: dict[UUID, tuple[float, Optional[str]]] = {}
+        # run_id -> token cache hasil simulasi (backend prompt cache "local")
+        self._simulated_cache: dict[UUID, Optional[int]] = {}
+
+    # === LLM ===
+    def on_llm_start(self, serialized: dict, prompts: list[str], *, run_id: UUID, **kwargs: Any):
+        self._pending[run_id] = (time.perf_counter(), None)
+        self._simulated_cache[run_id] = prompt_cache.simulated_cached_tokens(prompts[0] if prompts else "")
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, **kwargs: Any):
+        self._pending[run_id] = (time.perf_counter(), None)
+        first = messages[0][0].content if messages and messages[0] else ""
+        self._simulated_cache[run_id] = prompt_cache.simulated_cached_tokens(first if isinstance(first, str) else "")
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        started, _ = self._pending.pop(run_id, (None, None))
+        simulated = self._simulated_cache.pop(run_id, None)
+        prompt_tokens, completion_tokens, cached_tokens = _usage_from_result(response)
+        self.llm_calls.append({
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1) if started else None,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_prompt_tokens": simulated if simulated is not None else cached_tokens
+        })
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._simulated_cache.pop(run_id, None)
+        started, _ = self._pending.pop(run_id, (None, None))
+        self.llm_calls.append({
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1) if started else None,
+            "error": str(error)
+        })
+
+    # === Tools ===
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any):
+        name = (serialized or {}).get("name", "unknown")
+        if name == _PARSE_ERROR_TOOL:
+            self.parse_errors += 1
+            self.iterations += 1
+            return
+        self._pending[run_id] = (time.perf_counter(), name)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, error=None)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, error=str(error))
+
+    def _finish_tool(self, run_id: UUID, error: Optional[str]):
+        started, name = self._pending.pop(run_id, (None, None))
+        if started is None or name is None:
+            return
+        call = {"tool": name, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+        if error:
+            call["error"] = error
+        self.tool_calls.append(call)
+
+    # === Agent ===
+    def on_agent_action(self, action: Any, **kwargs: Any):
+        if getattr(action, "tool", None) != _PARSE_ERROR_TOOL:
+            self.iterations += 1
+
+    def on_agent_finish(self, finish: Any, **kwargs: Any):
+        self.iterations += 1
+
+    def summary(self) -> dict:
+        """Ringkasan metrics plan ini (dilampirkan ke hasil plan)."""
+        prompt_tokens = sum(c.get("prompt_tokens") or 0 for c in self.llm_calls)
+        completion_tokens = sum(c.get("completion_tokens") or 0 for c in self.llm_calls)
+        cached_tokens = sum(c.get("cached_prompt_tokens") or 0 for c in self.llm_calls)
+        return {
+            "mode": self.mode,
+            "duration_ms": round((time.perf_counter() - self.started_at) * 1000, 1),
+            "iterations": self.iterations,
+            "parse_errors": self.parse_errors,
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "total_prompt_tokens": prompt_tokens,
+            "total_completion_tokens": completion_tokens,
+            "total_cached_prompt_tokens": cached_tokens
+        }
+
+    def observe(self) -> dict:
+        """Agregasikan ke histogram global dan kembalikan summary."""
+        summary = self.summary()
+        for call in self.llm_calls:
+            if call.get("latency_ms") is not None:
+                _llm_latency.observe(call["latency_ms"] / 1000)
+            if call.get("prompt_tokens") is not None:
+                _llm_tokens.observe(call["prompt_tokens"], kind="prompt")
+            if call.get("completion_tokens") is not None:
+                _llm_tokens.observe(call["completion_tokens"], kind="completion")
+        for call in self.tool_calls:
+            _tool_latency.observe(call["latency_ms"] / 1000, tool=call["tool"])
+        if self.iterations:
+            _iterations.observe(self.iterations)
+        if self.parse_errors:
+            _parse_errors.inc(self.parse_errors)
+        if summary["total_cached_prompt_tokens"]:
+            _cached_tokens.inc(summary["total_cached_prompt_tokens"])
+        _plan_duration.observe(summary["duration_ms"] / 1000, mode=self.mode)
+        return summary
@@ -0,0 +1,120 @@
+"""
+Cache hasil itinerary berdasarkan fingerprint request yang dinormalisasi.
+Request yang hampir identik (destinasi, tanggal, budget band, travel_type)
+tidak perlu menjalankan ulang loop ReAct penuh.
+"""
+import copy
+import hashlib
+import json
+import re
+from typing import Optional
+
+from app.config import settings
+from app.tools.calendar import get_busy_dates
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+
+itinerary_cache = TTLCache(
+    maxsize=settings.ITINERARY_CACHE_MAX_ENTRIES,
+    ttl=settings.ITINERARY_CACHE_TTL_SECONDS
+)
+
+_hits = metrics.counter("itinerary_cache_hits_total", "Itinerary cache hits")
+_misses = metrics.counter("itinerary_cache_misses_total", "Itinerary cache misses")
+_bypassed = metrics.counter("itinerary_cache_bypass_total", "Requests that explicitly bypassed the itinerary cache")
+
+# Kata pengisi yang tidak mengubah makna preferensi
+_PREFERENCE_FILLERS = {"prefer", "prefers", "preferably", "i", "want", "would", "like", "please", "ingin", "mau", "suka"}
+_PREFERENCE_SPLIT = re.compile(r"[,;/&\n]+|\band\b|\bdan\b")
+
+
+def canonicalize_preferences(preferences: Optional[str]) -> str:
+    """
+    Normalisasi teks preferensi: lowercase, buang kata pengisi, urutkan.
+    "Prefer homestay, local food" dan "local food and homestay" menghasilkan key yang sama.
+    """
+    if not preferences:
+        return ""
+
+    phrases = set()
+    for part in _PREFERENCE_SPLIT.split(preferences.casefold()):
+        words = [w for w in re.findall(r"[\w-]+", part) if w not in _PREFERENCE_FILLERS]
+        if words:
+            phrases.add(" ".join(words))
+    return "|".join(sorted(phrases))
+
+
+def budget_band(budget_idr: int) -> int:
+    """Bulatkan budget ke bawah sesuai ITINERARY_CACHE_BUDGET_BUCKET_IDR."""
+    bucket = settings.ITINERARY_CACHE_BUDGET_BUCKET_IDR
+    if bucket <= 1:
+        return budget_idr
+    return budget_idr // bucket * bucket
+
+
+def plan_fingerprint(
+    user_id: str,
+    destination: str,
+    start_date: str,
+    end_date: str,
+    budget_idr: int,
+    travel_type: str = "culture",
+    travelers: int = 1,
+    preferences: str = ""
+) -> str:
+    """
+    Fingerprint request untuk key cache.
+    user_id tidak ikut di-hash; yang dipakai adalah tanggal sibuk user dalam
+    range perjalanan, karena hanya itu yang mempengaruhi hasil planning.
+    """
+    if settings.ITINERARY_CACHE_CANONICAL_PREFERENCES:
+        prefs = canonicalize_preferences(preferences)
+    else:
+        prefs = (preferences or "").strip()
+
+    payload = json.dumps([
+        destination.strip().casefold(),
+        start_date,
+        end_date,
+        budget_band(budget_idr),
+        travel_type,
+        travelers,
+        get_busy_dates(user_id, start_date, end_date),
+        prefs
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cached_itinerary(fingerprint: str, budget_idr: int) -> Optional[dict]:
+    """
+    Ambil hasil dari cache. Entry dari budget band yang sama tetap ditolak
+    jika total biayanya melebihi budget request ini.
+    """
+    cached = itinerary_cache.get(fingerprint)
+    if cached is not None:
+        total = cached["itinerary"].get("total_estimated_cost", 0)
+        if not isinstance(total, (int, float)) or total <= budget_idr:
+            _hits.inc()
+            result = copy.deepcopy(cached)
+            result["cache_hit"] = True
+            # Metrics milik run asli, bukan request ini
+            result.pop("metrics", None)
+            if "llm_calls" in result:
+                result["llm_calls"] = 0
+            return result
+
+    _misses.inc()
+    return None
+
+
+def store_itinerary(fingerprint: str, result: dict, fallback: bool = False):
+    """Simpan hasil sukses. Hasil fallback disimpan lebih singkat agar LLM dicoba lagi."""
+    if not settings.ITINERARY_CACHE_ENABLED or not result.get("success") or not result.get("itinerary"):
+        return
+
+    ttl = settings.ITINERARY_CACHE_FALLBACK_TTL_SECONDS if fallback else None
+    itinerary_cache.set(fingerprint, copy.deepcopy(result), ttl=ttl)
+
+
+def record_bypass():
+    _bypassed.inc()
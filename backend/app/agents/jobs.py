@@ -0,0 +1,211 @@
+"""
+Antrian job pembuatan itinerary (mode async).
+POST /api/v1/plan dengan async_job=True hanya mencatat plan berstatus
+"queued"; worker pool di sini menjalankan planner dan memperbarui PlanDB
+(queued -> running -> draft/failed). Client melakukan polling lewat
+GET /api/v1/plan/{plan_id}. Plan hedged yang provisional juga di-upgrade
+lewat helper di sini (provisional -> draft).
+"""
+import asyncio
+import json
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from app.config import settings
+from app.database import PlanDB, SessionLocal
+from app.agents.orchestrator import plan_itinerary
+from app.utils.concurrency import run_sync
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+
+
+class QueueFullError(Exception):
+    """Antrian global penuh (backpressure)."""
+
+
+class UserQueueFullError(QueueFullError):
+    """User ini sudah punya terlalu banyak job di antrian."""
+
+
+@dataclass
+class PlanJob:
+    plan_id: str
+    user_id: str
+    params: dict = field(default_factory=dict)
+    # Di-set setelah row plan (status queued) tersimpan; worker menunggu ini dulu
+    ready: Optional[asyncio.Event] = None
+
+
+class PlanJobQueue:
+    """
+    Antrian job dengan worker asyncio dan penjadwalan round-robin per user,
+    sehingga satu user yang mengirim banyak plan tidak menahan user lain.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_depth: int = 100,
+        max_per_user: int = 5,
+        session_factory: Callable = SessionLocal
+    ):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.max_per_user = max_per_user
+        self.session_factory = session_factory
+        self._queues: OrderedDict[str, deque] = OrderedDict()
+        self._depth = 0
+        self._running = 0
+        self._available: Optional[asyncio.Semaphore] = None
+        self._tasks: list[asyncio.Task] = []
+
+        self._enqueued = metrics.counter("plan_jobs_enqueued_total", "Plan jobs accepted into the queue")
+        self._rejected = metrics.counter("plan_jobs_rejected_total", "Plan jobs rejected by backpressure")
+        self._finished = metrics.counter("plan_jobs_finished_total", "Plan jobs finished, by status")
+        metrics.gauge("plan_job_queue_depth", "Plan jobs waiting in the queue", callback=lambda: self.depth)
+        metrics.gauge("plan_jobs_running", "Plan jobs currently running", callback=lambda: self.running)
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    async def start(self):
+        """Jalankan worker (dipanggil dari lifespan startup)."""
+        if self._tasks:
+            return
+        self._available = asyncio.Semaphore(self._depth)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"plan-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Plan job queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Hentikan worker. Job yang belum jalan tetap berstatus queued di database."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._depth:
+            logger.warning(f"Plan job queue stopped with {self._depth} jobs still queued")
+
+    def submit(self, job: PlanJob) -> int:
+        """
+        Masukkan job ke antrian. Mengembalikan posisi job di antrian.
+        Raise QueueFullError / UserQueueFullError jika melewati batas.
+        """
+        if self._depth >= self.max_depth:
+            self._rejected.inc(reason="queue_full")
+            raise QueueFullError(f"Plan queue is full ({self.max_depth} jobs)")
+
+        user_queue = self._queues.get(job.user_id)
+        if len(user_queue or ()) >= self.max_per_user:
+            self._rejected.inc(reason="user_limit")
+            raise UserQueueFullError(f"User {job.user_id} already has {self.max_per_user} queued plans")
+
+        if user_queue is None:
+            user_queue = self._queues[job.user_id] = deque()
+        user_queue.append(job)
+        self._depth += 1
+        self._enqueued.inc()
+
+        if self._available is not None:
+            self._available.release()
+        return self._depth
+
+    def _next_job(self) -> PlanJob:
+        # Round-robin: ambil job dari user terdepan lalu pindahkan user ke belakang
+        user_id, user_queue = next(iter(self._queues.items()))
+        job = user_queue.popleft()
+        if user_queue:
+            self._queues.move_to_end(user_id)
+        else:
+            del self._queues[user_id]
+        self._depth -= 1
+        return job
+
+    async def _worker(self, index: int):
+        while True:
+            await self._available.acquire()
+            job = self._next_job()
+            self._running += 1
+            try:
+                await self.run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Plan job {job.plan_id} crashed: {e}", exc_info=True)
+            finally:
+                self._running -= 1
+
+    async def run_job(self, job: PlanJob):
+        if job.ready is not None:
+            await job.ready.wait()
+        if not await self.set_status(job.plan_id, "running", only_if="queued"):
+            logger.info(f"Plan job {job.plan_id} skipped (no longer queued)")
+            return
+
+        try:
+            result = await plan_itinerary(**job.params)
+        except Exception as e:
+            logger.error(f"Plan job {job.plan_id} failed: {e}")
+            result = {"success": False, "error": str(e)}
+
+        itinerary = result.get("itinerary")
+        status = "draft" if itinerary else "failed"
+        # only_if="running": plan yang dibatalkan selama job berjalan tidak ditimpa
+        await self.set_status(job.plan_id, status, itinerary=itinerary, only_if="running")
+        self._finished.inc(status=status)
+
+    async def set_status(
+        self, plan_id: str, status: str, itinerary: Optional[dict] = None, only_if: Optional[str] = None
+    ) -> bool:
+        """
+        Ubah status plan (dan itinerary jika diberikan) dengan session baru di thread pool.
+        Dengan only_if, plan hanya diubah jika status saat ini sama; mengembalikan True jika diubah.
+        """
+        return await run_sync(self._set_status, plan_id, status, itinerary=itinerary, only_if=only_if)
+
+    def _set_status(self, plan_id: str, status: str, itinerary: Optional[dict] = None, only_if: Optional[str] = None) -> bool:
+        db = self.session_factory()
+        try:
+            plan = db.query(PlanDB).filter(PlanDB.id == plan_id).first()
+            if not plan or (only_if and plan.status != only_if):
+                return False
+            plan.status = status
+            if itinerary:
+                plan.itinerary_json = json.dumps(itinerary)
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+
+async def upgrade_provisional_plan(plan_id: str, result: dict):
+    """
+    Terapkan hasil LLM yang datang setelah deadline hedging ke plan provisional.
+    Hanya plan yang masih berstatus provisional yang diubah (plan yang sudah
+    dikonfirmasi atau dibatalkan tidak disentuh). Jika LLM ternyata juga gagal,
+    itinerary provisional dipertahankan dan plan menjadi draft biasa.
+    """
+    itinerary = result.get("itinerary") if result.get("success") and not result.get("fallback") else None
+    try:
+        updated = await plan_job_queue.set_status(plan_id, "draft", itinerary=itinerary, only_if="provisional")
+    except Exception as e:
+        logger.error(f"Failed to upgrade provisional plan {plan_id}: {e}")
+        return
+    if updated:
+        logger.info(f"Provisional plan {plan_id} {'upgraded with LLM itinerary' if itinerary else 'finalized'}")
+
+
+# Antrian per proses, dijalankan dari app.main.lifespan
+plan_job_queue = PlanJobQueue(
+    workers=settings.JOB_WORKERS,
+    max_depth=settings.JOB_QUEUE_MAX_DEPTH,
+    max_per_user=settings.JOB_QUEUE_MAX_PER_USER
+)
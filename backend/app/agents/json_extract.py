@@ -0,0 +1,185 @@
+"""
+Ekstraksi objek JSON dari output LLM dalam satu kali scan.
+Scanner melacak kedalaman kurung dan string (termasuk escape) sehingga objek
+bersarang terdeteksi utuh, tanpa regex dan tanpa scan ulang. Bisa di-feed
+per token saat streaming. Koma sebelum `}`/`]` (trailing comma) dibuang;
+teks di luar objek - termasuk markdown fence ``` - diabaikan.
+Resync: fence ``` atau "Final Answer:" (di luar string) di tengah objek
+membuang objek yang sedang discan ("{" nyasar di teks Thought). Selama scan,
+posisi "{" yang tampak seperti awal objek ("{" lalu `"` atau `}`) dicatat;
+kandidat yang gagal di-parse di-scan ulang hanya dari posisi itu, dengan
+batas jumlah scan ulang supaya tetap linear.
+"""
+import json
+from bisect import bisect_left
+from typing import Callable, Iterable, Iterator, Optional
+
+_WHITESPACE = frozenset(" \t\r\n")
+# Penanda yang tidak mungkin berada di dalam objek JSON dari LLM
+_RESYNC_MARKERS = ("```", "Final Answer:")
+_MARKER_ENDS = frozenset(marker[-1] for marker in _RESYNC_MARKERS)
+_MARKER_TAIL = max(len(marker) for marker in _RESYNC_MARKERS) - 1
+# Batas scan ulang per parse_candidates(); tiap scan ulang O(panjang kandidat)
+MAX_RESCANS = 8
+
+
+class Candidate(str):
+    """Teks kandidat objek + offset "{" di dalamnya yang layak dicoba ulang."""
+
+    starts: tuple[int, ...] = ()
+
+
+class JSONObjectExtractor:
+    """
+    Scanner inkremental untuk objek JSON top-level.
+    feed() mengembalikan teks kandidat objek yang baru lengkap (Candidate);
+    kandidat belum tentu JSON valid (mis. teks prosa berkurung kurawal), jadi
+    tetap di-parse.
+    """
+
+    def __init__(self):
+        self._buffer: list[str] = []
+        self._reset()
+
+    def _reset(self):
+        self._buffer.clear()
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Posisi koma terakhir di buffer yang sejauh ini hanya diikuti whitespace
+        self._pending_comma: Optional[int] = None
+        # Posisi trailing comma yang dibuang (terurut) dan "{" calon awal objek
+        self._removed: list[int] = []
+        self._starts: list[int] = []
+        self._brace: Optional[int] = None
+
+    def _candidate(self) -> Candidate:
+        candidate = Candidate("".join(self._buffer))
+        # Offset buffer -> offset teks (trailing comma sudah dibuang dari teks)
+        removed = self._removed
+        candidate.starts = tuple(p - bisect_left(removed, p) for p in self._starts)
+        return candidate
+
+    def feed(self, chunk: str) -> list[Candidate]:
+        completed = []
+        buffer = self._buffer
+
+        for char in chunk:
+            if self._depth == 0:
+                # Di luar objek: abaikan semuanya sampai ada "{"
+                if char == "{":
+                    self._depth = 1
+                    buffer.append(char)
+                continue
+
+            if self._brace is not None and char not in _WHITESPACE:
+                # "{" diikuti `"`/`}` dicatat sebagai titik scan ulang, termasuk di dalam string
+                if char in '"}':
+                    self._starts.append(self._brace)
+                self._brace = None
+
+            if self._in_string:
+                buffer.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                elif char == "{":
+                    self._brace = len(buffer) - 1
+                continue
+
+            if char in _MARKER_ENDS and self._at_marker(char):
+                self._reset()
+                continue
+
+            if char in "}]":
+                if self._pending_comma is not None:
+                    buffer[self._pending_comma] = ""
+                    self._removed.append(self._pending_comma)
+                    self._pending_comma = None
+                buffer.append(char)
+                if char == "}":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        completed.append(self._candidate())
+                        self._reset()
+                continue
+
+            buffer.append(char)
+            if char == ",":
+                self._pending_comma = len(buffer) - 1
+            elif char not in _WHITESPACE:
+                self._pending_comma = None
+                if char == '"':
+                    self._in_string = True
+                elif char == "{":
+                    self._depth += 1
+                    self._brace = len(buffer) - 1
+
+        return completed
+
+    def finish(self) -> list[Candidate]:
+        """
+        Akhir aliran: objek yang belum ditutup dikembalikan sebagai kandidat
+        (tidak valid, jadi parse_candidates men-scan ulang dari offset-nya).
+        """
+        leftover = self._candidate() if self._buffer else None
+        self._reset()
+        return [leftover] if leftover else []
+
+    def _at_marker(self, char: str) -> bool:
+        tail = "".join(self._buffer[-_MARKER_TAIL:]) + char
+        return tail.endswith(_RESYNC_MARKERS)
+
+    @property
+    def partial(self) -> bool:
+        """True jika sedang berada di tengah objek yang belum ditutup."""
+        return self._depth > 0
+
+
+def _rescan(candidate: str, start: int) -> list[Candidate]:
+    extractor = JSONObjectExtractor()
+    return extractor.feed(candidate[start:]) + extractor.finish()
+
+
+def parse_candidates(candidates: Iterable[str]) -> Iterator[dict]:
+    """
+    Parse kandidat dari feed()/finish(). Kandidat yang bukan JSON valid
+    di-scan ulang dari "{" tercatat berikutnya ("{tight ... {"destination": ...}"),
+    paling banyak MAX_RESCANS kali.
+    """
+    pending = [iter(candidates)]
+    rescans = 0
+    while pending:
+        candidate = next(pending[-1], None)
+        if candidate is None:
+            pending.pop()
+            continue
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            starts = getattr(candidate, "starts", ())
+            if starts and rescans < MAX_RESCANS:
+                rescans += 1
+                pending.append(iter(_rescan(candidate, starts[0])))
+            continue
+        if isinstance(parsed, dict):
+            yield parsed
+
+
+def iter_json_objects(chunks: Iterable[str]) -> Iterator[dict]:
+    """Yield setiap objek JSON (dict) valid yang ditemukan di aliran teks."""
+    extractor = JSONObjectExtractor()
+    for chunk in chunks:
+        yield from parse_candidates(extractor.feed(chunk))
+    yield from parse_candidates(extractor.finish())
+
+
+def extract_json_object(text: str, predicate: Optional[Callable[[dict], bool]] = None) -> Optional[dict]:
+    """Objek JSON pertama di `text` yang lolos `predicate` (jika diberikan)."""
+    for parsed in iter_json_objects((text,)):
+        if predicate is None or predicate(parsed):
+            return parsed
+    return None
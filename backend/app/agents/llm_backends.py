@@ -0,0 +1,288 @@
+"""
+Backend LLM yang bisa diganti lewat settings.LLM_BACKEND.
+- "gemini": ChatGoogleGenerativeAI (default, butuh network)
+- "record": panggil Gemini dan rekam setiap pasangan prompt -> completion ke cassette
+  (di-buffer di memori, ditulis ke file saat flush_cassettes() di shutdown)
+- "replay": layani completion dari cassette secara deterministik tanpa network,
+  dengan latency simulasi, sehingga AgentExecutor, tools dan parsing JSON
+  bisa diuji dan di-benchmark offline.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.config import settings
+from app.utils.logger import logger
+
+# Bagian awal prompt (instruksi statis) membedakan template react vs prefetch
+_TEMPLATE_PREFIX_CHARS = 512
+
+
+class CassetteMissError(LookupError):
+    """Tidak ada rekaman yang cocok untuk prompt ini."""
+
+
+def _prompt_text(messages: list[BaseMessage]) -> str:
+    return "\n".join(f"{m.type}: {m.content}" for m in messages)
+
+
+def _count_observations(prompt: str) -> int:
+    return len(re.findall(r"^Observation:", prompt, re.MULTILINE))
+
+
+# Judul bagian di suffix prompt ("Request:", "Tool results:", "Hotels (search_hotels):")
+_SECTION_HEADER = re.compile(r"^[A-Za-z][A-Za-z0-9 _()]*:$", re.MULTILINE)
+
+
+def _prompt_sections(prompt: str) -> str:
+    return "|".join(_SECTION_HEADER.findall(prompt[_TEMPLATE_PREFIX_CHARS:]))
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def loose_key(prompt: str) -> str:
+    """
+    Key longgar: template + susunan judul bagian di suffix + jumlah langkah
+    Observation. Dipakai saat prompt tidak persis sama (mis. data mock berubah)
+    tapi posisi di loop ReAct sama. Judul bagian membedakan prompt yang
+    prefix-nya sama (prefetch vs sintesis plan_execute).
+    """
+    template = hashlib.sha256(prompt[:_TEMPLATE_PREFIX_CHARS].encode("utf-8")).hexdigest()[:16]
+    sections = hashlib.sha256(_prompt_sections(prompt).encode("utf-8")).hexdigest()[:8]
+    return f"{template}:{sections}:{_count_observations(prompt)}"
+
+
+class Cassette:
+    """
+    File JSON berisi rekaman prompt -> completion. Rekaman baru hanya
+    di-buffer di memori; flush() menulis file sekali (bukan per panggilan LLM).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: list[dict] = []
+        self._by_key: dict[str, dict] = {}
+        self._by_loose_key: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for entry in json.load(f).get("interactions", []):
+                    self._index(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _index(self, entry: dict):
+        self._entries.append(entry)
+        self._by_key.setdefault(entry["key"], entry)
+        self._by_loose_key.setdefault(entry["loose_key"], entry)
+
+    def lookup(self, prompt: str) -> dict:
+        entry = self._by_key.get(prompt_key(prompt)) or self._by_loose_key.get(loose_key(prompt))
+        if entry is None:
+            raise CassetteMissError(
+                f"No recorded completion for prompt (loose key {loose_key(prompt)}) in {self.path}"
+            )
+        return entry
+
+    def record(self, prompt: str, completion: str, usage: Optional[dict] = None):
+        entry = {
+            "key": prompt_key(prompt),
+            "loose_key": loose_key(prompt),
+            "prompt_preview": prompt[-300:],
+            "completion": completion,
+            "usage": usage
+        }
+        with self._lock:
+            self._index(entry)
+            self._dirty = True
+
+    def flush(self):
+        """Tulis rekaman yang belum tersimpan ke file."""
+        with self._lock:
+            if self._dirty:
+                self.save()
+                self._dirty = False
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"interactions": self._entries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model yang memutar ulang completion dari cassette."""
+
+    cassette: Any
+    latency_seconds: float = 0.0
+    # Jeda antar chunk saat streaming, supaya token SSE terasa realistis
+    chunk_delay_seconds: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _message(self, messages: list[BaseMessage], stop: Optional[list[str]]) -> AIMessage:
+        entry = self.cassette.lookup(_prompt_text(messages))
+        completion = entry["completion"]
+        for token in stop or []:
+            if token in completion:
+                completion = completion[:completion.index(token)]
+        return AIMessage(content=completion, usage_metadata=entry.get("usage"))
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        message = self._message(messages, stop)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        message = self._message(messages, stop)
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, message: AIMessage) -> list[str]:
+        return re.findall(r"\S+\s*|\s+", message.content) or [""]
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self._message(messages, stop)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        for text in self._chunks(message):
+            if self.chunk_delay_seconds:
+                time.sleep(self.chunk_delay_seconds)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        message = self._message(messages, stop)
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        for text in self._chunks(message):
+            if self.chunk_delay_seconds:
+                await asyncio.sleep(self.chunk_delay_seconds)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+class RecordingChatModel(BaseChatModel):
+    """Bungkus chat model asli dan rekam setiap completion ke cassette."""
+
+    inner: BaseChatModel
+    cassette: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"record:{self.inner._llm_type}"
+
+    def _record(self, messages: list[BaseMessage], result: ChatResult):
+        message = result.generations[0].message
+        self.cassette.record(_prompt_text(messages), message.content, getattr(message, "usage_metadata", None))
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        result = self.inner._generate(messages, stop=stop, **kwargs)
+        self._record(messages, result)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+        self._record(messages, result)
+        return result
+
+
+# Cassette dibagi antar LLM di pool (satu file per proses)
+_cassettes: dict[str, Cassette] = {}
+
+
+def get_cassette(path: Optional[str] = None) -> Cassette:
+    path = path or settings.LLM_CASSETTE_PATH
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+
+def flush_cassettes():
+    """Tulis semua cassette yang punya rekaman baru (dipanggil dari lifespan shutdown)."""
+    for cassette in _cassettes.values():
+        try:
+            cassette.flush()
+        except OSError as e:
+            logger.error(f"Failed to write cassette {cassette.path}: {e}")
+
+
+def wrap_llm_backend(create_gemini) -> BaseChatModel:
+    """
+    Buat LLM sesuai settings.LLM_BACKEND. `create_gemini` dipanggil untuk
+    backend yang butuh Gemini asli (gemini dan record).
+    """
+    backend = settings.LLM_BACKEND
+    if backend == "replay":
+        cassette = get_cassette()
+        if not len(cassette):
+            logger.warning(f"Replay cassette {cassette.path} is empty; every LLM call will fail")
+        return ReplayChatModel(
+            cassette=cassette,
+            latency_seconds=settings.LLM_REPLAY_LATENCY_SECONDS,
+            chunk_delay_seconds=settings.LLM_REPLAY_CHUNK_DELAY_SECONDS
+        )
+    if backend == "record":
+        return RecordingChatModel(inner=create_gemini(), cassette=get_cassette())
+    if backend != "gemini":
+        logger.warning(f"Unknown LLM backend '{backend}', using gemini")
+    return create_gemini()
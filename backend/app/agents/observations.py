@@ -0,0 +1,147 @@
+"""
+Encoder observation tool yang hemat token untuk LLM.
+Hasil tool diproyeksikan ke field yang relevan, dipotong ke top-k hasil
+terbaik, lalu ditulis sebagai baris tabel atau JSON compact (satu objek per
+baris). Budget token per run membatasi total observation yang dikirim.
+"""
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from app.config import settings
+
+# Field yang dikirim ke LLM per tool. Field per-query seperti checkin,
+# checkout, available, origin, date tidak ikut karena tidak informatif.
+TOOL_FIELDS: dict[str, tuple[str, ...]] = {
+    "search_hotels": ("id", "name", "type", "price_per_night", "rating", "amenities"),
+    "search_flights": ("id", "airline", "departure", "arrival", "price", "class"),
+    "search_activities": ("id", "name", "type", "duration", "price", "description"),
+}
+
+# Perkiraan kasar jumlah token dari panjang teks
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+class ObservationBudget:
+    """Sisa budget token observation untuk satu run agent."""
+
+    def __init__(self, tokens: int):
+        self.limit = tokens
+        self.used = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.limit - self.used
+
+
+_current_budget: ContextVar[Optional[ObservationBudget]] = ContextVar("observation_budget", default=None)
+
+
+@contextmanager
+def observation_budget(tokens: Optional[int] = None):
+    """
+    Aktifkan budget token observation untuk run di dalam blok ini.
+    tokens <= 0 berarti tanpa batas.
+    """
+    tokens = settings.OBSERVATION_TOKEN_BUDGET if tokens is None else tokens
+    budget = ObservationBudget(tokens) if tokens > 0 else None
+    reset_token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(reset_token)
+
+
+def _rank(tool_name: str, rows: list[dict], max_price: Optional[int], travel_type: Optional[str]) -> list[dict]:
+    if tool_name == "search_hotels":
+        # Tanpa max_price: termurah dulu, agar top-k tidak memotong semua opsi terjangkau
+        if max_price is None:
+            return sorted(rows, key=lambda h: (h.get("price_per_night", 0), -h.get("rating", 0)))
+        # Yang masuk budget dulu, lalu rating tertinggi, lalu termurah
+        def hotel_key(h):
+            fits = h.get("price_per_night", 0) <= max_price
+            return (not fits, -h.get("rating", 0), h.get("price_per_night", 0))
+        return sorted(rows, key=hotel_key)
+
+    if tool_name == "search_activities":
+        wanted = (travel_type or "").lower()
+        return sorted(rows, key=lambda a: (a.get("type") != wanted, a.get("price", 0)))
+
+    if tool_name == "search_flights":
+        return sorted(rows, key=lambda f: f.get("price", 0))
+
+    return rows
+
+
+def _cell(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        value = ",".join(str(v) for v in value)
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def encode_observation(
+    tool_name: str,
+    results: Any,
+    max_price: Optional[int] = None,
+    travel_type: Optional[str] = None
+) -> str:
+    """
+    Encode hasil tool menjadi observation string compact.
+    List hasil search diproyeksikan, di-ranking dan dipotong ke top-k;
+    hasil lain (dict) ditulis sebagai JSON compact satu baris.
+    """
+    if not isinstance(results, list):
+        return json.dumps(results, separators=(",", ":"), ensure_ascii=False)
+
+    fields = TOOL_FIELDS.get(tool_name)
+    rows = _rank(tool_name, results, max_price, travel_type)
+    top_k = settings.OBSERVATION_TOP_K.get(tool_name, 0)
+    if top_k > 0:
+        rows = rows[:top_k]
+    if fields:
+        rows = [{f: r[f] for f in fields if f in r} for r in rows]
+
+    lines = [f"{tool_name}: {len(rows)} of {len(results)} results"]
+    if settings.OBSERVATION_FORMAT == "table" and fields:
+        lines.append("|".join(fields))
+        lines.extend("|".join(_cell(r.get(f, "")) for f in fields) for r in rows)
+    else:
+        lines.extend(json.dumps(r, separators=(",", ":"), ensure_ascii=False) for r in rows)
+    return "\n".join(lines)
+
+
+def fit_to_budget(observation: str) -> str:
+    """
+    Potong observation agar muat di sisa budget token run saat ini.
+    Baris dibuang dari belakang; minimal satu baris data tetap dikirim.
+    """
+    budget = _current_budget.get()
+    if budget is None:
+        return observation
+
+    if budget.remaining <= 0:
+        return "Observation omitted: token budget for tool results is exhausted. Use the data you already have."
+
+    cost = estimate_tokens(observation)
+    if cost > budget.remaining:
+        lines = observation.split("\n")
+        # Header (dan baris kolom untuk tabel) selalu dipertahankan
+        keep = 2 if len(lines) > 1 and not lines[1].startswith("{") else 1
+        kept = lines[:keep + 1]
+        for line in lines[keep + 1:]:
+            if estimate_tokens("\n".join(kept + [line])) > budget.remaining:
+                break
+            kept.append(line)
+        omitted = len(lines) - len(kept)
+        if omitted:
+            kept.append(f"(+{omitted} more rows omitted to save tokens)")
+        observation = "\n".join(kept)
+        cost = estimate_tokens(observation)
+
+    budget.used += cost
+    return observation
@@ -0,0 +1,210 @@
+"""
+Orkestrasi pembuatan itinerary untuk endpoint API.
+Urutan: cache -> single-flight -> LLM agent -> fallback rule-based,
+lalu simpan ke cache. Dengan hedge_deadline, fallback dikembalikan sebagai
+hasil provisional jika LLM belum selesai sebelum deadline.
+"""
+import asyncio
+import copy
+from typing import Awaitable, Callable, Optional
+
+from app.config import settings
+from app.agents.planner import (
+    agenerate_itinerary,
+    agenerate_itinerary_prefetch,
+    agenerate_itinerary_plan_execute,
+    generate_itinerary_fallback
+)
+from app.agents.itinerary_cache import (
+    get_cached_itinerary,
+    plan_fingerprint,
+    record_bypass,
+    store_itinerary
+)
+from app.models.schemas import PlannerMode
+from app.tools.catalog import canonical_destination
+from app.utils.concurrency import run_sync
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.singleflight import SingleFlight
+
+# Counter: plan_requests_coalesced_total
+plan_flight = SingleFlight("plan_requests")
+
+_hedged = metrics.counter("plan_hedge_fallbacks_total", "Plans answered with a provisional fallback after missing the deadline")
+_upgrades = metrics.counter("plan_hedge_upgrades_total", "Late LLM results delivered to provisional plans, by outcome")
+
+# Referensi kuat ke task LLM yang dibiarkan selesai di background
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _resolve_planner(planner_mode: Optional[str]):
+    """Pilih fungsi planner berdasarkan mode request atau PLANNER_MODE."""
+    mode = planner_mode or settings.PLANNER_MODE
+    if mode == PlannerMode.PREFETCH.value:
+        return agenerate_itinerary_prefetch
+    if mode == PlannerMode.PLAN_EXECUTE.value:
+        return agenerate_itinerary_plan_execute
+    if mode != PlannerMode.REACT.value:
+        logger.warning(f"Unknown planner mode '{mode}', using react")
+    return agenerate_itinerary
+
+
+async def plan_itinerary(
+    user_id: str,
+    destination: str,
+    start_date: str,
+    end_date: str,
+    budget_idr: int,
+    travel_type: str = "culture",
+    travelers: int = 1,
+    preferences: str = "",
+    bypass_cache: bool = False,
+    planner_mode: Optional[str] = None,
+    callbacks: Optional[list] = None,
+    max_llm_calls: Optional[int] = None,
+    hedge_deadline: Optional[float] = None,
+    on_upgrade: Optional[Callable[[dict], Awaitable[None]]] = None
+) -> dict:
+    """
+    Buat itinerary dengan LLM agent, jatuh ke fallback jika agent gagal.
+    Hasil dari kedua jalur di-cache berdasarkan fingerprint request.
+    `callbacks` diteruskan ke LangChain (dipakai untuk streaming SSE).
+    `max_llm_calls` membatasi panggilan LLM pada mode plan_execute.
+
+    Jika `hedge_deadline` (detik) terlewati, fallback rule-based langsung
+    dikembalikan dengan provisional=True. LLM tetap berjalan di background;
+    hasilnya masuk cache dan diteruskan ke `on_upgrade` bila diberikan.
+
+    Destinasi di-resolve ke nama kanonik ("Jogja" -> "Yogyakarta") sebelum
+    fingerprint dan panggilan tool apa pun.
+    """
+    resolved = canonical_destination(destination)
+    if resolved != destination:
+        logger.info(f"Resolved destination '{destination}' to '{resolved}'")
+        destination = resolved
+
+    params = dict(
+        user_id=user_id,
+        destination=destination,
+        start_date=start_date,
+        end_date=end_date,
+        budget_idr=budget_idr,
+        travel_type=travel_type,
+        travelers=travelers,
+        preferences=preferences
+    )
+
+    options = {}
+    if (planner_mode or settings.PLANNER_MODE) == PlannerMode.PLAN_EXECUTE.value:
+        options["max_llm_calls"] = max_llm_calls
+
+    use_cache = settings.ITINERARY_CACHE_ENABLED and not bypass_cache
+    fingerprint = await run_sync(plan_fingerprint, **params)
+
+    if use_cache:
+        cached = get_cached_itinerary(fingerprint, budget_idr)
+        if cached:
+            logger.info(f"Itinerary cache hit for {destination} ({start_date} to {end_date})")
+            return cached
+    elif bypass_cache:
+        record_bypass()
+
+    async def run() -> dict:
+        # Request identik yang sedang berjalan ditunggu bersama (single-flight).
+        # Request dengan callbacks (streaming) tetap jalan sendiri agar menerima event.
+        if callbacks is None:
+            key = (fingerprint, planner_mode or settings.PLANNER_MODE, max_llm_calls)
+            result, shared = await plan_flight.do(
+                key, lambda: _generate(fingerprint, params, planner_mode, None, options)
+            )
+            result = copy.deepcopy(result)
+            result["coalesced"] = shared
+        else:
+            result = await _generate(fingerprint, params, planner_mode, callbacks, options)
+            result["coalesced"] = False
+
+        result["cache_hit"] = False
+        return result
+
+    if not hedge_deadline:
+        return await run()
+    return await _run_hedged(run(), params, hedge_deadline, on_upgrade)
+
+
+async def _run_hedged(
+    run: Awaitable[dict],
+    params: dict,
+    deadline: float,
+    on_upgrade: Optional[Callable[[dict], Awaitable[None]]]
+) -> dict:
+    task = asyncio.ensure_future(run)
+    try:
+        # shield: timeout tidak membatalkan LLM, hanya berhenti menunggu
+        return await asyncio.wait_for(asyncio.shield(task), timeout=deadline)
+    except asyncio.TimeoutError:
+        pass
+
+    logger.warning(f"LLM planner missed the {deadline}s deadline, returning provisional fallback")
+    _hedged.inc()
+    # Fallback provisional sengaja tidak di-cache; hasil LLM yang akan masuk cache
+    result = await run_sync(generate_itinerary_fallback, **params)
+    # Provisional hanya jika memang ada yang akan menerima hasil LLM nanti
+    result.update(provisional=on_upgrade is not None, fallback=True, cache_hit=False, coalesced=False)
+
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    if on_upgrade is not None:
+        task.add_done_callback(lambda t: _deliver_upgrade(t, on_upgrade))
+    return result
+
+
+def _deliver_upgrade(task: asyncio.Task, on_upgrade: Callable[[dict], Awaitable[None]]):
+    # on_upgrade selalu dipanggil supaya plan provisional tidak menggantung;
+    # LLM gagal/dibatalkan diteruskan sebagai hasil gagal (plan difinalisasi apa adanya).
+    if task.cancelled():
+        _upgrades.inc(outcome="error")
+        result = {"success": False, "error": "LLM planner cancelled"}
+    elif task.exception() is not None:
+        _upgrades.inc(outcome="error")
+        result = {"success": False, "error": str(task.exception())}
+    else:
+        result = task.result()
+        _upgrades.inc(outcome="fallback" if result.get("fallback") else "llm")
+    upgrade = asyncio.ensure_future(on_upgrade(result))
+    _background_tasks.add(upgrade)
+    upgrade.add_done_callback(_background_tasks.discard)
+
+
+async def _generate(
+    fingerprint: str,
+    params: dict,
+    planner_mode: Optional[str],
+    callbacks: Optional[list],
+    options: Optional[dict] = None
+) -> dict:
+    # Try LLM agent first
+    used_fallback = False
+    try:
+        planner = _resolve_planner(planner_mode)
+        result = await planner(**params, callbacks=callbacks, **(options or {}))
+    except Exception as e:
+        logger.warning(f"LLM agent failed (exception), using fallback: {e}")
+        result = {"success": False, "error": str(e)}
+
+    if not result.get("success"):
+        logger.warning(f"LLM agent returned no itinerary, using fallback: {result.get('error')}")
+        # FALLBACK KARENA AGENT GAGAL
+        agent_metrics, llm_calls = result.get("metrics"), result.get("llm_calls")
+        result = await run_sync(generate_itinerary_fallback, **params)
+        used_fallback = True
+        if agent_metrics:
+            # Tetap laporkan biaya run agent yang gagal
+            result["metrics"] = agent_metrics
+        if llm_calls is not None:
+            result["llm_calls"] = llm_calls
+
+    # Hasil baru tetap disimpan walau request ini bypass, supaya cache ikut segar
+    result["fallback"] = used_fallback
+    store_itinerary(fingerprint, result, fallback=used_fallback)
+    return result
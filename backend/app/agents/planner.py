@@ -2,14 +2,18 @@
 LangChain Agent untuk Vacation Planning.
 Menggunakan LLM Google Gemini via API.
 """
+import asyncio
+import functools
 import json
-from typing import Optional
+from typing import Any, Optional
 
 # Impor untuk Agent modern LangChain (0.2.x)
 from langchain.agents.agent import AgentExecutor
 from langchain.agents import create_react_agent
 from langchain.tools import Tool, StructuredTool
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import render_text_description
 from langchain.callbacks.manager import CallbackManager
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from pydantic import BaseModel, Field
@@ -17,7 +21,23 @@ from pydantic import BaseModel, Field
 from app.config import settings
 from app.tools.search import search_hotels, search_flights, search_activities, get_destination_info
 from app.tools.calendar import get_free_dates, find_best_travel_window
+from app.tools.catalog import get_catalog
+from app.tools.memo import memoize_tool
+from app.agents.pool import AgentPool, PooledAgent
+from app.agents.instrumentation import PlanInstrumentation
+from app.agents.llm_backends import wrap_llm_backend
+from app.agents.json_extract import JSONObjectExtractor, extract_json_object, parse_candidates
+from app.agents.observations import encode_observation, fit_to_budget, observation_budget
+from app.agents.prompt_cache import register_prefix
+from app.planning.scheduling import (
+    DAY_END_MINUTES, DAY_START_MINUTES, TRAVEL_BUFFER_MINUTES,
+    format_time, pack_day, parse_duration, schedule_conflicts
+)
+from app.planning.selection import select_activities
+from app.tools.memo import normalize_text
+from app.utils.concurrency import run_sync
 from app.utils.logger import audit, logger
+from app.utils.metrics import metrics
 
 import google.generativeai as genai
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -47,62 +67,116 @@ class CalendarCheckInput(BaseModel):
 
 
 # === Tool Functions with Wrappers ===
+# Observation string di-encode compact (lihat app.agents.observations)
+# lalu di-memoize per tool (lihat app.tools.memo)
+@memoize_tool("search_hotels")
 def _search_hotels_wrapper(destination: str, checkin: str, checkout: str, preferences: str = None, max_price: int = None) -> str:
     results = search_hotels(destination, checkin, checkout, preferences, max_price)
-    return json.dumps(results, indent=2, ensure_ascii=False)
+    return encode_observation("search_hotels", results, max_price=max_price)
 
+@memoize_tool("search_flights")
 def _search_flights_wrapper(destination: str, departure_date: str, origin: str = "Jakarta") -> str:
     results = search_flights(destination, departure_date, origin)
-    return json.dumps(results, indent=2, ensure_ascii=False)
+    return encode_observation("search_flights", results)
 
+@memoize_tool("search_activities")
 def _search_activities_wrapper(destination: str, travel_type: str = None) -> str:
     results = search_activities(destination, travel_type)
-    return json.dumps(results, indent=2, ensure_ascii=False)
+    return encode_observation("search_activities", results, travel_type=travel_type)
 
+@memoize_tool("check_calendar")
 def _get_calendar_free_dates(user_id: str, range_start: str, range_end: str) -> str:
     free_dates = get_free_dates(user_id, range_start, range_end)
     window = find_best_travel_window(user_id, range_start, range_end)
-    return json.dumps({"free_dates": free_dates, "analysis": window}, indent=2, ensure_ascii=False)
+    return encode_observation("check_calendar", {"free_dates": free_dates, "analysis": window})
 
+@memoize_tool("get_destination_info")
 def _get_destination_info_wrapper(destination: str) -> str:
     info = get_destination_info(destination)
-    return json.dumps(info, indent=2, ensure_ascii=False)
+    return encode_observation("get_destination_info", info)
+
+
+# Budget token observation diterapkan setelah cache, per run agent
+def _budgeted_tool(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> str:
+        return fit_to_budget(func(*args, **kwargs))
+    return wrapper
+
+# Versi async: tools sync dijalankan di thread pool terbatas. Budget dihitung
+# di event loop supaya pemakaiannya tidak diubah dari banyak thread sekaligus.
+def _async_tool(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs) -> str:
+        return fit_to_budget(await run_sync(func, *args, **kwargs))
+    return wrapper
 
 # === Define Tools ===
 tools = [
     StructuredTool.from_function(
-        func=_search_hotels_wrapper,
+        func=_budgeted_tool(_search_hotels_wrapper),
+        coroutine=_async_tool(_search_hotels_wrapper),
         name="search_hotels",
         description="Search for hotels at a destination. Returns list of available hotels with prices and ratings.",
         args_schema=HotelSearchInput
     ),
     StructuredTool.from_function(
-        func=_search_flights_wrapper,
+        func=_budgeted_tool(_search_flights_wrapper),
+        coroutine=_async_tool(_search_flights_wrapper),
         name="search_flights",
         description="Search for flights to a destination. Returns available flights with prices.",
         args_schema=FlightSearchInput
     ),
     StructuredTool.from_function(
-        func=_search_activities_wrapper,
+        func=_budgeted_tool(_search_activities_wrapper),
+        coroutine=_async_tool(_search_activities_wrapper),
         name="search_activities",
         description="Search for activities and attractions at a destination. Can filter by travel type (culture, adventure, beach, nature).",
         args_schema=ActivitySearchInput
     ),
     StructuredTool.from_function(
-        func=_get_calendar_free_dates,
+        func=_budgeted_tool(_get_calendar_free_dates),
+        coroutine=_async_tool(_get_calendar_free_dates),
         name="check_calendar",
         description="Check user's calendar for free dates within a range. Returns available dates and suggests best travel window.",
         args_schema=CalendarCheckInput
     ),
     Tool(
         name="get_destination_info",
-        func=_get_destination_info_wrapper,
+        func=_budgeted_tool(_get_destination_info_wrapper),
+        coroutine=_async_tool(_get_destination_info_wrapper),
         description="Get general information about a destination including highlights, best time to visit, and budget ranges."
     )
 ]
 
+_tools_by_name = {t.name: t for t in tools}
+
 # === Agent Prompt Template (ReAct Format) ===
-REACT_PROMPT = """You are TravelPlannerAgent, an AI assistant that creates detailed vacation itineraries.
+ITINERARY_JSON_SCHEMA = """{{
+    "trip_name": "Descriptive trip name",
+    "destination": "City name",
+    "start_date": "YYYY-MM-DD",
+    "end_date": "YYYY-MM-DD", 
+    "days": [
+        {{
+            "date": "YYYY-MM-DD",
+            "activities": [
+                {{"time": "08:00", "name": "Activity name", "description": "Brief description", "estimated_cost": 50000}}
+            ],
+            "lodging": {{"name": "Hotel name", "price": 350000}},
+            "transport": {{"type": "Grab/taxi", "estimated_cost": 50000}},
+            "daily_cost": 450000
+        }}
+    ],
+    "total_estimated_cost": 1800000,
+    "recommended_hotels": [{{"id": "htl_001", "name": "Hotel A", "price_per_night": 350000, "rating": 4.5}}],
+    "notes": "Additional notes or recommendations"
+}}"""
+
+# Setiap prompt = prefix statis (preamble, tools, schema) + suffix per request.
+# Prefix di-render sekali dan selalu berada di awal prompt supaya bisa
+# dilayani dari context cache provider (lihat app.agents.prompt_cache).
+REACT_PROMPT_PREFIX = """You are TravelPlannerAgent, an AI assistant that creates detailed vacation itineraries.
 
 IMPORTANT RULES:
 1. Always check the user's calendar first using the 'check_calendar' tool. Adjust dates based on calendar results.
@@ -128,57 +202,198 @@ Thought: I now know the final answer
 Final Answer: the final answer to the original input question
 
 IMPORTANT: Your Final Answer MUST be a valid JSON object with the following structure (no additional text before or after):
-{{
-    "trip_name": "Descriptive trip name",
-    "destination": "City name",
-    "start_date": "YYYY-MM-DD",
-    "end_date": "YYYY-MM-DD", 
-    "days": [
-        {{
-            "date": "YYYY-MM-DD",
-            "activities": [
-                {{"time": "08:00", "name": "Activity name", "description": "Brief description", "estimated_cost": 50000}}
-            ],
-            "lodging": {{"name": "Hotel name", "price": 350000}},
-            "transport": {{"type": "Grab/taxi", "estimated_cost": 50000}},
-            "daily_cost": 450000
-        }}
-    ],
-    "total_estimated_cost": 1800000,
-    "recommended_hotels": [{{"id": "htl_001", "name": "Hotel A", "price_per_night": 350000, "rating": 4.5}}],
-    "notes": "Additional notes or recommendations"
-}}
+""" + ITINERARY_JSON_SCHEMA + """
 
 Begin!
 
-Question: {input}
+"""
+
+REACT_PROMPT_SUFFIX = """Question: {input}
 Thought: {agent_scratchpad}"""
 
+REACT_PROMPT = REACT_PROMPT_PREFIX + REACT_PROMPT_SUFFIX
+
+# Prompt mode "prefetch": semua tool sudah dipanggil di depan,
+# LLM cukup dipanggil sekali untuk menyusun itinerary final.
+PREFETCH_PROMPT_PREFIX = """You are TravelPlannerAgent, an AI assistant that creates detailed vacation itineraries.
+
+All tool lookups have already been done for you. Use ONLY the data below and do not invent hotels or activities.
+
+IMPORTANT RULES:
+1. Only plan on dates the calendar marks as free. If some dates are busy, adjust the trip to the suggested window.
+2. Choose hotels and activities that match the user's budget and preferences.
+3. Create a daily itinerary with specific activities, times, and costs.
+4. The total estimated cost MUST NOT exceed the user's budget.
+5. Include at least one accommodation option per night.
+6. Be realistic with timing - don't over-schedule daily activities.
+
+Your response MUST be ONLY a valid JSON object with the following structure (no additional text before or after):
+""" + ITINERARY_JSON_SCHEMA + """
+
+"""
+
+PREFETCH_PROMPT_SUFFIX = """Request:
+{input}
+
+Calendar (check_calendar):
+{calendar}
+
+Hotels (search_hotels):
+{hotels}
+
+Activities (search_activities):
+{activities}
+
+Destination info (get_destination_info):
+{destination_info}
+
+Respond with ONLY the JSON object described above."""
+
+PREFETCH_PROMPT = PREFETCH_PROMPT_PREFIX + PREFETCH_PROMPT_SUFFIX
+
+# Prompt mode "plan_execute": satu panggilan untuk memilih tool yang perlu
+# dijalankan, lalu satu panggilan sintesis setelah tool dieksekusi.
+PLAN_EXECUTE_PLANNING_PROMPT_PREFIX = """You are TravelPlannerAgent, an AI assistant that plans which lookups are needed before writing a vacation itinerary.
+
+You can call these tools (arguments in parentheses):
+
+{tools}
+
+Decide which tool calls are needed to build the itinerary. Always include check_calendar, search_hotels and search_activities.
+Respond with ONLY a JSON object of this form (no additional text before or after):
+{{"tool_calls": [{{"tool": "tool_name", "args": {{"argument": "value"}}}}]}}
+
+"""
+
+PLAN_EXECUTE_PLANNING_PROMPT_SUFFIX = """Request:
+{input}"""
+
+PLAN_EXECUTE_PLANNING_PROMPT = PLAN_EXECUTE_PLANNING_PROMPT_PREFIX + PLAN_EXECUTE_PLANNING_PROMPT_SUFFIX
+
+PLAN_EXECUTE_SYNTHESIS_PROMPT_PREFIX = PREFETCH_PROMPT_PREFIX
+
+PLAN_EXECUTE_SYNTHESIS_PROMPT_SUFFIX = """Request:
+{input}
+
+Tool results:
+{tool_results}
+
+Respond with ONLY the JSON object described above."""
+
+PLAN_EXECUTE_SYNTHESIS_PROMPT = PLAN_EXECUTE_SYNTHESIS_PROMPT_PREFIX + PLAN_EXECUTE_SYNTHESIS_PROMPT_SUFFIX
+
+# Prompt regenerasi satu hari: lodging, transport dan hari lain tetap,
+# LLM hanya menyusun ulang aktivitas hari tersebut.
+DAY_REGENERATE_PROMPT_PREFIX = """You are TravelPlannerAgent, an AI assistant that creates detailed vacation itineraries.
+
+The traveler wants a different plan for ONE day of an existing itinerary. Lodging, transport and all other days stay fixed; you only choose that day's activities.
+
+IMPORTANT RULES:
+1. Use ONLY the available activities listed below and do not invent new ones.
+2. Do not repeat activities that are already planned on other days, and prefer activities different from the day's current plan.
+3. The sum of estimated_cost MUST NOT exceed the activity budget for the day.
+4. Be realistic with timing - don't over-schedule the day.
+
+Your response MUST be ONLY a valid JSON object with the following structure (no additional text before or after):
+{{
+    "activities": [
+        {{"time": "08:00", "name": "Activity name", "description": "Brief description", "estimated_cost": 50000}}
+    ]
+}}
+
+"""
+
+DAY_REGENERATE_PROMPT_SUFFIX = """Trip: {destination}, {travelers} traveler(s), {travel_type} trip
+Day to re-plan: {date}
+Activity budget for this day: {activity_budget} IDR
+Additional preferences: {preferences}
+
+Current activities of this day (the traveler wants something else):
+{current}
+
+Already planned on other days (do not repeat):
+{exclude}
+
+Available activities (search_activities):
+{activities}
+
+Respond with ONLY the JSON object described above."""
+
+DAY_REGENERATE_PROMPT = DAY_REGENERATE_PROMPT_PREFIX + DAY_REGENERATE_PROMPT_SUFFIX
+
+
+def _describe_tools() -> str:
+    return "\n".join(f"- {t.name}({', '.join(t.args)}): {t.description}" for t in tools)
+
+
+def _static_prompt(name: str, prefix_template: str, suffix_template: str, **static_vars) -> PromptTemplate:
+    """
+    Render prefix statis sekali, daftarkan untuk context caching, dan kembalikan
+    template yang per request hanya memformat suffix-nya.
+    """
+    prefix = PromptTemplate.from_template(prefix_template).format(**static_vars)
+    register_prefix(name, prefix)
+    escaped = prefix.replace("{", "{{").replace("}", "}}")
+    return PromptTemplate.from_template(escaped + suffix_template)
+
 
 # === Create Agent (Fixed Version) ===
-def create_planner_agent(streaming: bool = False):
-    """Create and return the planner agent."""
-    
-    callback_manager = None
-    if streaming:
-        callback_manager = CallbackManager([StreamingStdOutCallbackHandler()])
+# Template di-parse dan prefix statis di-render sekali saja, bukan per request
+_react_tools = {"tools": render_text_description(tools), "tool_names": ", ".join(t.name for t in tools)}
+# create_react_agent mewajibkan variabel tools/tool_names; nilainya identik
+# dengan yang sudah di-render ke prefix
+_react_prompt = _static_prompt(
+    "react", REACT_PROMPT_PREFIX, REACT_PROMPT_SUFFIX, **_react_tools
+).partial(**_react_tools)
+_prefetch_prompt = _static_prompt("prefetch", PREFETCH_PROMPT_PREFIX, PREFETCH_PROMPT_SUFFIX)
+_planning_prompt = _static_prompt(
+    "plan_execute_planning", PLAN_EXECUTE_PLANNING_PROMPT_PREFIX, PLAN_EXECUTE_PLANNING_PROMPT_SUFFIX,
+    tools=_describe_tools()
+)
+_synthesis_prompt = _static_prompt(
+    "plan_execute_synthesis", PLAN_EXECUTE_SYNTHESIS_PROMPT_PREFIX, PLAN_EXECUTE_SYNTHESIS_PROMPT_SUFFIX
+)
+_day_regenerate_prompt = _static_prompt("day_regenerate", DAY_REGENERATE_PROMPT_PREFIX, DAY_REGENERATE_PROMPT_SUFFIX)
+_genai_configured = False
+
+
+def _configure_genai():
+    """Konfigurasi SDK Gemini cukup sekali per proses."""
+    global _genai_configured
+    if not _genai_configured:
+        genai.configure(api_key=settings.GOOGLE_API_KEY)
+        _genai_configured = True
 
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
+
+def _create_gemini_llm(callback_manager: Optional[CallbackManager] = None) -> ChatGoogleGenerativeAI:
+    _configure_genai()
 
     # PERBAIKAN 1: Hapus convert_system_message_to_human untuk menghindari warning
-    llm = ChatGoogleGenerativeAI(
+    return ChatGoogleGenerativeAI(
         model="gemini-2.0-flash",
         temperature=0.3,
         callback_manager=callback_manager
     )
 
-    logger.warning(f"LLM agent Google Gemini initialized for planning.")
 
-    # PERBAIKAN 2: Gunakan PromptTemplate sederhana untuk ReAct
-    prompt = PromptTemplate.from_template(REACT_PROMPT)
+def _create_llm(callback_manager: Optional[CallbackManager] = None) -> BaseChatModel:
+    """LLM sesuai settings.LLM_BACKEND (gemini / record / replay)."""
+    return wrap_llm_backend(lambda: _create_gemini_llm(callback_manager))
+
+
+def create_planner_agent(streaming: bool = False, llm: Optional[BaseChatModel] = None):
+    """Create and return the planner agent."""
     
+    if llm is None:
+        callback_manager = None
+        if streaming:
+            callback_manager = CallbackManager([StreamingStdOutCallbackHandler()])
+        llm = _create_llm(callback_manager)
+
+    logger.warning(f"LLM agent ({llm._llm_type}) initialized for planning.")
+
     # PERBAIKAN 3: Gunakan create_react_agent dengan prompt yang benar
-    agent = create_react_agent(llm, tools, prompt)
+    agent = create_react_agent(llm, tools, _react_prompt)
     
     # PERBAIKAN 4: AgentExecutor dengan error handling yang lebih baik
     agent_executor = AgentExecutor(
@@ -194,7 +409,120 @@ def create_planner_agent(streaming: bool = False):
     return agent_executor
 
 
+def _create_pooled_agent() -> PooledAgent:
+    llm = _create_llm()
+    return PooledAgent(llm=llm, executor=create_planner_agent(llm=llm))
+
+
+# Pool agent per proses, di-warm up dari app.main.lifespan
+planner_pool = AgentPool(
+    factory=_create_pooled_agent,
+    size=settings.AGENT_POOL_SIZE,
+    max_overflow=settings.AGENT_POOL_MAX_OVERFLOW,
+    timeout=settings.AGENT_POOL_TIMEOUT_SECONDS
+)
+
+
 # === Main Planning Function (Fixed) ===
+REACT_INSTRUCTIONS = """First check the calendar for availability, then search for suitable hotels and activities.
+    Create a detailed day-by-day itinerary that fits within the budget."""
+
+PREFETCH_INSTRUCTIONS = "Create a detailed day-by-day itinerary that fits within the budget."
+
+
+def _build_planner_query(
+    user_id: str,
+    destination: str,
+    start_date: str,
+    end_date: str,
+    budget_idr: int,
+    travel_type: str,
+    travelers: int,
+    preferences: str,
+    instructions: str = REACT_INSTRUCTIONS
+) -> str:
+    return f"""
+    Please create a vacation itinerary with the following details:
+    - User ID: {user_id}
+    - Destination: {destination}
+    - Dates: {start_date} to {end_date}
+    - Budget: {budget_idr:,} IDR total
+    - Travel type preference: {travel_type}
+    - Number of travelers: {travelers}
+    - Additional preferences: {preferences if preferences else 'None specified'}
+    
+    {instructions}
+    """
+
+
+def _extract_tools_called(result: dict) -> list[str]:
+    # PERBAIKAN 6: Extract tools dengan pengecekan yang aman
+    tools_called = []
+    if "intermediate_steps" in result and result["intermediate_steps"]:
+        for step in result["intermediate_steps"]:
+            try:
+                # step adalah tuple (AgentAction, observation)
+                if isinstance(step, tuple) and len(step) >= 1:
+                    agent_action = step[0]
+                    if hasattr(agent_action, 'tool'):
+                        tools_called.append(agent_action.tool)
+                    elif isinstance(agent_action, dict) and 'tool' in agent_action:
+                        tools_called.append(agent_action['tool'])
+            except (AttributeError, TypeError) as e:
+                logger.debug(f"Could not extract tool name from step: {e}")
+                continue
+    
+    if not tools_called:
+        tools_called = ["agent_executed"]
+    return tools_called
+
+
+def _build_agent_result(
+    result: dict,
+    user_id: str,
+    destination: str,
+    start_date: str,
+    end_date: str,
+    budget_idr: int,
+    tools_called: Optional[list[str]] = None,
+    itinerary: Optional[dict] = None
+) -> dict:
+    if tools_called is None:
+        tools_called = _extract_tools_called(result)
+    
+    audit.log_agent_action(
+        user_id=user_id,
+        agent_action="generate_itinerary",
+        tools_called=tools_called,
+        input_summary=f"{destination} | {start_date}-{end_date} | {budget_idr} IDR"
+    )
+    
+    # Parse the output
+    output = result.get("output", "")
+    
+    # Try to extract JSON from output (kecuali sudah di-parse saat streaming)
+    if itinerary is None:
+        itinerary = _extract_json_from_output(output)
+    
+    if itinerary:
+        dropped = _enforce_schedule(itinerary)
+        return {
+            "success": True,
+            "itinerary": itinerary,
+            "tools_used": tools_called,
+            "raw_output": output,
+            **({"schedule_conflicts": dropped} if dropped else {})
+        }
+    else:
+        logger.warning("Failed to parse JSON from agent output, trying fallback")
+        return {
+            "success": False,
+            "error": "Failed to parse itinerary from agent output.",
+            "raw_output": output,
+            "tools_used": tools_called
+        }
+
+
 def generate_itinerary(
     user_id: str,
     destination: str,
@@ -210,110 +538,470 @@ def generate_itinerary(
     """
     logger.info(f"Generating itinerary for {user_id}: {destination} ({start_date} to {end_date})")
     
-    # Create the agent
-    agent = create_planner_agent(streaming=False)
+    query = _build_planner_query(
+        user_id, destination, start_date, end_date, budget_idr, travel_type, travelers, preferences
+    )
     
-    # Construct the query
-    query = f"""
-    Please create a vacation itinerary with the following details:
-    - User ID: {user_id}
-    - Destination: {destination}
-    - Dates: {start_date} to {end_date}
-    - Budget: {budget_idr:,} IDR total
-    - Travel type preference: {travel_type}
-    - Number of travelers: {travelers}
-    - Additional preferences: {preferences if preferences else 'None specified'}
+    instrumentation = PlanInstrumentation(mode="react")
+    try:
+        # PERBAIKAN 5: Invoke dengan error handling yang lebih baik
+        with planner_pool.acquire() as pooled, observation_budget():
+            result = pooled.executor.invoke({"input": query}, config={"callbacks": [instrumentation]})
+        
+        output = _build_agent_result(result, user_id, destination, start_date, end_date, budget_idr)
+            
+    except Exception as e:
+        logger.error(f"Agent error: {str(e)}", exc_info=True)
+        output = {
+            "success": False,
+            "error": str(e),
+            "raw_output": None
+        }
     
-    First check the calendar for availability, then search for suitable hotels and activities.
-    Create a detailed day-by-day itinerary that fits within the budget.
+    output["metrics"] = instrumentation.observe()
+    output["llm_calls"] = len(output["metrics"]["llm_calls"])
+    return output
+
+
+async def agenerate_itinerary(
+    user_id: str,
+    destination: str,
+    start_date: str,
+    end_date: str,
+    budget_idr: int,
+    travel_type: str = "culture",
+    travelers: int = 1,
+    preferences: str = "",
+    callbacks: Optional[list] = None
+) -> dict:
     """
+    Versi async dari generate_itinerary.
+    Menggunakan AgentExecutor.ainvoke sehingga event loop tidak terblokir
+    selama loop ReAct berjalan.
+    """
+    logger.info(f"Generating itinerary (async) for {user_id}: {destination} ({start_date} to {end_date})")
+    
+    query = _build_planner_query(
+        user_id, destination, start_date, end_date, budget_idr, travel_type, travelers, preferences
+    )
     
+    instrumentation = PlanInstrumentation(mode="react")
     try:
-        # PERBAIKAN 5: Invoke dengan error handling yang lebih baik
-        result = agent.invoke({"input": query})
+        async with planner_pool.aacquire() as pooled:
+            with observation_budget():
+                result = await pooled.executor.ainvoke(
+                    {"input": query}, config={"callbacks": [instrumentation, *(callbacks or [])]}
+                )
         
-        # PERBAIKAN 6: Extract tools dengan pengecekan yang aman
-        tools_called = []
-        if "intermediate_steps" in result and result["intermediate_steps"]:
-            for step in result["intermediate_steps"]:
-                try:
-                    # step adalah tuple (AgentAction, observation)
-                    if isinstance(step, tuple) and len(step) >= 1:
-                        agent_action = step[0]
-                        if hasattr(agent_action, 'tool'):
-                            tools_called.append(agent_action.tool)
-                        elif isinstance(agent_action, dict) and 'tool' in agent_action:
-                            tools_called.append(agent_action['tool'])
-                except (AttributeError, TypeError) as e:
-                    logger.debug(f"Could not extract tool name from step: {e}")
-                    continue
+        output = _build_agent_result(result, user_id, destination, start_date, end_date, budget_idr)
+    
+    except Exception as e:
+        logger.error(f"Agent error: {str(e)}", exc_info=True)
+        output = {
+            "success": False,
+            "error": str(e),
+            "raw_output": None
+        }
+    
+    output["metrics"] = instrumentation.observe()
+    output["llm_calls"] = len(output["metrics"]["llm_calls"])
+    return output
+
+
+async def agenerate_itinerary_prefetch(
+    user_id: str,
+    destination: str,
+    start_date: str,
+    end_date: str,
+    budget_idr: int,
+    travel_type: str = "culture",
+    travelers: int = 1,
+    preferences: str = "",
+    callbacks: Optional[list] = None
+) -> dict:
+    """
+    Mode "prefetch": jalankan check_calendar, search_hotels, search_activities
+    dan get_destination_info secara paralel di depan, lalu minta LLM menyusun
+    itinerary final dalam satu panggilan (tanpa round trip ReAct).
+    """
+    logger.info(f"Generating itinerary (prefetch) for {user_id}: {destination} ({start_date} to {end_date})")
+    
+    calls = _default_tool_calls(user_id, destination, start_date, end_date, travel_type, preferences)
+    tools_called = [name for name, _ in calls]
+    
+    instrumentation = PlanInstrumentation(mode="prefetch")
+    try:
+        # Lewat objek Tool supaya callback (mis. streaming SSE) tetap menerima event tool
+        config = {"callbacks": [instrumentation, *(callbacks or [])]}
+        with observation_budget():
+            calendar, hotels, activities, destination_info = await _run_tool_calls(calls, config)
+        
+        prompt = _prefetch_prompt.format(
+            input=_build_planner_query(
+                user_id, destination, start_date, end_date, budget_idr, travel_type, travelers,
+                preferences, instructions=PREFETCH_INSTRUCTIONS
+            ),
+            calendar=calendar,
+            hotels=hotels,
+            activities=activities,
+            destination_info=destination_info
+        )
         
-        if not tools_called:
-            tools_called = ["agent_executed"]
+        async with planner_pool.aacquire() as pooled:
+            output, itinerary = await _complete(pooled.llm, prompt, config, stream=bool(callbacks))
         
-        audit.log_agent_action(
-            user_id=user_id,
-            agent_action="generate_itinerary",
+        result = _build_agent_result(
+            {"output": output, "intermediate_steps": []},
+            user_id, destination, start_date, end_date, budget_idr,
             tools_called=tools_called,
-            input_summary=f"{destination} | {start_date}-{end_date} | {budget_idr} IDR"
+            itinerary=itinerary
         )
+        result["llm_calls"] = 1
+    
+    except Exception as e:
+        logger.error(f"Prefetch planner error: {str(e)}", exc_info=True)
+        result = {
+            "success": False,
+            "error": str(e),
+            "raw_output": None
+        }
+    
+    result["metrics"] = instrumentation.observe()
+    return result
+
+
+async def agenerate_itinerary_plan_execute(
+    user_id: str,
+    destination: str,
+    start_date: str,
+    end_date: str,
+    budget_idr: int,
+    travel_type: str = "culture",
+    travelers: int = 1,
+    preferences: str = "",
+    callbacks: Optional[list] = None,
+    max_llm_calls: Optional[int] = None
+) -> dict:
+    """
+    Mode "plan_execute": satu panggilan LLM memilih tool yang dibutuhkan,
+    tool dijalankan paralel secara deterministik, lalu satu panggilan LLM
+    menyusun itinerary. Total panggilan LLM dibatasi max_llm_calls:
+    dengan batas 1 tahap planning dilewati (pakai set tool default), dan
+    sisa kuota dipakai untuk mengulang sintesis jika JSON gagal di-parse.
+    """
+    max_llm_calls = max_llm_calls or settings.PLAN_EXECUTE_MAX_LLM_CALLS
+    logger.info(
+        f"Generating itinerary (plan_execute, max {max_llm_calls} LLM calls) for {user_id}: "
+        f"{destination} ({start_date} to {end_date})"
+    )
+    
+    query = _build_planner_query(
+        user_id, destination, start_date, end_date, budget_idr, travel_type, travelers,
+        preferences, instructions=PREFETCH_INSTRUCTIONS
+    )
+    llm_calls = 0
+    
+    instrumentation = PlanInstrumentation(mode="plan_execute")
+    try:
+        config = {"callbacks": [instrumentation, *(callbacks or [])]}
+        async with planner_pool.aacquire() as pooled:
+            # 1. Planning: hanya jika masih ada kuota untuk sintesis setelahnya
+            calls = None
+            if max_llm_calls >= 2:
+                # Dihitung sebelum await: panggilan yang gagal/timeout tetap terpakai
+                llm_calls += 1
+                plan_output, _ = await _complete(pooled.llm, _planning_prompt.format(input=query), config)
+                calls = _parse_tool_plan(plan_output, user_id)
+            if not calls:
+                calls = _default_tool_calls(user_id, destination, start_date, end_date, travel_type, preferences)
+            
+            # 2. Execute: tool dijalankan paralel, tanpa LLM
+            with observation_budget():
+                observations = await _run_tool_calls(calls, config)
+            tool_results = "\n\n".join(
+                f"{name} {json.dumps(args, ensure_ascii=False, default=str)}:\n{observation}"
+                for (name, args), observation in zip(calls, observations)
+            )
+            
+            # 3. Synthesis (diulang selama kuota masih ada dan JSON belum valid)
+            prompt = _synthesis_prompt.format(input=query, tool_results=tool_results)
+            output, itinerary = "", None
+            while llm_calls < max_llm_calls and itinerary is None:
+                llm_calls += 1
+                output, itinerary = await _complete(pooled.llm, prompt, config, stream=bool(callbacks))
+        
+        result = _build_agent_result(
+            {"output": output, "intermediate_steps": []},
+            user_id, destination, start_date, end_date, budget_idr,
+            tools_called=[name for name, _ in calls],
+            itinerary=itinerary
+        )
+    
+    except Exception as e:
+        logger.error(f"Plan-execute planner error: {str(e)}", exc_info=True)
+        result = {
+            "success": False,
+            "error": str(e),
+            "raw_output": None
+        }
+    
+    result["llm_calls"] = llm_calls
+    result["max_llm_calls"] = max_llm_calls
+    result["metrics"] = instrumentation.observe()
+    return result
+
+
+async def agenerate_day_activities(
+    destination: str,
+    date: str,
+    activity_budget: int,
+    travel_type: str = "culture",
+    travelers: int = 1,
+    preferences: str = "",
+    current: Optional[list[dict]] = None,
+    exclude: Optional[list[str]] = None,
+    callbacks: Optional[list] = None
+) -> dict:
+    """
+    Susun ulang aktivitas satu hari dengan satu panggilan LLM.
+    Hanya search_activities yang dijalankan (hasilnya ter-memoize); aktivitas
+    yang melebihi activity_budget dianggap gagal agar caller jatuh ke fallback.
+    """
+    logger.info(f"Regenerating activities for {destination} on {date} (budget {activity_budget:,} IDR)")
+    
+    instrumentation = PlanInstrumentation(mode="day_regenerate")
+    try:
+        config = {"callbacks": [instrumentation, *(callbacks or [])]}
+        with observation_budget():
+            activities, = await _run_tool_calls(
+                [("search_activities", {"destination": destination, "travel_type": travel_type})], config
+            )
         
-        # Parse the output
-        output = result.get("output", "")
+        prompt = _day_regenerate_prompt.format(
+            destination=destination,
+            travelers=travelers,
+            travel_type=travel_type,
+            date=date,
+            activity_budget=f"{activity_budget:,}",
+            preferences=preferences or "None specified",
+            current=json.dumps(current or [], ensure_ascii=False),
+            exclude=", ".join(exclude or []) or "None",
+            activities=activities
+        )
         
-        # Try to extract JSON from output
-        itinerary = _extract_json_from_output(output)
+        async with planner_pool.aacquire() as pooled:
+            output = (await pooled.llm.ainvoke(prompt, config=config)).content
         
-        if itinerary:
-            return {
-                "success": True,
-                "itinerary": itinerary,
-                "tools_used": tools_called,
-                "raw_output": output
-            }
+        parsed = extract_json_object(output or "", predicate=lambda p: isinstance(p.get("activities"), list))
+        day_activities = _normalize_activities(parsed["activities"]) if parsed else None
+        if day_activities:
+            day_activities, _ = _drop_conflicting(destination, day_activities)
+        if day_activities is None:
+            result = {"success": False, "error": "Failed to parse day activities from LLM output.", "raw_output": output}
+        elif sum(a["estimated_cost"] for a in day_activities) > activity_budget:
+            result = {"success": False, "error": "LLM day activities exceed the remaining budget.", "raw_output": output}
         else:
-            logger.warning("Failed to parse JSON from agent output, trying fallback")
-            return {
-                "success": False,
-                "error": "Failed to parse itinerary from agent output.",
-                "raw_output": output,
-                "tools_used": tools_called
-            }
-            
+            result = {"success": True, "activities": day_activities, "raw_output": output}
+        result["tools_used"] = ["search_activities"]
+        result["llm_calls"] = 1
+    
     except Exception as e:
-        logger.error(f"Agent error: {str(e)}", exc_info=True)
-        return {
+        logger.error(f"Day regeneration error: {str(e)}", exc_info=True)
+        result = {
             "success": False,
             "error": str(e),
             "raw_output": None
         }
+    
+    result["metrics"] = instrumentation.observe()
+    return result
 
 
-def _extract_json_from_output(output: str) -> Optional[dict]:
-    """Extract JSON from agent output with improved parsing."""
-    import re
-    
-    # Try to find JSON block with various patterns
-    patterns = [
-        r'```json\s*(\{[\s\S]*?\})\s*```',  # Markdown JSON block
-        r'```\s*(\{[\s\S]*?\})\s*```',      # Generic code block
-        r'(\{[\s\S]*?\})'                    # Raw JSON
+def _normalize_activities(activities: list) -> Optional[list[dict]]:
+    """Paksa aktivitas dari LLM ke bentuk schema Activity; None jika tidak valid."""
+    normalized = []
+    try:
+        for activity in activities:
+            normalized.append({
+                "time": str(activity.get("time") or "09:00"),
+                "name": str(activity["name"]),
+                "description": str(activity.get("description") or ""),
+                "estimated_cost": max(0, int(activity.get("estimated_cost") or 0))
+            })
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+    return normalized
+
+
+# === Helpers: tool calls & LLM completion ===
+# Batas jumlah tool call dari tahap planning, supaya plan yang kacau tidak meledak
+_MAX_PLANNED_TOOL_CALLS = 8
+
+
+def _default_tool_calls(
+    user_id: str,
+    destination: str,
+    start_date: str,
+    end_date: str,
+    travel_type: str,
+    preferences: str
+) -> list[tuple[str, Any]]:
+    """Set tool standar (mode prefetch, dan fallback plan_execute)."""
+    return [
+        ("check_calendar", {"user_id": user_id, "range_start": start_date, "range_end": end_date}),
+        ("search_hotels", {"destination": destination, "checkin": start_date, "checkout": end_date,
+                           "preferences": preferences or None}),
+        ("search_activities", {"destination": destination, "travel_type": travel_type}),
+        ("get_destination_info", destination),
     ]
+
+
+def _parse_tool_plan(output: str, user_id: str) -> list[tuple[str, Any]]:
+    """Ubah output tahap planning menjadi daftar (tool, args) yang valid."""
+    plan = extract_json_object(output or "", predicate=lambda p: isinstance(p.get("tool_calls"), list))
+    if not plan:
+        logger.warning("Plan-execute: planning output has no tool_calls, using default tools")
+        return []
     
-    for pattern in patterns:
-        matches = re.findall(pattern, output, re.DOTALL)
-        for match in matches:
-            json_str = match if isinstance(match, str) else match[0] if match else ""
-            if json_str:
-                try:
-                    parsed = json.loads(json_str)
-                    # Validate it looks like an itinerary
-                    if isinstance(parsed, dict) and "destination" in parsed:
-                        return parsed
-                except json.JSONDecodeError:
-                    continue
+    calls = []
+    for call in plan["tool_calls"][:_MAX_PLANNED_TOOL_CALLS]:
+        tool = _tools_by_name.get(call.get("tool")) if isinstance(call, dict) else None
+        if tool is None:
+            logger.warning(f"Plan-execute: ignoring unknown tool call {call}")
+            continue
+        args = call.get("args") or {}
+        if isinstance(tool, StructuredTool):
+            if not isinstance(args, dict):
+                continue
+            args = {k: v for k, v in args.items() if k in tool.args}
+            if tool.name == "check_calendar":
+                # Kalender selalu milik user yang meminta plan
+                args["user_id"] = user_id
+        elif isinstance(args, dict):
+            args = next(iter(args.values()), "")
+        calls.append((tool.name, args))
+    return calls
+
+
+async def _run_tool_calls(calls: list[tuple[str, Any]], config: dict) -> list[str]:
+    """Jalankan tool calls secara paralel; error satu tool menjadi observation."""
+    async def run(name: str, args: Any) -> str:
+        try:
+            return await _tools_by_name[name].ainvoke(args, config=config)
+        except Exception as e:
+            logger.warning(f"Tool {name} failed: {e}")
+            return f"Error: {e}"
     
-    return None
+    return await asyncio.gather(*(run(name, args) for name, args in calls))
+
+
+async def _complete(llm: BaseChatModel, prompt: str, config: dict, stream: bool = False) -> tuple[str, Optional[dict]]:
+    """
+    Satu panggilan LLM. Dengan stream=True token dikirim ke callbacks dan JSON
+    di-parse sambil token datang, tanpa scan ulang output lengkap.
+    Mengembalikan (output, itinerary atau None).
+    """
+    if not stream:
+        output = (await llm.ainvoke(prompt, config=config)).content
+        return output, _extract_json_from_output(output)
+    
+    extractor = JSONObjectExtractor()
+    chunks, itinerary = [], None
+    async for chunk in llm.astream(prompt, config=config):
+        chunks.append(chunk.content)
+        if itinerary is None:
+            itinerary = _first_itinerary(extractor.feed(chunk.content))
+    if itinerary is None:
+        itinerary = _first_itinerary(extractor.finish())
+    return "".join(chunks), itinerary
+
+
+def _looks_like_itinerary(parsed: dict) -> bool:
+    return "destination" in parsed
+
+
+def _first_itinerary(candidates: list[str]) -> Optional[dict]:
+    return next((p for p in parse_candidates(candidates) if _looks_like_itinerary(p)), None)
+
+
+def _extract_json_from_output(output: str) -> Optional[dict]:
+    """Extract the itinerary JSON object from agent output (single pass, lihat json_extract)."""
+    return extract_json_object(output or "", predicate=_looks_like_itinerary)
+
+
+# === Validasi jadwal output LLM ===
+_schedule_conflicts = metrics.counter(
+    "plan_schedule_conflicts_total", "LLM-planned activities dropped because they overlap another activity"
+)
+
+
+def _activity_durations(destination: str, activities: list[dict]) -> list[int]:
+    """
+    Durasi (menit) aktivitas dari LLM: field "duration" jika ada, lalu durasi
+    aktivitas dengan nama sama di katalog, selain itu 0 (hanya jam mulainya
+    yang diperiksa).
+    """
+    by_name = get_catalog().activities(destination).by_name
+    durations = []
+    for activity in activities:
+        known = by_name.get(normalize_text(str(activity.get("name", ""))))
+        text = activity.get("duration") or (known or {}).get("duration")
+        durations.append(parse_duration(text) if text else 0)
+    return durations
+
+
+def _drop_conflicting(destination: str, activities: list) -> tuple[list, list[dict]]:
+    """Pisahkan aktivitas yang overlap dengan aktivitas lain. Mengembalikan (dipertahankan, dibuang)."""
+    if not isinstance(activities, list) or not all(isinstance(a, dict) for a in activities):
+        return activities, []
+    # Validasi hanya membuang overlap nyata (tanpa buffer perjalanan)
+    conflicts = set(schedule_conflicts(activities, _activity_durations(destination, activities), buffer=0))
+    kept = [a for i, a in enumerate(activities) if i not in conflicts]
+    dropped = [a for i, a in enumerate(activities) if i in conflicts]
+    return kept, dropped
+
+
+def _enforce_schedule(itinerary: dict) -> list[str]:
+    """
+    Buang aktivitas yang bentrok di setiap hari itinerary (in place) dan
+    kurangi daily_cost serta total_estimated_cost sebesar biayanya.
+    Mengembalikan nama aktivitas yang dibuang.
+    """
+    dropped_names = []
+    destination = str(itinerary.get("destination", ""))
+    for day in itinerary.get("days") or []:
+        if not isinstance(day, dict):
+            continue
+        kept, dropped = _drop_conflicting(destination, day.get("activities"))
+        if not dropped:
+            continue
+        removed_cost = sum(int(a.get("estimated_cost") or 0) for a in dropped)
+        day["activities"] = kept
+        if isinstance(day.get("daily_cost"), (int, float)):
+            day["daily_cost"] -= removed_cost
+        if isinstance(itinerary.get("total_estimated_cost"), (int, float)):
+            itinerary["total_estimated_cost"] -= removed_cost
+        dropped_names.extend(str(a.get("name")) for a in dropped)
+
+    if dropped_names:
+        logger.warning(f"Dropped {len(dropped_names)} overlapping activities from LLM itinerary: {dropped_names}")
+        _schedule_conflicts.inc(len(dropped_names))
+    return dropped_names
+
+
+def _scheduled_activities(activities: list[dict]) -> list[dict]:
+    """Pasang aktivitas katalog di jendela harian sesuai durasinya (fallback planner)."""
+    slots = pack_day([parse_duration(a.get("duration")) for a in activities])
+    return [
+        {
+            "time": format_time(slot.start),
+            "end_time": format_time(slot.end),
+            "name": activities[slot.index]["name"],
+            "description": activities[slot.index]["description"],
+            "estimated_cost": activities[slot.index]["price"]
+        }
+        for slot in slots
+    ]
 
 
 # === Fallback: Rule-based Itinerary Generator ===
@@ -329,7 +1017,9 @@ def generate_itinerary_fallback(
 ) -> dict:
     """
     Fallback itinerary generator jika LLM agent gagal.
-    Menggunakan rule-based approach.
+    Menggunakan rule-based approach; aktivitas dipilih oleh engine knapsack
+    (app.planning.selection) dalam budget total dan harian, lalu dijadwalkan
+    sesuai durasinya (app.planning.scheduling).
     """
     from datetime import datetime, timedelta
     
@@ -346,43 +1036,23 @@ def generate_itinerary_fallback(
     selected_hotel = hotels[0] if hotels else {"name": "Local Guesthouse", "price_per_night": 300000}
     hotel_total = selected_hotel.get("price_per_night", 300000) * (num_days - 1)
     
-    # Remaining budget for activities
-    activity_budget = budget_idr - hotel_total
+    # Remaining budget for activities (setelah hotel dan transport lokal)
+    transport_cost = 50000 * travelers
+    activity_budget = max(0, budget_idr - hotel_total - transport_cost * num_days)
     daily_activity_budget = activity_budget // num_days
+    day_plans = select_activities(
+        activities, num_days, activity_budget, daily_activity_budget, per_day=2, travel_type=travel_type,
+        day_minutes=DAY_END_MINUTES - DAY_START_MINUTES, buffer_minutes=TRAVEL_BUFFER_MINUTES
+    )
     
     # Build days
     days = []
-    activity_idx = 0
     running_cost = 0
     
     for i in range(num_days):
         current_date = (start + timedelta(days=i)).strftime("%Y-%m-%d")
-        day_activities = []
-        day_cost = 0
-        
-        # Morning activity
-        if activity_idx < len(activities):
-            act = activities[activity_idx]
-            day_activities.append({
-                "time": "09:00",
-                "name": act["name"],
-                "description": act["description"],
-                "estimated_cost": act["price"]
-            })
-            day_cost += act["price"]
-            activity_idx += 1
-        
-        # Afternoon activity
-        if activity_idx < len(activities) and day_cost < daily_activity_budget:
-            act = activities[activity_idx]
-            day_activities.append({
-                "time": "14:00",
-                "name": act["name"],
-                "description": act["description"],
-                "estimated_cost": act["price"]
-            })
-            day_cost += act["price"]
-            activity_idx += 1
+        day_activities = _scheduled_activities(day_plans[i])
+        day_cost = sum(a["estimated_cost"] for a in day_activities)
         
         # Add lodging (except last day)
         lodging = None
@@ -391,7 +1061,7 @@ def generate_itinerary_fallback(
             day_cost += lodging["price"]
         
         # Transport estimate
-        transport = {"type": "Local transport", "estimated_cost": 50000 * travelers}
+        transport = {"type": "Local transport", "estimated_cost": transport_cost}
         day_cost += transport["estimated_cost"]
         
         running_cost += day_cost
@@ -411,7 +1081,7 @@ def generate_itinerary_fallback(
         "end_date": end_date,
         "days": days,
         "total_estimated_cost": running_cost,
-        "recommended_hotels": hotels[:3],
+        "recommended_hotels": [h.to_dict() for h in hotels[:3]],
         "notes": f"Generated using fallback planner. Adjust activities as needed. Budget remaining: {budget_idr - running_cost:,} IDR"
     }
     
@@ -420,4 +1090,39 @@ def generate_itinerary_fallback(
         "itinerary": itinerary,
         "tools_used": ["fallback_generator"],
         "raw_output": None
-    }
\ No newline at end of file
+    }
+
+
+def generate_day_activities_fallback(
+    destination: str,
+    date: str,
+    activity_budget: int,
+    travel_type: str = "culture",
+    travelers: int = 1,
+    preferences: str = "",
+    current: Optional[list[dict]] = None,
+    exclude: Optional[list[str]] = None
+) -> dict:
+    """
+    Fallback rule-based untuk regenerasi satu hari: aktivitas yang belum
+    dipakai di hari lain dan masih muat di activity_budget dipilih oleh engine
+    knapsack, lalu dijadwalkan sesuai durasinya. Aktivitas lama hari itu
+    hanya dipakai jika tidak ada pilihan lain.
+    """
+    excluded = set(exclude or [])
+    current_names = {a.get("name") for a in current or []}
+    candidates = [a for a in search_activities(destination, travel_type) if a["name"] not in excluded]
+    fresh = [a for a in candidates if a["name"] not in current_names]
+    
+    day_plan, = select_activities(
+        fresh or candidates, 1, activity_budget, per_day=2, travel_type=travel_type,
+        day_minutes=DAY_END_MINUTES - DAY_START_MINUTES, buffer_minutes=TRAVEL_BUFFER_MINUTES
+    )
+    day_activities = _scheduled_activities(day_plan)
+    
+    return {
+        "success": True,
+        "activities": day_activities,
+        "tools_used": ["fallback_generator"],
+        "raw_output": None
+    }
@@ -0,0 +1,189 @@
+"""
+Pool agent executor untuk planner.
+Menyimpan LLM client + AgentExecutor yang sudah siap pakai (warm) supaya
+setiap request tidak membangun ulang client Gemini dan prompt ReAct.
+"""
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from app.utils.concurrency import run_sync
+from app.utils.logger import logger
+
+
+class PoolExhaustedError(RuntimeError):
+    """Semua agent (pool + overflow) sedang dipakai sampai timeout."""
+
+
+@dataclass
+class PooledAgent:
+    """Satu slot pool: LLM client dan executor yang dibangun di atasnya."""
+    llm: Any
+    executor: Any
+
+
+class AgentPool:
+    """
+    Pool thread-safe untuk PooledAgent.
+
+    `size` membatasi jumlah agent idle yang disimpan. Jika semua slot sedang
+    dipakai, acquire() membangun agent baru (overflow) yang akan dibuang saat
+    dikembalikan bila pool sudah penuh. Overflow dibatasi `max_overflow`;
+    setelah itu acquire() menunggu agent dikembalikan, paling lama `timeout`
+    detik, lalu raise PoolExhaustedError.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], PooledAgent],
+        size: int = 4,
+        max_overflow: int = 4,
+        timeout: Optional[float] = 30.0
+    ):
+        self._factory = factory
+        self.size = max(1, size)
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self._idle: list[PooledAgent] = []
+        self._lock = threading.Lock()
+        self._returned = threading.Condition(self._lock)
+        # Caller async yang menunggu agent: (loop, event), di-set saat ada agent kembali
+        self._async_waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = deque()
+        self._closed = False
+        self.in_use = 0
+        self.created = 0
+        self.borrowed = 0
+
+    def start(self):
+        """Warm up pool (dipanggil dari lifespan startup)."""
+        with self._lock:
+            self._closed = False
+            missing = self.size - len(self._idle)
+
+        for _ in range(missing):
+            try:
+                agent = self._create()
+            except Exception as e:
+                logger.warning(f"Agent pool warm-up failed, agents will be built on demand: {e}")
+                break
+            with self._returned:
+                self._idle.append(agent)
+                self._notify_returned()
+
+        logger.info(f"Agent pool ready ({len(self._idle)}/{self.size} warm agents)")
+
+    def close(self):
+        """Buang semua agent idle (dipanggil dari lifespan shutdown)."""
+        with self._lock:
+            self._closed = True
+            self._idle.clear()
+        logger.info("Agent pool closed")
+
+    def _create(self) -> PooledAgent:
+        agent = self._factory()
+        with self._lock:
+            self.created += 1
+        return agent
+
+    def _has_capacity(self) -> bool:
+        return bool(self._idle) or self.in_use < self.size + self.max_overflow
+
+    def _borrow(self) -> Optional[PooledAgent]:
+        # Dipanggil dengan lock dipegang dan kapasitas tersedia
+        self.in_use += 1
+        self.borrowed += 1
+        return self._idle.pop() if self._idle else None
+
+    def _notify_returned(self):
+        # Dipanggil dengan lock dipegang. Semua waiter async dibangunkan dan mencoba lagi.
+        self._returned.notify()
+        while self._async_waiters:
+            loop, event = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Loop waiter sudah ditutup
+
+    def _take(self, timeout: Optional[float]) -> Optional[PooledAgent]:
+        """
+        Ambil agent idle, atau None jika boleh membangun overflow; slot sudah
+        dihitung in_use. Menunggu selama kapasitas habis.
+        """
+        with self._returned:
+            if not self._returned.wait_for(self._has_capacity, timeout):
+                raise PoolExhaustedError(f"All {self.size + self.max_overflow} planner agents are busy")
+            return self._borrow()
+
+    def _create_overflow(self) -> PooledAgent:
+        try:
+            return self._create()
+        except Exception:
+            with self._returned:
+                self.in_use -= 1
+                self._notify_returned()
+            raise
+
+    def checkout(self) -> PooledAgent:
+        return self._take(self.timeout) or self._create_overflow()
+
+    def checkin(self, agent: PooledAgent):
+        with self._returned:
+            self.in_use -= 1
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(agent)
+            self._notify_returned()
+
+    @contextmanager
+    def acquire(self):
+        """Pinjam agent dari pool; otomatis dikembalikan setelah selesai."""
+        agent = self.checkout()
+        try:
+            yield agent
+        finally:
+            self.checkin(agent)
+
+    async def _atake(self) -> Optional[PooledAgent]:
+        # Menunggu di event loop, bukan di thread pool: thread SYNC_WORKERS tetap
+        # bebas untuk tool call dan simpan DB milik pemegang agent.
+        loop = asyncio.get_running_loop()
+        deadline = None if self.timeout is None else loop.time() + self.timeout
+        while True:
+            waiter = (loop, asyncio.Event())
+            with self._lock:
+                if self._has_capacity():
+                    return self._borrow()
+                self._async_waiters.append(waiter)
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                await asyncio.wait_for(waiter[1].wait(), remaining)
+            except asyncio.TimeoutError:
+                raise PoolExhaustedError(f"All {self.size + self.max_overflow} planner agents are busy") from None
+            finally:
+                with self._lock:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    @asynccontextmanager
+    async def aacquire(self):
+        """
+        Versi async acquire(): menunggu agent kosong di event loop, dan agent
+        overflow (client Gemini + AgentExecutor) dibangun di thread pool.
+        """
+        agent = await self._atake() or await run_sync(self._create_overflow)
+        try:
+            yield agent
+        finally:
+            self.checkin(agent)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": self.in_use,
+                "created": self.created,
+                "borrowed": self.borrowed
+            }
@@ -0,0 +1,72 @@
+"""
+Streaming progress planning ke client lewat Server-Sent Events.
+PlanStreamHandler menerima callback LangChain (tool, LLM token) dan
+meneruskannya ke asyncio.Queue yang dibaca oleh endpoint SSE.
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+# Observation tool bisa panjang; client cukup menerima potongannya
+_MAX_TOOL_OUTPUT_CHARS = 2000
+_CLOSED = object()
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format satu event SSE."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class PlanStreamHandler(AsyncCallbackHandler):
+    """Callback handler async yang mengubah event agent menjadi event SSE."""
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._tool_names: dict[UUID, str] = {}
+
+    def emit(self, event: str, data: Optional[dict] = None):
+        self.queue.put_nowait({"event": event, "data": data or {}})
+
+    def close(self):
+        self.queue.put_nowait(_CLOSED)
+
+    async def on_llm_start(self, serialized: dict, prompts: list[str], **kwargs: Any):
+        self.emit("llm_start")
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any):
+        if token:
+            self.emit("token", {"text": token})
+
+    async def on_llm_end(self, response: Any, **kwargs: Any):
+        self.emit("llm_end")
+
+    async def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any):
+        name = (serialized or {}).get("name", "unknown")
+        self._tool_names[run_id] = name
+        self.emit("tool_start", {"tool": name, "input": input_str})
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        name = self._tool_names.pop(run_id, "unknown")
+        self.emit("tool_end", {"tool": name, "output": str(output)[:_MAX_TOOL_OUTPUT_CHARS]})
+
+    async def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        name = self._tool_names.pop(run_id, "unknown")
+        self.emit("tool_error", {"tool": name, "error": str(error)})
+
+    async def events(self, heartbeat_seconds: float = 15.0) -> AsyncIterator[Optional[dict]]:
+        """
+        Iterasi event sampai close() dipanggil.
+        Yield None setiap `heartbeat_seconds` tanpa event, untuk keep-alive.
+        """
+        while True:
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if item is _CLOSED:
+                return
+            yield item
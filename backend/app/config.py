@@ -14,6 +14,69 @@ class Settings(BaseSettings):
     LLM_BASE_URL: str
     LLM_MODEL: str
     
+    # LLM backend: "gemini" | "record" (Gemini + rekam ke cassette) | "replay" (offline)
+    LLM_BACKEND: str = "gemini"
+    LLM_CASSETTE_PATH: str = "data/cassettes/planner.json"
+    LLM_REPLAY_LATENCY_SECONDS: float = 0.0
+    LLM_REPLAY_CHUNK_DELAY_SECONDS: float = 0.0
+    
+    # Context caching prefix prompt statis: "gemini" | "local" (simulasi) | "none"
+    PROMPT_CACHE_BACKEND: str = "gemini"
+    PROMPT_CACHE_TTL_SECONDS: int = 3600
+    
+    # Planner
+    PLANNER_MODE: str = "react"  # "react" | "prefetch" | "plan_execute"
+    PLAN_EXECUTE_MAX_LLM_CALLS: int = 3  # Default batas panggilan LLM mode plan_execute
+    
+    # Hedged planning: batas waktu LLM sebelum fallback provisional (0 = nonaktif)
+    PLAN_HEDGE_DEADLINE_SECONDS: float = 0
+    PLAN_HEDGE_UPGRADE: bool = True  # Ganti itinerary provisional saat LLM selesai
+    
+    # Async plan jobs
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_MAX_DEPTH: int = 100
+    JOB_QUEUE_MAX_PER_USER: int = 5
+    
+    # Batch plan (POST /api/v1/plan/batch)
+    BATCH_CONCURRENCY: int = 4
+    
+    # Agent pool
+    AGENT_POOL_SIZE: int = 4
+    AGENT_POOL_MAX_OVERFLOW: int = 4  # Agent sementara di atas AGENT_POOL_SIZE
+    AGENT_POOL_TIMEOUT_SECONDS: float = 30.0  # Tunggu agent kosong sebelum PoolExhaustedError
+    SYNC_WORKERS: int = 16  # Thread pool untuk kode blocking di jalur async
+    
+    # Itinerary cache
+    ITINERARY_CACHE_ENABLED: bool = True
+    ITINERARY_CACHE_TTL_SECONDS: int = 3600
+    ITINERARY_CACHE_FALLBACK_TTL_SECONDS: int = 300
+    ITINERARY_CACHE_MAX_ENTRIES: int = 512
+    ITINERARY_CACHE_BUDGET_BUCKET_IDR: int = 100_000
+    ITINERARY_CACHE_CANONICAL_PREFERENCES: bool = True
+    
+    # Tool memoization (TTL dalam detik, 0 = nonaktif)
+    TOOL_CACHE_TTLS: dict[str, int] = {
+        "search_hotels": 300,
+        "search_flights": 60,
+        "search_activities": 900,
+        "check_calendar": 60,
+        "get_destination_info": 3600
+    }
+    TOOL_CACHE_DEFAULT_TTL_SECONDS: int = 300
+    TOOL_CACHE_MAX_ENTRIES: int = 1024
+    
+    # Katalog inventory: folder export hotels/activities/flights (.json/.csv), kosong = data mock bawaan
+    CATALOG_DIR: str = ""
+    
+    # Observation encoding untuk LLM
+    OBSERVATION_FORMAT: str = "table"  # "table" | "json" (JSON compact per baris)
+    OBSERVATION_TOP_K: dict[str, int] = {
+        "search_hotels": 5,
+        "search_flights": 3,
+        "search_activities": 8
+    }
+    OBSERVATION_TOKEN_BUDGET: int = 3000  # Per run agent, 0 = tanpa batas
+    
     # Security
     REQUIRE_BOOKING_CONFIRMATION: bool = True
     MAX_BUDGET_IDR: int = 50_000_000
@@ -1,3 +1,4 @@
+from fastapi import Depends
 from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -61,9 +62,13 @@ class AuditLogDB(Base):
 def init_db():
     Base.metadata.create_all(bind=engine)
 
-def get_db():
-    db = SessionLocal()
+def get_session_factory() -> sessionmaker:
+    """Factory session untuk request; juga dipakai kerja yang berjalan setelah request selesai."""
+    return SessionLocal
+
+def get_db(session_factory: sessionmaker = Depends(get_session_factory)):
+    db = session_factory()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -4,14 +4,20 @@ FastAPI application with LangChain agent for AI-powered vacation planning.
 """
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import time
 
 from app.config import settings
 from app.database import init_db
 from app.routers import plans, bookings
+from app.agents.planner import planner_pool
+from app.agents.llm_backends import flush_cassettes
+from app.agents.jobs import plan_job_queue
+from app.tools.catalog import load_catalog
+from app.utils.concurrency import shutdown_executor
 from app.utils.logger import logger
+from app.utils.metrics import metrics
 
 # === Lifespan Events ===
 @asynccontextmanager
@@ -20,15 +26,23 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting Vacation Planner API...")
     init_db()
     logger.info("✅ Database initialized")
+    load_catalog()
     
     # Create logs directory
     import os
     os.makedirs("logs", exist_ok=True)
     
+    planner_pool.start()
+    await plan_job_queue.start()
+    
     yield
     
     # Shutdown
     logger.info("👋 Shutting down Vacation Planner API...")
+    await plan_job_queue.stop()
+    planner_pool.close()
+    flush_cassettes()
+    shutdown_executor()
 
 # === Create App ===
 app = FastAPI(
@@ -74,7 +88,11 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "create_plan": "POST /api/v1/plan",
+            "create_plan_stream": "POST /api/v1/plan/stream",
+            "create_plan_batch": "POST /api/v1/plan/batch",
+            "create_multi_city_plan": "POST /api/v1/plan/multi-city",
             "get_plan": "GET /api/v1/plan/{plan_id}",
+            "regenerate_day": "POST /api/v1/plan/{plan_id}/days/{date}/regenerate",
             "confirm_booking": "POST /api/v1/plan/{plan_id}/confirm",
             "list_bookings": "GET /api/v1/bookings"
         }
@@ -88,6 +106,10 @@ async def health_check():
         "llm_url": settings.LLM_BASE_URL
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return metrics.render()
+
 # === Error Handlers ===
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -4,28 +4,46 @@ Pydantic models for request/response schemas.
 """
 from .schemas import (
     TravelType,
+    PlannerMode,
     BookingStatus,
     BookingType,
     PlanRequest,
+    BatchPlanRequest,
+    MultiCityPlanRequest,
+    DayRegenerateRequest,
     BookingConfirmRequest,
     Activity,
     DayPlan,
     Itinerary,
     PlanResponse,
     BookingResponse,
-    BookingConfirmResponse
+    BookingConfirmResponse,
+    CityStop,
+    FlightLeg,
+    MultiCityPlanResponse,
+    BatchPlanItem,
+    BatchPlanResponse
 )
 
 __all__ = [
     "TravelType",
+    "PlannerMode",
     "BookingStatus", 
     "BookingType",
     "PlanRequest",
+    "BatchPlanRequest",
+    "MultiCityPlanRequest",
+    "DayRegenerateRequest",
     "BookingConfirmRequest",
     "Activity",
     "DayPlan",
     "Itinerary",
     "PlanResponse",
     "BookingResponse",
-    "BookingConfirmResponse"
+    "BookingConfirmResponse",
+    "CityStop",
+    "FlightLeg",
+    "MultiCityPlanResponse",
+    "BatchPlanItem",
+    "BatchPlanResponse"
 ]
\ No newline at end of file
@@ -11,6 +11,11 @@ class TravelType(str, Enum):
     CULTURE = "culture"
     NATURE = "nature"
 
+class PlannerMode(str, Enum):
+    REACT = "react"        # Loop ReAct penuh, LLM memilih tool sendiri
+    PREFETCH = "prefetch"  # Tool dipanggil di depan, satu panggilan LLM
+    PLAN_EXECUTE = "plan_execute"  # LLM memilih tool sekali, tool dijalankan, lalu satu sintesis
+
 class BookingStatus(str, Enum):
     PENDING = "pending"
     CONFIRMED = "confirmed"
@@ -33,6 +38,34 @@ class PlanRequest(BaseModel):
     travel_type: TravelType = TravelType.CULTURE
     travelers: int = Field(default=1, ge=1, le=10)
     preferences: Optional[str] = Field(None, example="prefer homestay, local food")
+    bypass_cache: bool = Field(default=False, description="Skip the itinerary cache and always run the planner")
+    planner_mode: Optional[PlannerMode] = Field(None, description="Planner strategy; defaults to PLANNER_MODE setting")
+    async_job: bool = Field(default=False, description="Queue the plan and return 202 immediately; poll GET /api/v1/plan/{plan_id}")
+    max_llm_calls: Optional[int] = Field(None, ge=1, le=10, description="Hard cap on LLM calls for the plan_execute planner")
+    hedge_deadline_seconds: Optional[float] = Field(None, gt=0, description="Return a provisional rule-based itinerary if the LLM misses this deadline")
+
+class BatchPlanRequest(BaseModel):
+    # async_job dan hedge_deadline_seconds per item diabaikan: batch selalu sinkron
+    plans: list[PlanRequest] = Field(..., min_length=1, max_length=50)
+
+class MultiCityPlanRequest(BaseModel):
+    user_id: str = "user_1"
+    destinations: list[str] = Field(..., min_length=1, max_length=8, example=["Yogyakarta", "Bali"])
+    origin: str = Field(default="Jakarta", description="Departure city; also the return city when round_trip is set")
+    start_date: date = Field(..., example="2025-12-20")
+    end_date: date = Field(..., example="2025-12-27")
+    budget_idr: int = Field(..., ge=500000, le=50000000, example=10000000)
+    travel_type: TravelType = TravelType.CULTURE
+    travelers: int = Field(default=1, ge=1, le=10)
+    preferences: Optional[str] = Field(None, example="prefer homestay")
+    round_trip: bool = True
+    generate_itineraries: bool = Field(default=False, description="Also plan a day-by-day itinerary for every stop")
+
+class DayRegenerateRequest(BaseModel):
+    # Preferensi tidak disimpan di PlanDB, jadi dikirim ulang oleh client
+    travel_type: TravelType = TravelType.CULTURE
+    travelers: int = Field(default=1, ge=1, le=10)
+    preferences: Optional[str] = Field(None, example="more outdoor, less temples")
 
 class BookingConfirmRequest(BaseModel):
     plan_id: str
@@ -71,6 +104,9 @@ class PlanResponse(BaseModel):
     created_at: datetime
     itinerary: Optional[Itinerary] = None
     message: Optional[str] = None
+    provisional: bool = False
+    llm_calls: Optional[int] = None
+    agent_metrics: Optional[dict] = None
 
 class BookingResponse(BaseModel):
     booking_id: str
@@ -86,4 +122,58 @@ class BookingConfirmResponse(BaseModel):
     plan_id: str
     bookings: list[BookingResponse]
     total_charged: int
-    message: str
\ No newline at end of file
+    message: str
+
+class CityStop(BaseModel):
+    city: str
+    checkin: str
+    checkout: str
+    nights: int
+    hotel: Optional[dict] = None
+    lodging_cost: int
+    activity_cost: int
+    transport_cost: int
+    estimated_cost: int
+    activities: list[str]
+
+class FlightLeg(BaseModel):
+    origin: str
+    destination: str
+    date: str
+    flight_id: Optional[str] = None
+    airline: Optional[str] = None
+    departure: Optional[str] = None
+    price: int
+    cost: int
+    estimated: bool = Field(default=False, description="Fare estimated from the hub fare and distance")
+
+class MultiCityPlanResponse(BaseModel):
+    user_id: str
+    origin: str
+    round_trip: bool
+    start_date: str
+    end_date: str
+    stops: list[CityStop]
+    flights: list[FlightLeg]
+    flight_cost: int
+    lodging_cost: int
+    activity_cost: int
+    transport_cost: int
+    total_estimated_cost: int
+    within_budget: bool
+    solver_ms: float
+    itineraries: Optional[list[Optional[Itinerary]]] = None
+
+class BatchPlanItem(BaseModel):
+    index: int
+    success: bool
+    plan: Optional[PlanResponse] = None
+    error: Optional[str] = None
+
+class BatchPlanResponse(BaseModel):
+    batch_id: str
+    total: int
+    succeeded: int
+    failed: int
+    groups: int
+    items: list[BatchPlanItem]
@@ -0,0 +1,22 @@
+"""
+Engine optimasi deterministik untuk planner (tanpa LLM).
+"""
+from .selection import (
+    score_activities,
+    knapsack_select,
+    select_activities
+)
+from .multicity import (
+    solve_route,
+    split_nights,
+    plan_multi_city
+)
+
+__all__ = [
+    "score_activities",
+    "knapsack_select",
+    "select_activities",
+    "solve_route",
+    "split_nights",
+    "plan_multi_city"
+]
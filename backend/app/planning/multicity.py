@@ -0,0 +1,373 @@
+"""
+Solver rute multi-kota (mis. Yogyakarta + Bali dalam satu trip).
+Dua tahap, keduanya eksak:
+1. Urutan kota: Held-Karp (DP bitmask) di atas matriks tarif per leg
+   (asal -> tujuan), mulai dari origin dan opsional kembali ke origin.
+   O(2^n * n^2), < 5ms untuk 8 kota. Leg tanpa penerbangan bernilai inf.
+2. Pembagian malam: multiple-choice knapsack per kota. Setiap kota mendapat
+   minimal satu malam; nilai n malam = skor 2n aktivitas terbaik di kota itu
+   (diminishing return), biayanya = hotel + aktivitas + transport lokal.
+   Nilai dimaksimalkan dalam sisa budget setelah tiket pesawat; DP
+   divektorisasi dengan NumPy di atas budget yang dikuantisasi.
+Tarif per leg: katalog penerbangan di-key per destinasi saja, dengan harga
+yang dikutip dari hub (FARE_HUB, origin default search_flights). Leg dari
+kota lain diestimasi dengan model jarak: tarif hub -> tujuan dikali
+jarak(asal, tujuan) / jarak(hub, tujuan), dibatasi FARE_FACTOR_RANGE.
+Leg menuju hub memakai tarif hub -> asal (diasumsikan simetris). Kota tanpa
+koordinat memakai tarif hub apa adanya. Leg hasil estimasi ditandai
+"estimated" di output.
+Harga penerbangan diasumsikan tidak bergantung tanggal saat memilih urutan;
+penerbangan untuk tanggal sebenarnya dicari ulang setelah rute terpilih.
+"""
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+from app.planning.selection import score_activities
+from app.tools.catalog import resolve_destination
+from app.tools.destinations import normalize_destination
+from app.tools.search import search_activities, search_flights, search_hotels
+from app.utils.metrics import metrics
+
+MAX_CITIES = 8
+ACTIVITIES_PER_DAY = 2
+LOCAL_TRANSPORT_PER_DAY = 50000  # Per traveler, sama dengan fallback planner
+MAX_BUDGET_CELLS = 512
+
+FARE_HUB = "jakarta"
+FARE_FACTOR_RANGE = (0.5, 2.0)
+# (lintang, bujur) bandara utama per key kanonik, untuk model tarif berbasis jarak
+CITY_COORDINATES: dict[str, tuple[float, float]] = {
+    "jakarta": (-6.13, 106.66),
+    "bandung": (-6.90, 107.58),
+    "yogyakarta": (-7.90, 110.06),
+    "malang": (-7.93, 112.71),
+    "surabaya": (-7.38, 112.79),
+    "bali": (-8.75, 115.17),
+    "lombok": (-8.76, 116.28),
+    "makassar": (-5.06, 119.55),
+    "medan": (3.64, 98.88),
+}
+
+_solver_seconds = metrics.histogram(
+    "multi_city_solver_seconds", "Multi-city route and night split solve time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+
+
+@dataclass
+class CityOption:
+    """Data biaya dan nilai satu kota untuk solver."""
+    name: str
+    nightly_cost: int
+    hotel: Optional[dict]
+    activities: list[dict] = field(default_factory=list)  # urut skor tertinggi dulu
+    activity_scores: list[float] = field(default_factory=list)
+
+    def day_tables(self, max_nights: int, daily_transport: int) -> tuple[np.ndarray, np.ndarray]:
+        """(nilai, biaya) untuk 0..max_nights malam di kota ini."""
+        nights = np.arange(max_nights + 1)
+        taken = np.minimum(nights * ACTIVITIES_PER_DAY, len(self.activities))
+        score_sum = np.concatenate(([0.0], np.cumsum(self.activity_scores)))
+        price_sum = np.concatenate(([0], np.cumsum([a.get("price", 0) for a in self.activities])))
+        values = score_sum[taken]
+        costs = nights * (self.nightly_cost + daily_transport) + price_sum[taken]
+        return values, costs.astype(np.int64)
+
+
+def solve_route(flight_costs: np.ndarray, round_trip: bool = True) -> tuple[list[int], int]:
+    """
+    Held-Karp. flight_costs[i][j] = biaya i -> j (inf jika tidak ada
+    penerbangan), index 0 = origin dan 1..n = kota. Mengembalikan (urutan
+    index kota, total biaya penerbangan). Raise ValueError jika tidak ada
+    rute yang mengunjungi semua kota.
+    """
+    n = len(flight_costs) - 1
+    if n == 0:
+        return [], 0
+    cost = flight_costs.tolist()
+    full = (1 << n) - 1
+    inf = float("inf")
+    # best[mask][j]: biaya termurah dari origin mengunjungi mask dan berakhir di kota j
+    best = [[inf] * n for _ in range(1 << n)]
+    parent = [[-1] * n for _ in range(1 << n)]
+    for j in range(n):
+        best[1 << j][j] = cost[0][j + 1]
+
+    for mask in range(1, full + 1):
+        row = best[mask]
+        for j in range(n):
+            base = row[j]
+            if base == inf or not (mask >> j) & 1:
+                continue
+            from_j = cost[j + 1]
+            for k in range(n):
+                if (mask >> k) & 1:
+                    continue
+                nxt = mask | (1 << k)
+                candidate = base + from_j[k + 1]
+                if candidate < best[nxt][k]:
+                    best[nxt][k] = candidate
+                    parent[nxt][k] = j
+
+    ends = [best[full][j] + (cost[j + 1][0] if round_trip else 0) for j in range(n)]
+    last = min(range(n), key=lambda j: ends[j])
+    if ends[last] == inf:
+        raise ValueError("No flight route visits every destination")
+    order, mask = [], full
+    while last != -1:
+        order.append(last + 1)
+        mask, last = mask ^ (1 << last), parent[mask][last]
+    return order[::-1], int(min(ends))
+
+
+def split_nights(
+    values: list[np.ndarray],
+    costs: list[np.ndarray],
+    total_nights: int,
+    budget: int,
+    min_nights: int = 1
+) -> Optional[list[int]]:
+    """
+    Bagi total_nights ke setiap kota (minimal min_nights) dengan total nilai
+    maksimum dan total biaya <= budget; biaya terendah jika nilainya sama.
+    None jika tidak ada pembagian yang muat di budget.
+    """
+    count = len(values)
+    if budget < 0 or total_nights < min_nights * count:
+        return None
+
+    quantum = max(1, -(-budget // MAX_BUDGET_CELLS))
+    cells = budget // quantum
+    weights = [-(-c // quantum) for c in costs]
+
+    # dp[n, c] = nilai terbaik dengan n malam terpakai dan bobot <= c
+    dp = np.full((total_nights + 1, cells + 1), -np.inf)
+    dp[0, :] = 0.0
+    choices = []
+    for i in range(count):
+        new = np.full_like(dp, -np.inf)
+        choice = np.zeros(dp.shape, dtype=np.int16)
+        reserved = min_nights * (count - 1 - i)
+        for nights in range(min_nights, total_nights - reserved + 1):
+            w = int(weights[i][nights])
+            if w > cells:
+                continue
+            candidate = dp[:total_nights + 1 - nights, :cells + 1 - w] + values[i][nights]
+            target = new[nights:, w:]
+            better = candidate > target
+            new[nights:, w:] = np.where(better, candidate, target)
+            choice[nights:, w:] = np.where(better, nights, choice[nights:, w:])
+        dp = new
+        choices.append(choice)
+
+    if not np.isfinite(dp[total_nights]).any():
+        return None
+    # argmax mengambil sel bobot terkecil di antara nilai yang sama
+    c = int(np.argmax(dp[total_nights]))
+    n = total_nights
+    split = [0] * count
+    for i in range(count - 1, -1, -1):
+        nights = int(choices[i][n, c])
+        split[i] = nights
+        n -= nights
+        c -= int(weights[i][nights])
+    return split
+
+
+def min_cost_split(costs: list[np.ndarray], total_nights: int, min_nights: int = 1) -> list[int]:
+    """Pembagian malam dengan biaya total terendah (dipakai saat budget tidak cukup)."""
+    count = len(costs)
+    inf = float("inf")
+    best = [0] + [inf] * total_nights
+    picks = []
+    for i in range(count):
+        nxt, pick = [inf] * (total_nights + 1), [0] * (total_nights + 1)
+        for used in range(total_nights + 1):
+            if best[used] == inf:
+                continue
+            for nights in range(min_nights, total_nights - used + 1):
+                candidate = best[used] + int(costs[i][nights])
+                if candidate < nxt[used + nights]:
+                    nxt[used + nights], pick[used + nights] = candidate, nights
+        best = nxt
+        picks.append(pick)
+
+    split, n = [0] * count, total_nights
+    for i in range(count - 1, -1, -1):
+        split[i] = picks[i][n]
+        n -= split[i]
+    return split
+
+
+def _cheapest_flight(destination: str, departure_date: str, origin: str) -> Optional[dict]:
+    flights = search_flights(destination, departure_date, origin)
+    return min(flights, key=lambda f: f["price"]) if flights else None
+
+
+def _place_key(name: str) -> str:
+    return resolve_destination(name) or normalize_destination(name)
+
+
+def _distance_km(a: tuple[float, float], b: tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+
+def _fare_factor(origin: str, destination: str) -> float:
+    """Pengali tarif hub -> tujuan untuk leg origin -> tujuan (1.0 jika koordinat tidak dikenal)."""
+    coords = [CITY_COORDINATES.get(key) for key in (FARE_HUB, origin, destination)]
+    if None in coords:
+        return 1.0
+    hub, start, end = coords
+    low, high = FARE_FACTOR_RANGE
+    return min(high, max(low, _distance_km(start, end) / max(_distance_km(hub, end), 1.0)))
+
+
+def leg_fare(origin: str, destination: str, departure_date: str) -> Optional[tuple[dict, int, bool]]:
+    """
+    (penerbangan katalog, tarif per orang, estimated) untuk leg origin -> destination;
+    None jika tidak ada penerbangan.
+    """
+    start, end = _place_key(origin), _place_key(destination)
+    if start == FARE_HUB:
+        flight = _cheapest_flight(destination, departure_date, origin)
+        return (flight, flight["price"], False) if flight else None
+    if end == FARE_HUB:
+        # Katalog hanya punya tarif dari hub; arah sebaliknya dianggap sama
+        flight = _cheapest_flight(origin, departure_date, destination)
+        return (flight, flight["price"], True) if flight else None
+    flight = _cheapest_flight(destination, departure_date, origin)
+    if flight is None:
+        return None
+    factor = _fare_factor(start, end)
+    return flight, int(round(flight["price"] * factor, -3)), factor != 1.0
+
+
+def _city_option(city: str, start_date: str, end_date: str, travel_type: Optional[str], preferences: Optional[str]) -> CityOption:
+    hotels = search_hotels(city, start_date, end_date, preferences)
+    hotel = min(hotels, key=lambda h: h["price_per_night"]) if hotels else None
+    activities = search_activities(city, travel_type)
+    scores = score_activities(activities, travel_type)
+    # Skor tertinggi dulu, yang lebih murah jika skornya sama
+    order = sorted(range(len(activities)), key=lambda i: (-scores[i], activities[i].get("price", 0)))
+    return CityOption(
+        name=city,
+        nightly_cost=hotel["price_per_night"] if hotel else 0,
+        hotel=hotel,
+        activities=[activities[i] for i in order],
+        activity_scores=[float(scores[i]) for i in order]
+    )
+
+
+def plan_multi_city(
+    destinations: list[str],
+    start_date: str,
+    end_date: str,
+    budget_idr: int,
+    origin: str = "Jakarta",
+    travel_type: Optional[str] = None,
+    travelers: int = 1,
+    preferences: Optional[str] = None,
+    round_trip: bool = True
+) -> dict:
+    """
+    Pilih urutan kota dan jumlah malam per kota. Raise ValueError jika jumlah
+    kota tidak valid atau malamnya tidak cukup (minimal satu malam per kota).
+    """
+    if not destinations or len(destinations) > MAX_CITIES:
+        raise ValueError(f"Multi-city plans support 1 to {MAX_CITIES} destinations")
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    total_nights = (datetime.strptime(end_date, "%Y-%m-%d") - start).days
+    if total_nights < len(destinations):
+        raise ValueError(f"{len(destinations)} destinations need at least {len(destinations)} nights, got {total_nights}")
+
+    started = time.perf_counter()
+    places = [origin, *destinations]
+    cities = [_city_option(city, start_date, end_date, travel_type, preferences) for city in destinations]
+
+    # Matriks tarif per leg (per rombongan); index 0 = origin, inf = tidak ada penerbangan
+    size = len(places)
+    flight_costs = np.zeros((size, size))
+    for i in range(size):
+        for j in range(size):
+            if i != j:
+                leg = leg_fare(places[i], places[j], start_date)
+                flight_costs[i, j] = leg[1] * travelers if leg else np.inf
+
+    order, flight_total = solve_route(flight_costs, round_trip=round_trip)
+    ordered = [cities[i - 1] for i in order]
+
+    daily_transport = LOCAL_TRANSPORT_PER_DAY * travelers
+    tables = [city.day_tables(total_nights, daily_transport) for city in ordered]
+    values = [v for v, _ in tables]
+    costs = [c for _, c in tables]
+    split = split_nights(values, costs, total_nights, budget_idr - flight_total)
+    if split is None:
+        split = min_cost_split(costs, total_nights)
+
+    stops, flights = [], []
+    checkin, previous = start, origin
+    for city, nights, city_costs in zip(ordered, split, costs):
+        checkout = checkin + timedelta(days=nights)
+        leg = leg_fare(previous, city.name, checkin.strftime("%Y-%m-%d"))
+        if leg:
+            flights.append(_flight_leg(previous, city.name, checkin, leg, travelers))
+        planned = city.activities[:nights * ACTIVITIES_PER_DAY]
+        stops.append({
+            "city": city.name,
+            "checkin": checkin.strftime("%Y-%m-%d"),
+            "checkout": checkout.strftime("%Y-%m-%d"),
+            "nights": nights,
+            "hotel": {k: city.hotel[k] for k in ("id", "name", "price_per_night", "rating")} if city.hotel else None,
+            "lodging_cost": nights * city.nightly_cost,
+            "activity_cost": sum(a.get("price", 0) for a in planned),
+            "transport_cost": nights * daily_transport,
+            "estimated_cost": int(city_costs[nights]),
+            "activities": [a["name"] for a in planned]
+        })
+        checkin, previous = checkout, city.name
+    if round_trip:
+        leg = leg_fare(previous, origin, checkin.strftime("%Y-%m-%d"))
+        if leg:
+            flights.append(_flight_leg(previous, origin, checkin, leg, travelers))
+
+    flight_cost = sum(f["cost"] for f in flights)
+    total = flight_cost + sum(s["estimated_cost"] for s in stops)
+    elapsed = time.perf_counter() - started
+    _solver_seconds.observe(elapsed)
+    return {
+        "origin": origin,
+        "round_trip": round_trip,
+        "start_date": start_date,
+        "end_date": end_date,
+        "stops": stops,
+        "flights": flights,
+        "flight_cost": flight_cost,
+        "lodging_cost": sum(s["lodging_cost"] for s in stops),
+        "activity_cost": sum(s["activity_cost"] for s in stops),
+        "transport_cost": sum(s["transport_cost"] for s in stops),
+        "total_estimated_cost": total,
+        "within_budget": total <= budget_idr,
+        "solver_ms": round(elapsed * 1000, 2)
+    }
+
+
+def _flight_leg(origin: str, destination: str, date: datetime, leg: tuple[dict, int, bool], travelers: int) -> dict:
+    flight, price, estimated = leg
+    return {
+        "origin": origin,
+        "destination": destination,
+        "date": date.strftime("%Y-%m-%d"),
+        "flight_id": flight.get("id"),
+        "airline": flight.get("airline"),
+        "departure": flight.get("departure"),
+        "price": price,
+        "cost": price * travelers,
+        "estimated": estimated
+    }
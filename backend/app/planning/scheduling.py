@@ -0,0 +1,148 @@
+"""
+Penjadwalan aktivitas berdasarkan durasi sebenarnya.
+- Durasi teks ("4 hours", "full day", "1h30m") di-parse sekali ke menit
+  (di-cache per string).
+- Fallback planner: aktivitas satu hari dipasang berurutan di jendela harian
+  dengan buffer perjalanan di antaranya.
+- Validasi output LLM: weighted interval scheduling (urut waktu selesai +
+  bisect, O(n log n)) memilih subset aktivitas yang tidak bentrok;
+  aktivitas yang bentrok dibuang dan biaya disesuaikan.
+"""
+import bisect
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+DEFAULT_DURATION_MINUTES = 120
+DAY_START_MINUTES = 8 * 60
+DAY_END_MINUTES = 21 * 60
+TRAVEL_BUFFER_MINUTES = 30
+
+_NAMED_DURATIONS = {
+    "full day": 8 * 60,
+    "whole day": 8 * 60,
+    "half day": 4 * 60,
+}
+_DURATION_PART = re.compile(r"(\d+(?:[.,]\d+)?)(?:\s*-\s*(\d+(?:[.,]\d+)?))?\s*(hours?|hrs?|h|jam|minutes?|mins?|m|menit)(?![a-z])")
+_TIME = re.compile(r"^\s*(\d{1,2})[:.](\d{2})\s*$")
+
+
+@lru_cache(maxsize=4096)
+def parse_duration(text: Optional[str]) -> int:
+    """
+    Durasi dalam menit. Rentang ("2-3 hours") memakai batas atas supaya
+    jadwal tidak terlalu padat; teks yang tidak dikenal -> DEFAULT_DURATION_MINUTES.
+    """
+    if not text:
+        return DEFAULT_DURATION_MINUTES
+    lowered = str(text).lower().strip()
+    for name, minutes in _NAMED_DURATIONS.items():
+        if name in lowered:
+            return minutes
+
+    total = 0.0
+    for low, high, unit in _DURATION_PART.findall(lowered):
+        value = float((high or low).replace(",", "."))
+        total += value * 60 if unit[0] in "hj" else value
+    return int(round(total)) if total > 0 else DEFAULT_DURATION_MINUTES
+
+
+def parse_time(text: Optional[str]) -> Optional[int]:
+    """'08:30' -> 510 menit sejak tengah malam; None jika bukan jam."""
+    match = _TIME.match(str(text or ""))
+    if not match:
+        return None
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+def format_time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@dataclass(frozen=True)
+class Slot:
+    start: int
+    end: int
+    index: int  # index aktivitas pada input
+
+
+def pack_day(
+    durations: list[int],
+    day_start: int = DAY_START_MINUTES,
+    day_end: int = DAY_END_MINUTES,
+    buffer: int = TRAVEL_BUFFER_MINUTES
+) -> list[Slot]:
+    """
+    Pasang aktivitas berurutan mulai day_start dengan buffer di antaranya.
+    Aktivitas terpanjang dipasang lebih dulu (pagi); yang tidak muat sebelum
+    day_end dilewati.
+    """
+    slots = []
+    cursor = day_start
+    for index in sorted(range(len(durations)), key=lambda i: (-durations[i], i)):
+        end = cursor + durations[index]
+        if end > day_end:
+            continue
+        slots.append(Slot(cursor, end, index))
+        cursor = end + buffer
+    return slots
+
+
+def max_weight_schedule(
+    intervals: list[tuple[int, int]],
+    weights: Optional[list[float]] = None,
+    buffer: int = TRAVEL_BUFFER_MINUTES
+) -> list[int]:
+    """
+    Weighted interval scheduling: subset interval (start, end) dengan total
+    bobot maksimum sehingga setiap interval dimulai paling cepat `buffer`
+    menit setelah interval sebelumnya selesai. O(n log n).
+    Mengembalikan index terpilih, urut waktu mulai.
+    """
+    if not intervals:
+        return []
+    weights = weights or [1.0] * len(intervals)
+    order = sorted(range(len(intervals)), key=lambda i: (intervals[i][1], intervals[i][0]))
+    ends = [intervals[i][1] for i in order]
+
+    # best[j] = bobot terbaik memakai j interval pertama (urut waktu selesai)
+    best = [0.0] * (len(order) + 1)
+    take = [False] * len(order)
+    previous = [0] * len(order)
+    for j, i in enumerate(order):
+        start = intervals[i][0]
+        # Interval terakhir yang selesai <= start - buffer
+        p = bisect.bisect_right(ends, start - buffer, 0, j)
+        previous[j] = p
+        with_item = weights[i] + best[p]
+        take[j] = with_item > best[j]
+        best[j + 1] = with_item if take[j] else best[j]
+
+    chosen, j = [], len(order)
+    while j > 0:
+        if take[j - 1]:
+            chosen.append(order[j - 1])
+            j = previous[j - 1]
+        else:
+            j -= 1
+    return sorted(chosen, key=lambda i: intervals[i][0])
+
+
+def schedule_conflicts(
+    activities: list[dict],
+    durations: list[int],
+    buffer: int = TRAVEL_BUFFER_MINUTES
+) -> list[int]:
+    """
+    Index aktivitas (dengan jam yang valid) yang harus dibuang agar sisanya
+    tidak bentrok. Aktivitas tanpa jam yang bisa di-parse tidak diperiksa.
+    """
+    timed = [(i, parse_time(a.get("time"))) for i, a in enumerate(activities)]
+    timed = [(i, start) for i, start in timed if start is not None]
+    intervals = [(start, start + durations[i]) for i, start in timed]
+    kept = {timed[k][0] for k in max_weight_schedule(intervals, buffer=buffer)}
+    return [i for i, _ in timed if i not in kept]
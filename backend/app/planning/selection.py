@@ -0,0 +1,217 @@
+"""
+Pemilihan aktivitas untuk fallback planner sebagai multi-day knapsack.
+Tujuan: maksimalkan total skor (rating + kecocokan tipe) dengan batas
+jumlah aktivitas per hari, budget harian dan budget total.
+
+Langkah:
+1. Buang kandidat yang terdominasi: kandidat yang sudah dikalahkan (lebih
+   murah dan skornya lebih tinggi) oleh `max_items` kandidat lain tidak
+   mungkin masuk solusi optimal.
+2. DP knapsack 0/1 dengan batas kardinalitas di atas harga yang
+   dikuantisasi (dibulatkan ke atas, jadi solusi selalu feasible).
+   DP divektorisasi dengan NumPy: satu update array per kandidat.
+3. Bagi aktivitas terpilih ke hari (termahal dulu ke hari termurah yang
+   masih muat, termasuk durasinya bila day_minutes diberikan), lalu isi
+   slot kosong dengan kandidat sisa.
+"""
+import heapq
+from typing import Optional
+
+import numpy as np
+
+from app.planning.scheduling import parse_duration
+
+# Skor kandidat
+DEFAULT_RATING = 4.0
+TYPE_MATCH_BONUS = 1.5
+
+# Batas sel DP di sumbu budget; kuantum harga = budget / MAX_BUDGET_CELLS
+MAX_BUDGET_CELLS = 512
+# Batas ukuran tabel keputusan DP (kandidat x max_items x sel budget)
+MAX_DP_TABLE = 32_000_000
+
+
+def score_activities(activities: list[dict], travel_type: Optional[str] = None) -> np.ndarray:
+    """Skor per aktivitas: rating (default DEFAULT_RATING) + bonus jika tipenya cocok."""
+    type_lower = travel_type.lower() if travel_type else None
+    return np.array([
+        float(a.get("rating") or DEFAULT_RATING)
+        + (TYPE_MATCH_BONUS if type_lower and a.get("type") == type_lower else 0.0)
+        for a in activities
+    ], dtype=np.float64)
+
+
+def prune_dominated(costs: np.ndarray, scores: np.ndarray, max_items: int) -> np.ndarray:
+    """
+    Index kandidat yang belum dikalahkan oleh `max_items` kandidat lain yang
+    tidak lebih mahal dan skornya lebih tinggi. O(n log max_items).
+    """
+    if max_items <= 0:
+        return np.array([], dtype=np.int64)
+    order = np.lexsort((-scores, costs))
+    best: list[float] = []  # min-heap berisi max_items skor terbaik sejauh ini
+    keep = []
+    for i in order:
+        score = scores[i]
+        if len(best) < max_items:
+            heapq.heappush(best, score)
+        elif score > best[0]:
+            heapq.heapreplace(best, score)
+        else:
+            continue
+        keep.append(i)
+    return np.sort(np.array(keep, dtype=np.int64))
+
+
+def knapsack_select(costs: np.ndarray, scores: np.ndarray, budget: int, max_items: int) -> list[int]:
+    """
+    Pilih paling banyak `max_items` kandidat dengan total biaya <= budget dan
+    total skor maksimum. Mengembalikan index kandidat terpilih.
+    """
+    if max_items <= 0 or budget < 0 or len(costs) == 0:
+        return []
+
+    # Dominasi pada harga asli juga berlaku setelah kuantisasi (pembulatan monoton)
+    candidates = np.flatnonzero(costs <= budget)
+    candidates = candidates[prune_dominated(costs[candidates], scores[candidates], max_items)]
+    if len(candidates) == 0:
+        return []
+
+    # Tabel keputusan DP dibatasi MAX_DP_TABLE sel; kandidat banyak -> kuantum lebih kasar
+    max_cells = max(16, min(MAX_BUDGET_CELLS, MAX_DP_TABLE // (len(candidates) * max_items)))
+    quantum = max(1, -(-budget // max_cells))
+    cells = budget // quantum
+    weights = -(-costs.astype(np.int64) // quantum)
+    candidates = candidates[weights[candidates] <= cells]
+
+    # dp[k, c] = skor terbaik dengan tepat k aktivitas dan bobot <= c
+    dp = np.full((max_items + 1, cells + 1), -np.inf)
+    dp[0, :] = 0.0
+    taken = np.zeros((len(candidates), max_items, cells + 1), dtype=bool)
+
+    for row, i in enumerate(candidates):
+        w, v = weights[i], scores[i]
+        # Semua k diperbarui sekaligus dari dp sebelum kandidat ini (0/1)
+        with_item = dp[:-1, :cells + 1 - w] + v
+        better = with_item > dp[1:, w:]
+        dp[1:, w:] = np.where(better, with_item, dp[1:, w:])
+        taken[row, :, w:] = better
+
+    k, c = np.unravel_index(np.argmax(dp), dp.shape)
+    selected = []
+    for row in range(len(candidates) - 1, -1, -1):
+        if k == 0:
+            break
+        if taken[row, k - 1, c]:
+            i = candidates[row]
+            selected.append(int(i))
+            c -= weights[i]
+            k -= 1
+    return selected[::-1]
+
+
+def assign_to_days(
+    activities: list[dict],
+    selected: list[int],
+    scores: np.ndarray,
+    num_days: int,
+    total_budget: int,
+    daily_budget: Optional[int],
+    per_day: int,
+    durations: Optional[list[int]] = None,
+    day_minutes: Optional[int] = None,
+    buffer_minutes: int = 0
+) -> list[list[int]]:
+    """
+    Bagi index aktivitas terpilih ke hari dengan batas per_day, daily_budget
+    dan (opsional) total durasi plus buffer per hari. Kandidat yang tidak
+    muat dibuang; slot yang tersisa diisi kandidat lain dengan skor
+    tertinggi yang masih muat.
+    """
+    days: list[list[int]] = [[] for _ in range(num_days)]
+    day_costs = [0] * num_days
+    day_used = [0] * num_days
+    remaining = total_budget
+    daily_cap = daily_budget if daily_budget is not None else total_budget
+
+    def fits_time(d: int, i: int) -> bool:
+        if day_minutes is None:
+            return True
+        return day_used[d] + (buffer_minutes if days[d] else 0) + durations[i] <= day_minutes
+
+    def place(i: int) -> bool:
+        nonlocal remaining
+        price = activities[i].get("price", 0)
+        if price > remaining:
+            return False
+        open_days = [
+            d for d in range(num_days)
+            if len(days[d]) < per_day and day_costs[d] + price <= daily_cap and fits_time(d, i)
+        ]
+        if not open_days:
+            return False
+        day = min(open_days, key=lambda d: (day_costs[d], len(days[d]), d))
+        if day_minutes is not None:
+            day_used[day] += (buffer_minutes if days[day] else 0) + durations[i]
+        days[day].append(i)
+        day_costs[day] += price
+        remaining -= price
+        return True
+
+    placed = set()
+    for i in sorted(selected, key=lambda i: -activities[i].get("price", 0)):
+        if place(i):
+            placed.add(i)
+
+    if sum(len(d) for d in days) < num_days * per_day:
+        for i in np.argsort(-scores, kind="stable"):
+            if int(i) not in placed and place(int(i)):
+                placed.add(int(i))
+
+    # Dalam satu hari, aktivitas dengan skor tertinggi lebih dulu
+    return [sorted(d, key=lambda i: (-scores[i], i)) for d in days]
+
+
+def select_activities(
+    activities: list[dict],
+    num_days: int,
+    total_budget: int,
+    daily_budget: Optional[int] = None,
+    per_day: int = 2,
+    travel_type: Optional[str] = None,
+    day_minutes: Optional[int] = None,
+    buffer_minutes: int = 0
+) -> list[list[dict]]:
+    """
+    Pilih dan bagi aktivitas untuk `num_days` hari. Setiap aktivitas dipakai
+    paling banyak sekali. Dengan day_minutes, durasi aktivitas (field
+    "duration") plus buffer di antaranya harus muat dalam satu hari.
+    Mengembalikan daftar aktivitas (dict asli) per hari.
+    """
+    if num_days <= 0 or not activities:
+        return [[] for _ in range(max(num_days, 0))]
+
+    total_budget = max(0, total_budget)
+    if daily_budget is not None:
+        daily_budget = max(0, daily_budget)
+        # Budget total efektif tidak melebihi jumlah budget harian
+        total_budget = min(total_budget, daily_budget * num_days)
+
+    costs = np.array([a.get("price", 0) for a in activities], dtype=np.int64)
+    scores = score_activities(activities, travel_type)
+    durations = [parse_duration(a.get("duration")) for a in activities] if day_minutes is not None else None
+    if daily_budget is not None:
+        # Aktivitas yang lebih mahal dari budget harian tidak pernah muat
+        scores = np.where(costs <= daily_budget, scores, -np.inf)
+    if durations is not None:
+        scores = np.where(np.array(durations) <= day_minutes, scores, -np.inf)
+    eligible = np.flatnonzero(np.isfinite(scores))
+
+    selected = [int(eligible[i]) for i in knapsack_select(
+        costs[eligible], scores[eligible], total_budget, num_days * per_day
+    )]
+    days = assign_to_days(
+        activities, selected, scores, num_days, total_budget, daily_budget, per_day,
+        durations=durations, day_minutes=day_minutes, buffer_minutes=buffer_minutes
+    )
+    return [[activities[i] for i in day] for day in days]
@@ -1,25 +1,41 @@
 """
 API endpoints untuk vacation planning.
 """
+import asyncio
 import uuid
 import json
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.models.schemas import (
     PlanRequest, PlanResponse, BookingConfirmRequest, 
-    BookingConfirmResponse, BookingResponse, BookingStatus, BookingType
+    BookingConfirmResponse, BookingResponse, BookingStatus, BookingType,
+    BatchPlanRequest, BatchPlanItem, BatchPlanResponse, DayRegenerateRequest,
+    MultiCityPlanRequest, MultiCityPlanResponse
 )
-from app.database import get_db, PlanDB, BookingDB
-from app.agents.planner import generate_itinerary, generate_itinerary_fallback
+from app.config import settings
+from app.database import get_db, get_session_factory, PlanDB, BookingDB
+from app.agents.orchestrator import plan_itinerary
+from app.agents.batch import group_requests, plan_batch
+from app.agents.day_regen import apply_day_activities, find_day, regenerate_day
+from app.agents.streaming import PlanStreamHandler, format_sse
+from app.agents.jobs import (
+    PlanJob, QueueFullError, UserQueueFullError, plan_job_queue, upgrade_provisional_plan
+)
+from app.planning.multicity import plan_multi_city
 from app.tools.booking import process_payment, book_hotel, validate_booking_request
+from app.utils.concurrency import run_sync
 from app.utils.logger import audit, logger
 
 router = APIRouter(prefix="/api/v1/plan", tags=["Plans"])
 
+# Referensi kuat untuk save stream yang masih berjalan setelah client disconnect
+_background_saves: set[asyncio.Task] = set()
+
 # === HELPER: Pemeriksaan Biaya Ganda ===
 def _recalculate_cost_mock(itinerary: dict) -> int:
     """
@@ -45,67 +61,291 @@ def _recalculate_cost_mock(itinerary: dict) -> int:
     
     return total_recalculated
 
-# === POST /api/v1/plan - Create new itinerary ===
-@router.post("", response_model=PlanResponse)
-async def create_plan(request: PlanRequest, db: Session = Depends(get_db)):
-    """
-    Generate a new vacation itinerary based on user preferences.
-    """
-    plan_id = f"plan_{uuid.uuid4().hex[:12]}"
-    
-    logger.info(f"Creating plan {plan_id} for user {request.user_id}")
-    
-    # Try LLM agent first
-    try:
-        result = generate_itinerary(
-            user_id=request.user_id,
-            destination=request.destination,
-            start_date=request.start_date.isoformat(),
-            end_date=request.end_date.isoformat(),
-            budget_idr=request.budget_idr,
-            travel_type=request.travel_type.value,
-            travelers=request.travelers,
-            preferences=request.preferences or ""
-        )
+# === HELPER: Parameter & Persistensi Plan ===
+def _plan_params(request: PlanRequest) -> dict:
+    """Ubah PlanRequest menjadi argumen untuk plan_itinerary."""
+    return dict(
+        user_id=request.user_id,
+        destination=request.destination,
+        start_date=request.start_date.isoformat(),
+        end_date=request.end_date.isoformat(),
+        budget_idr=request.budget_idr,
+        travel_type=request.travel_type.value,
+        travelers=request.travelers,
+        preferences=request.preferences or "",
+        bypass_cache=request.bypass_cache,
+        planner_mode=request.planner_mode.value if request.planner_mode else None,
+        max_llm_calls=request.max_llm_calls
+    )
 
-    except Exception as e:
-        logger.warning(f"LLM agent failed (exception), using fallback: {e}")
-        # FALLBACK KARENA EXCEPTION
-        result = generate_itinerary_fallback(
-            user_id=request.user_id,
-            destination=request.destination,
-            start_date=request.start_date.isoformat(),
-            end_date=request.end_date.isoformat(),
-            budget_idr=request.budget_idr,
-            travel_type=request.travel_type.value,
-            travelers=request.travelers,
-            preferences=request.preferences or ""
-        )
-    
-    # Save to database
-    plan_record = PlanDB(
+def _plan_record(plan_id: str, request: PlanRequest, result: dict, status: str = "draft") -> PlanDB:
+    return PlanDB(
         id=plan_id,
         user_id=request.user_id,
-        status="draft",
+        status=status,
         destination=request.destination,
         start_date=request.start_date.isoformat(),
         end_date=request.end_date.isoformat(),
         budget_idr=request.budget_idr,
         itinerary_json=json.dumps(result.get("itinerary")) if result.get("itinerary") else None
     )
+
+def _save_plan(db: Session, plan_id: str, request: PlanRequest, result: dict, status: str = "draft") -> PlanDB:
+    plan_record = _plan_record(plan_id, request, result, status)
     db.add(plan_record)
     db.commit()
     
     # Audit log
     audit.log_plan_created(request.user_id, plan_id, request.destination, request.budget_idr)
-    
+    return plan_record
+
+def _save_plan_records(db: Session, records: list[PlanDB]):
+    try:
+        db.add_all(records)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def _persist_plan(session_factory: sessionmaker, plan_id: str, request: PlanRequest, result: dict, status: str = "draft") -> PlanDB:
+    """_save_plan dengan session sendiri, untuk kode di luar lifetime request (mis. SSE stream)."""
+    db = session_factory()
+    try:
+        return _save_plan(db, plan_id, request, result, status=status)
+    finally:
+        db.close()
+
+async def _save_streamed_plan(task: asyncio.Task, session_factory: sessionmaker, plan_id: str, request: PlanRequest) -> dict:
+    result = await task
+    await run_sync(_persist_plan, session_factory, plan_id, request, result)
+    return result
+
+def _log_save_failure(plan_id: str, save: asyncio.Task):
+    if not save.cancelled() and save.exception() is not None:
+        logger.error(f"Saving streamed plan {plan_id} failed: {save.exception()}")
+
+def _plan_response(plan_id: str, request: PlanRequest, result: dict, status: str = "draft") -> PlanResponse:
+    message = "Itinerary generated successfully" if result["success"] else result.get("error")
+    if result.get("provisional"):
+        message = "Provisional itinerary returned; it will be upgraded when the AI planner finishes"
     return PlanResponse(
         plan_id=plan_id,
-        status="draft",
+        status=status,
         user_id=request.user_id,
         created_at=datetime.utcnow(),
         itinerary=result.get("itinerary"),
-        message="Itinerary generated successfully" if result["success"] else result.get("error")
+        message=message,
+        provisional=bool(result.get("provisional")),
+        llm_calls=result.get("llm_calls"),
+        agent_metrics=result.get("metrics")
+    )
+
+async def _enqueue_plan(db: Session, plan_id: str, request: PlanRequest) -> PlanResponse:
+    """Serahkan plan ke worker pool dan simpan dengan status queued."""
+    job = PlanJob(plan_id=plan_id, user_id=request.user_id, params=_plan_params(request), ready=asyncio.Event())
+    try:
+        position = plan_job_queue.submit(job)
+    except UserQueueFullError as e:
+        raise HTTPException(status_code=429, detail={"error": "too_many_queued_plans", "message": str(e)})
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "plan_queue_full", "message": str(e)},
+            headers={"Retry-After": "30"}
+        )
+    
+    # Worker menunggu job.ready, jadi row queued selalu ada sebelum job jalan
+    try:
+        await run_sync(_save_plan, db, plan_id, request, {}, status="queued")
+    finally:
+        job.ready.set()
+    
+    return PlanResponse(
+        plan_id=plan_id,
+        status="queued",
+        user_id=request.user_id,
+        created_at=datetime.utcnow(),
+        message=f"Plan queued at position {position}. Poll GET /api/v1/plan/{plan_id} for the result."
+    )
+
+# === POST /api/v1/plan - Create new itinerary ===
+@router.post("", response_model=PlanResponse)
+async def create_plan(request: PlanRequest, response: Response, db: Session = Depends(get_db)):
+    """
+    Generate a new vacation itinerary based on user preferences.
+    Dengan async_job=True, plan diantrikan dan endpoint langsung mengembalikan 202.
+    """
+    plan_id = f"plan_{uuid.uuid4().hex[:12]}"
+    
+    logger.info(f"Creating plan {plan_id} for user {request.user_id}")
+    
+    if request.async_job:
+        response.status_code = 202
+        return await _enqueue_plan(db, plan_id, request)
+    
+    # Cache -> LLM agent -> fallback (lihat app.agents.orchestrator)
+    deadline = request.hedge_deadline_seconds or settings.PLAN_HEDGE_DEADLINE_SECONDS
+    saved = asyncio.Event()
+    on_upgrade = None
+    if deadline and settings.PLAN_HEDGE_UPGRADE:
+        async def on_upgrade(result: dict):
+            # Upgrade dari background menunggu row provisional tersimpan dulu
+            await saved.wait()
+            await upgrade_provisional_plan(plan_id, result)
+    result = await plan_itinerary(**_plan_params(request), hedge_deadline=deadline or None, on_upgrade=on_upgrade)
+    
+    status = "provisional" if result.get("provisional") and on_upgrade is not None else "draft"
+    try:
+        await run_sync(_save_plan, db, plan_id, request, result, status=status)
+    finally:
+        saved.set()
+    return _plan_response(plan_id, request, result, status=status)
+
+# === POST /api/v1/plan/batch - Create many itineraries at once ===
+@router.post("/batch", response_model=BatchPlanResponse)
+async def create_plan_batch(batch: BatchPlanRequest, db: Session = Depends(get_db)):
+    """
+    Generate banyak itinerary sekaligus (group tour, corporate offsite).
+    Request dengan destinasi dan tanggal sama berbagi hasil lookup tool;
+    semua PlanDB disimpan dalam satu transaksi. Hasil per item mengikuti
+    urutan input.
+    """
+    batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+    items = [_plan_params(request) for request in batch.plans]
+    
+    logger.info(f"Creating plan batch {batch_id} with {len(items)} plans")
+    results = await plan_batch(items, concurrency=settings.BATCH_CONCURRENCY)
+    
+    records, responses = [], []
+    for index, (request, result) in enumerate(zip(batch.plans, results)):
+        plan_id = f"plan_{uuid.uuid4().hex[:12]}"
+        status = "draft" if result.get("itinerary") else "failed"
+        try:
+            plan = _plan_response(plan_id, request, result, status=status)
+        except ValueError as e:
+            # Itinerary dari LLM tidak lolos validasi schema
+            responses.append(BatchPlanItem(index=index, success=False, error=f"Invalid itinerary: {e}"))
+            continue
+        records.append((request, plan_id, _plan_record(plan_id, request, result, status)))
+        responses.append(BatchPlanItem(
+            index=index, success=status == "draft", plan=plan, error=None if result.get("itinerary") else result.get("error")
+        ))
+    
+    # Satu transaksi untuk semua plan di batch, di thread pool
+    await run_sync(_save_plan_records, db, [record for _, _, record in records])
+    # plan_id dari tuple: atribut record sudah expired setelah commit (akses = query di event loop)
+    for request, plan_id, _ in records:
+        audit.log_plan_created(request.user_id, plan_id, request.destination, request.budget_idr)
+    
+    succeeded = sum(1 for item in responses if item.success)
+    return BatchPlanResponse(
+        batch_id=batch_id,
+        total=len(responses),
+        succeeded=succeeded,
+        failed=len(responses) - succeeded,
+        groups=len(group_requests(items)),
+        items=responses
+    )
+
+# === POST /api/v1/plan/multi-city - Route across several destinations ===
+@router.post("/multi-city", response_model=MultiCityPlanResponse)
+async def create_multi_city_plan(request: MultiCityPlanRequest):
+    """
+    Pilih urutan kota dan pembagian malam untuk trip multi-destinasi
+    (solver deterministik, tanpa LLM). Dengan generate_itineraries=True,
+    itinerary per kota dibuat lewat plan_itinerary secara paralel dengan
+    budget sesuai biaya kota tersebut plus bagian dari sisa budget.
+    """
+    destinations = list(dict.fromkeys(d.strip() for d in request.destinations if d.strip()))
+    if len(destinations) != len(request.destinations):
+        raise HTTPException(status_code=400, detail="Destinations must be unique and non-empty")
+    
+    logger.info(f"Solving multi-city route for user {request.user_id}: {', '.join(destinations)}")
+    try:
+        route = await run_sync(
+            plan_multi_city,
+            destinations,
+            request.start_date.isoformat(),
+            request.end_date.isoformat(),
+            request.budget_idr,
+            origin=request.origin,
+            travel_type=request.travel_type.value,
+            travelers=request.travelers,
+            preferences=request.preferences,
+            round_trip=request.round_trip
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    itineraries = None
+    if request.generate_itineraries:
+        total_nights = sum(stop["nights"] for stop in route["stops"])
+        leftover = max(0, request.budget_idr - route["total_estimated_cost"])
+        results = await asyncio.gather(*(
+            plan_itinerary(
+                user_id=request.user_id,
+                destination=stop["city"],
+                start_date=stop["checkin"],
+                end_date=stop["checkout"],
+                budget_idr=stop["estimated_cost"] + leftover * stop["nights"] // total_nights,
+                travel_type=request.travel_type.value,
+                travelers=request.travelers,
+                preferences=request.preferences or ""
+            )
+            for stop in route["stops"]
+        ), return_exceptions=True)
+        itineraries = [r.get("itinerary") if isinstance(r, dict) else None for r in results]
+    
+    return MultiCityPlanResponse(user_id=request.user_id, itineraries=itineraries, **route)
+
+# === POST /api/v1/plan/stream - Create itinerary with SSE progress ===
+@router.post("/stream")
+async def create_plan_stream(
+    request: PlanRequest,
+    session_factory: sessionmaker = Depends(get_session_factory)
+):
+    """
+    Generate itinerary sambil men-stream progress sebagai Server-Sent Events:
+    `plan_started`, `tool_start`/`tool_end`, `token`, lalu `plan_completed`
+    berisi PlanResponse yang sudah divalidasi (atau `error`).
+    """
+    plan_id = f"plan_{uuid.uuid4().hex[:12]}"
+    handler = PlanStreamHandler()
+    
+    logger.info(f"Creating plan {plan_id} (stream) for user {request.user_id}")
+    
+    # Task tidak di-cancel saat client disconnect: hasilnya tetap masuk cache
+    # sehingga retry dari client yang sama langsung mendapat cache hit.
+    task = asyncio.create_task(plan_itinerary(**_plan_params(request), callbacks=[handler]))
+    task.add_done_callback(lambda _: handler.close())
+    # Penyimpanan tidak bergantung pada generator: plan tetap tersimpan walau
+    # client disconnect sebelum event terakhir.
+    save = asyncio.create_task(_save_streamed_plan(task, session_factory, plan_id, request))
+    _background_saves.add(save)
+    save.add_done_callback(_background_saves.discard)
+    save.add_done_callback(lambda t: _log_save_failure(plan_id, t))
+    
+    async def event_stream():
+        yield format_sse("plan_started", {"plan_id": plan_id})
+        
+        async for event in handler.events():
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event["event"], event["data"])
+        
+        try:
+            result = await asyncio.shield(save)
+            response = _plan_response(plan_id, request, result)
+            yield format_sse("plan_completed", response.model_dump(mode="json"))
+        except Exception as e:
+            logger.error(f"Streaming plan {plan_id} failed: {e}")
+            yield format_sse("error", {"plan_id": plan_id, "message": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 # === GET /api/v1/plan/{plan_id} - Get plan details ===
@@ -129,7 +369,99 @@ async def get_plan(plan_id: str, db: Session = Depends(get_db)):
         status=plan.status,
         user_id=plan.user_id,
         created_at=plan.created_at,
-        itinerary=itinerary
+        itinerary=itinerary,
+        provisional=plan.status == "provisional"
+    )
+
+_DAY_SAVE_ATTEMPTS = 3
+
+def _save_regenerated_day(db: Session, plan_id: str, date: str, activities: list[dict]) -> tuple[PlanDB, dict, int]:
+    """
+    Tulis aktivitas baru satu hari ke versi terbaru plan. Update bersyarat
+    pada itinerary_json yang dibaca (compare-and-swap), jadi regenerasi hari
+    lain yang tersimpan lebih dulu tidak tertimpa; jika row berubah di antara
+    baca dan tulis, merge diulang. 409 jika plan terus berubah.
+    """
+    for _ in range(_DAY_SAVE_ATTEMPTS):
+        plan = db.query(PlanDB).filter(PlanDB.id == plan_id).populate_existing().first()
+        if not plan:
+            raise HTTPException(status_code=404, detail="Plan not found")
+        if plan.status in ("confirmed", "cancelled", "provisional"):
+            raise HTTPException(status_code=409, detail=f"Plan became {plan.status} while regenerating")
+        current = json.loads(plan.itinerary_json) if plan.itinerary_json else None
+        if not current or find_day(current, date) is None:
+            raise HTTPException(status_code=409, detail="Plan itinerary changed while regenerating")
+        
+        itinerary, delta = apply_day_activities(current, date, activities)
+        updated = db.query(PlanDB).filter(
+            PlanDB.id == plan_id, PlanDB.itinerary_json == plan.itinerary_json
+        ).update({PlanDB.itinerary_json: json.dumps(itinerary)}, synchronize_session=False)
+        db.commit()
+        if updated:
+            db.refresh(plan)
+            return plan, itinerary, delta
+    raise HTTPException(status_code=409, detail="Plan is being modified concurrently. Try again.")
+
+# === POST /api/v1/plan/{plan_id}/days/{day_date}/regenerate - Re-plan one day ===
+@router.post("/{plan_id}/days/{day_date}/regenerate", response_model=PlanResponse)
+async def regenerate_plan_day(
+    plan_id: str,
+    day_date: date,
+    request: DayRegenerateRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Susun ulang aktivitas satu hari tanpa membuat plan baru.
+    Lodging, transport dan hari lain tetap; aktivitas baru harus muat di sisa
+    budget dan total_estimated_cost diperbarui dengan selisihnya saja.
+    """
+    plan = db.query(PlanDB).filter(PlanDB.id == plan_id).first()
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    
+    if plan.status in ("confirmed", "cancelled"):
+        raise HTTPException(status_code=400, detail=f"Cannot regenerate a {plan.status} plan")
+    if plan.status == "provisional":
+        # Upgrade dari LLM di background akan menimpa perubahan ini
+        raise HTTPException(status_code=409, detail="Plan is still being generated. Try again shortly.")
+    
+    itinerary = json.loads(plan.itinerary_json) if plan.itinerary_json else None
+    if not itinerary:
+        raise HTTPException(status_code=400, detail="Plan has no itinerary")
+    
+    logger.info(f"Regenerating day {day_date} of plan {plan_id}")
+    try:
+        result = await regenerate_day(
+            itinerary,
+            day_date.isoformat(),
+            budget_idr=plan.budget_idr,
+            travel_type=request.travel_type.value,
+            travelers=request.travelers,
+            preferences=request.preferences or ""
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Day not found in itinerary")
+    
+    plan, itinerary, cost_delta = await run_sync(
+        _save_regenerated_day, db, plan_id, day_date.isoformat(), result["activities"]
+    )
+    
+    audit.log_agent_action(
+        user_id=plan.user_id,
+        agent_action="regenerate_day",
+        tools_called=result.get("tools_used", []),
+        input_summary=f"{plan_id} | {day_date} | delta {cost_delta} IDR"
+    )
+    
+    return PlanResponse(
+        plan_id=plan.id,
+        status=plan.status,
+        user_id=plan.user_id,
+        created_at=plan.created_at,
+        itinerary=itinerary,
+        message=f"Day {day_date} regenerated (cost change {cost_delta:+,} IDR)",
+        llm_calls=result.get("llm_calls"),
+        agent_metrics=result.get("metrics")
     )
 
 # === POST /api/v1/plan/{plan_id}/confirm - Confirm and book ===
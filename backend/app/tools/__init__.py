@@ -10,6 +10,11 @@ from .search import (
     get_destination_info
 )
 
+from .catalog import (
+    get_catalog,
+    load_catalog
+)
+
 from .calendar import (
     get_free_dates,
     get_busy_dates,
@@ -17,6 +22,13 @@ from .calendar import (
     find_best_travel_window
 )
 
+from .memo import (
+    memoize_tool,
+    tool_cache_stats,
+    clear_tool_caches,
+    shared_lookups
+)
+
 from .booking import (
     process_payment,
     book_hotel,
@@ -32,11 +44,19 @@ __all__ = [
     "search_flights", 
     "search_activities",
     "get_destination_info",
+    # Catalog
+    "get_catalog",
+    "load_catalog",
     # Calendar
     "get_free_dates",
     "get_busy_dates",
     "check_date_availability",
     "find_best_travel_window",
+    # Memoization
+    "memoize_tool",
+    "tool_cache_stats",
+    "clear_tool_caches",
+    "shared_lookups",
     # Booking
     "process_payment",
     "book_hotel",
@@ -0,0 +1,328 @@
+"""
+Katalog inventory travel (hotels, activities, flights).
+- Dimuat sekali dari export JSON/CSV di settings.CATALOG_DIR saat startup;
+  jenis yang tidak punya file (atau CATALOG_DIR kosong) memakai data mock
+  bawaan di app.tools.search sebagai seed.
+- Baris disimpan sebagai Record immutable (app.tools.records) dengan schema
+  bersama per jenis katalog; search tools membungkusnya dalam ResultView.
+- Index per destinasi: posisi baris diurutkan berdasarkan harga, sehingga
+  filter max_price menjadi range query dengan bisect alih-alih scan linear;
+  tipe dan amenities di-index sebagai bitmap (python int) per destinasi,
+  jadi filter preferensi adalah AND bitmap. Urutan asli file tetap
+  dipertahankan di hasil.
+
+Format file (nama: hotels / activities / flights, ekstensi .json atau .csv):
+- JSON: {"<destinasi>": [baris, ...]} atau [baris dengan field "destination", ...]
+- CSV: satu baris per item dengan kolom "destination"; amenities dipisah ";"
+Destinasi "default" dipakai untuk kota yang tidak ada di katalog.
+Alias tambahan bisa diberikan lewat destinations.json: {"<kanonik>": ["alias", ...]}.
+Nama destinasi di-resolve dulu ke key kanonik (app.tools.destinations),
+jadi "Jogja" atau "Denpasar" tidak jatuh ke data default.
+"""
+import bisect
+import csv
+import json
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.tools.destinations import DESTINATION_ALIASES, DestinationResolver, normalize_destination
+from app.tools.memo import clear_tool_caches, normalize_text
+from app.tools.preferences import amenity_keys
+from app.tools.records import Record, RecordSchema
+from app.utils.logger import logger
+
+DEFAULT_DESTINATION = "default"
+
+# Field harga yang di-index per jenis katalog
+PRICE_FIELDS = {
+    "hotels": "price_per_night",
+    "activities": "price",
+    "flights": "price",
+}
+
+
+def _split_list(value: str) -> list[str]:
+    return [item.strip() for item in value.split(";") if item.strip()]
+
+
+# Konversi kolom CSV (string) ke tipe yang dipakai tools
+_CSV_CONVERTERS = {
+    "price_per_night": lambda v: int(float(v)),
+    "price": lambda v: int(float(v)),
+    "available_seats": int,
+    "rating": float,
+    "amenities": _split_list,
+}
+
+
+class PriceIndex:
+    """Posisi baris yang diurutkan berdasarkan harga, untuk range query dengan bisect."""
+
+    __slots__ = ("prices", "positions")
+
+    def __init__(self, priced: Iterable[tuple[int, int]]):
+        ordered = sorted(priced)  # (harga, posisi): harga sama tetap urut posisi
+        self.prices = [price for price, _ in ordered]
+        self.positions = [position for _, position in ordered]
+
+    def up_to(self, max_price: Optional[int] = None) -> list[int]:
+        if max_price is None:
+            return self.positions
+        return self.positions[:bisect.bisect_right(self.prices, max_price)]
+
+
+def _bitset(ranks: list[int], size: int) -> int:
+    """Bitmap (python int) dengan bit `rank` menyala untuk setiap rank."""
+    bits = np.zeros(size, dtype=np.uint8)
+    bits[ranks] = 1
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+
+class DestinationIndex:
+    """
+    Baris satu destinasi (urutan asli) beserta index harga, nama, dan
+    bitmap tipe/amenities. Bit ke-i bitmap = baris termurah ke-i, jadi
+    filter harga <= max_price adalah mask bit rendah dan filter preferensi
+    cukup AND beberapa int.
+    """
+
+    def __init__(self, rows: list[Record], price_field: str):
+        self.rows = rows
+        priced = [(int(row.get(price_field) or 0), i) for i, row in enumerate(rows)]
+        self.by_price = PriceIndex(priced)
+        self._rank_to_position = np.array(self.by_price.positions, dtype=np.int64)
+        self.all_mask = (1 << len(rows)) - 1
+
+        types: dict[str, list[int]] = {}
+        amenities: dict[str, list[int]] = {}
+        for rank, i in enumerate(self.by_price.positions):
+            row = rows[i]
+            types.setdefault(str(row.get("type", "")).lower(), []).append(rank)
+            for amenity in row.get("amenities") or ():
+                for key in amenity_keys(amenity):
+                    amenities.setdefault(key, []).append(rank)
+        self.type_bits = {key: _bitset(ranks, len(rows)) for key, ranks in types.items()}
+        self.amenity_bits = {key: _bitset(sorted(set(ranks)), len(rows)) for key, ranks in amenities.items()}
+
+        self.by_name: dict[str, Record] = {}
+        for row in rows:
+            self.by_name.setdefault(normalize_text(str(row.get("name", ""))), row)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # === Bitmap masks ===
+    def type_mask(self, types: Optional[Iterable[str]] = None) -> int:
+        """OR bitmap tipe; semua baris jika types None."""
+        if types is None:
+            return self.all_mask
+        mask = 0
+        for type_ in types:
+            mask |= self.type_bits.get(type_.lower(), 0)
+        return mask
+
+    def amenity_mask(self, amenities: Iterable[str]) -> int:
+        """AND bitmap amenities (semua harus ada)."""
+        mask = self.all_mask
+        for amenity in amenities:
+            mask &= self.amenity_bits.get(amenity, 0)
+        return mask
+
+    def price_mask(self, max_price: Optional[int] = None) -> int:
+        if max_price is None:
+            return self.all_mask
+        return (1 << bisect.bisect_right(self.by_price.prices, max_price)) - 1
+
+    def _ranks(self, mask: int) -> np.ndarray:
+        """Rank (urut harga) dari bit yang menyala."""
+        raw = np.frombuffer(mask.to_bytes((len(self.rows) + 7) // 8, "little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+    def select(self, mask: int, limit: Optional[int] = None) -> list[Record]:
+        """Baris pada mask dalam urutan asli (limit = n baris pertama)."""
+        if not mask:
+            return []
+        if mask == self.all_mask:
+            return self.rows[:limit] if limit is not None else list(self.rows)
+        positions = np.sort(self._rank_to_position[self._ranks(mask)])[:limit]
+        return [self.rows[i] for i in positions.tolist()]
+
+    def cheapest(self, count: int, mask: Optional[int] = None) -> list[Record]:
+        """`count` baris termurah (opsional hanya dalam mask), termurah dulu."""
+        if mask is None or mask == self.all_mask:
+            return [self.rows[i] for i in self.by_price.positions[:count]]
+        return [self.rows[i] for i in self._rank_to_position[self._ranks(mask)[:count]].tolist()]
+
+    def query(self, types: Optional[Iterable[str]] = None, max_price: Optional[int] = None) -> list[Record]:
+        """Baris dengan tipe di `types` (None = semua) dan harga <= max_price, urutan asli."""
+        return self.select(self.type_mask(types) & self.price_mask(max_price))
+
+
+class Catalog:
+    """Index per destinasi untuk hotels, activities, dan flights."""
+
+    def __init__(
+        self,
+        hotels: dict[str, list[dict]],
+        activities: dict[str, list[dict]],
+        flights: dict[str, list[dict]],
+        aliases: Optional[dict[str, Iterable[str]]] = None
+    ):
+        self.indexes: dict[str, dict[str, DestinationIndex]] = {}
+        for kind, data in (("hotels", hotels), ("activities", activities), ("flights", flights)):
+            # Satu schema per jenis katalog, dipakai bersama oleh semua record
+            schema = RecordSchema.from_rows(row for rows in data.values() for row in rows)
+            self.indexes[kind] = {
+                normalize_destination(dest): DestinationIndex([Record.from_dict(schema, row) for row in rows], PRICE_FIELDS[kind])
+                for dest, rows in data.items()
+            }
+        canonical = {dest for indexes in self.indexes.values() for dest in indexes} - {DEFAULT_DESTINATION}
+        self.resolver = DestinationResolver(canonical, {**DESTINATION_ALIASES, **(aliases or {})})
+
+    def lookup(self, kind: str, destination: str) -> DestinationIndex:
+        """Index destinasi (nama di-resolve ke key kanonik); fallback ke destinasi "default"."""
+        indexes = self.indexes[kind]
+        key = self.resolver.resolve(destination)
+        index = indexes.get(key) if key else None
+        if index is None:
+            index = indexes.get(DEFAULT_DESTINATION) or DestinationIndex([], PRICE_FIELDS[kind])
+        return index
+
+    def hotels(self, destination: str) -> DestinationIndex:
+        return self.lookup("hotels", destination)
+
+    def activities(self, destination: str) -> DestinationIndex:
+        return self.lookup("activities", destination)
+
+    def flights(self, destination: str) -> DestinationIndex:
+        return self.lookup("flights", destination)
+
+    def stats(self) -> dict:
+        return {
+            kind: {"destinations": len(indexes), "rows": sum(len(i) for i in indexes.values())}
+            for kind, indexes in self.indexes.items()
+        }
+
+
+# === Loading ===
+def _read_csv(f) -> Iterable[dict]:
+    reader = csv.reader(f)
+    header = next(reader, [])
+    # Converter dicari sekali per kolom, bukan per sel
+    columns = [(name, _CSV_CONVERTERS.get(name)) for name in header]
+    for values in reader:
+        yield {
+            name: convert(value) if convert else value
+            for (name, convert), value in zip(columns, values)
+            if value != ""
+        }
+
+
+def _group(rows: Iterable[dict]) -> dict[str, list[dict]]:
+    grouped: dict[str, list[dict]] = {}
+    for row in rows:
+        destination = str(row.pop("destination", "") or DEFAULT_DESTINATION)
+        grouped.setdefault(destination, []).append(row)
+    return grouped
+
+
+def read_catalog_file(path: str) -> dict[str, list[dict]]:
+    """Baca satu file katalog (.json / .csv) menjadi {destinasi: [baris]}."""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            return _group(_read_csv(f))
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return {dest: [dict(row) for row in rows] for dest, rows in data.items()}
+    return _group(dict(row) for row in data)
+
+
+def read_aliases(path: str) -> dict[str, list[str]]:
+    """destinations.json: {"<destinasi kanonik>": ["alias", ...]}."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {key: list(DESTINATION_ALIASES.get(key, ())) + list(names) for key, names in data.items()}
+
+
+def _find_file(directory: str, kind: str) -> Optional[str]:
+    for ext in (".json", ".csv"):
+        path = os.path.join(directory, kind + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _seed() -> dict[str, dict[str, list[dict]]]:
+    # Import lokal: app.tools.search memakai modul ini
+    from app.tools.search import MOCK_ACTIVITIES, MOCK_FLIGHTS, MOCK_HOTELS
+    return {"hotels": MOCK_HOTELS, "activities": MOCK_ACTIVITIES, "flights": MOCK_FLIGHTS}
+
+
+def build_catalog(directory: Optional[str] = None) -> Catalog:
+    """
+    Bangun katalog dari file di `directory` (default settings.CATALOG_DIR).
+    Jenis tanpa file memakai seed mock; destinasi "default" dari seed dipakai
+    jika file tidak menyediakannya.
+    """
+    directory = settings.CATALOG_DIR if directory is None else directory
+    data = _seed()
+    aliases = None
+    if directory:
+        aliases_path = os.path.join(directory, "destinations.json")
+        if os.path.isfile(aliases_path):
+            aliases = read_aliases(aliases_path)
+        for kind in PRICE_FIELDS:
+            path = _find_file(directory, kind)
+            if path is None:
+                continue
+            loaded = read_catalog_file(path)
+            loaded.setdefault(DEFAULT_DESTINATION, data[kind][DEFAULT_DESTINATION])
+            data[kind] = loaded
+    return Catalog(data["hotels"], data["activities"], data["flights"], aliases)
+
+
+_catalog: Optional[Catalog] = None
+_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """Katalog aktif; dimuat saat pertama dipakai jika startup belum memuatnya."""
+    global _catalog
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                _catalog = build_catalog()
+    return _catalog
+
+
+def resolve_destination(destination: Optional[str]) -> Optional[str]:
+    """Key kanonik destinasi ("Jogja" -> "yogyakarta"); None jika tidak dikenali."""
+    return get_catalog().resolver.resolve(destination)
+
+
+def canonical_destination(destination: str) -> str:
+    """Nama kanonik untuk prompt/tool ("Denpasar" -> "Bali"); input asli jika tidak dikenali."""
+    return get_catalog().resolver.display_name(destination)
+
+
+def load_catalog(directory: Optional[str] = None) -> Catalog:
+    """(Re)load katalog dan pasang sebagai katalog aktif. Cache observation tool dikosongkan."""
+    global _catalog
+    started = time.perf_counter()
+    catalog = build_catalog(directory)
+    with _lock:
+        _catalog = catalog
+    clear_tool_caches()
+    stats = catalog.stats()
+    logger.info(
+        f"Catalog loaded in {time.perf_counter() - started:.2f}s: "
+        + ", ".join(f"{kind}={s['rows']} rows/{s['destinations']} destinations" for kind, s in stats.items())
+    )
+    return catalog
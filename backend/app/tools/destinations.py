@@ -0,0 +1,140 @@
+"""
+Resolusi nama destinasi ke key kanonik katalog.
+"Jogja", "Yogya", "DIY" -> yogyakarta; "Denpasar", "Ubud", "Kuta" -> bali.
+Urutan pencarian:
+1. Exact match nama kanonik / alias (setelah normalisasi) - dict lookup -
+   untuk input utuh, per bagian dipisah koma ("Ubud, Bali"), lalu per kata
+   (bagian/kata terakhir dulu, biasanya wilayah yang lebih luas; bagian yang
+   tidak dikenal dilewati).
+2. Fuzzy: kandidat dari index trigram, diverifikasi dengan edit distance
+   (batas tergantung panjang nama) untuk salah ketik ("Yogyakrta").
+Hasil di-cache per string input, jadi panggilan berulang hanya dict lookup.
+"""
+import heapq
+import re
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# Alias bawaan per destinasi kanonik; katalog bisa menambah lewat destinations.json
+DESTINATION_ALIASES: dict[str, tuple[str, ...]] = {
+    "yogyakarta": (
+        "jogja", "jogjakarta", "yogya", "yogyakarta city", "jogya", "djokja", "diy",
+        "daerah istimewa yogyakarta", "special region of yogyakarta", "sleman", "bantul", "malioboro"
+    ),
+    "bali": (
+        "denpasar", "ubud", "kuta", "seminyak", "canggu", "sanur", "nusa dua", "jimbaran",
+        "uluwatu", "legian", "nusa penida", "pulau bali", "bali island"
+    ),
+}
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_FUZZY_CANDIDATES = 5
+
+
+def normalize_destination(text: Optional[str]) -> str:
+    """Huruf kecil, tanda baca jadi spasi, spasi dirapikan."""
+    return " ".join(_NON_ALNUM.sub(" ", str(text or "").casefold()).split())
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """Levenshtein distance; berhenti lebih awal (hasil limit + 1) jika melebihi limit."""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _max_distance(text: str) -> int:
+    if len(text) <= 4:
+        return 0  # Nama pendek ("diy", "kuta") hanya exact supaya tidak salah tebak
+    if len(text) <= 8:
+        return 1
+    return 2
+
+
+class DestinationResolver:
+    """Index nama kanonik + alias dengan fallback trigram / edit distance."""
+
+    def __init__(self, canonical: Iterable[str], aliases: Optional[dict[str, Iterable[str]]] = None):
+        self.names: dict[str, str] = {}  # nama/alias ternormalisasi -> key kanonik
+        for key in canonical:
+            self._add(key, key)
+        for key, names in (aliases or {}).items():
+            self._add(key, key)
+            for name in names:
+                self._add(name, key)
+
+        self.trigrams: dict[str, list[str]] = {}
+        for name in self.names:
+            for gram in _trigrams(name):
+                self.trigrams.setdefault(gram, []).append(name)
+        self._resolve_cached = lru_cache(maxsize=4096)(self._resolve)
+
+    def _add(self, name: str, key: str):
+        normalized = normalize_destination(name)
+        if normalized:
+            self.names.setdefault(normalized, normalize_destination(key))
+
+    def resolve(self, destination: Optional[str]) -> Optional[str]:
+        """Key kanonik (mis. "yogyakarta") atau None jika tidak dikenali."""
+        if not destination:
+            return None
+        return self._resolve_cached(str(destination))
+
+    def display_name(self, destination: str) -> str:
+        """Nama kanonik untuk ditampilkan ("Jogja" -> "Yogyakarta"); input asli jika tidak dikenali."""
+        key = self.resolve(destination)
+        return key.title() if key else destination
+
+    def _resolve(self, destination: str) -> Optional[str]:
+        text = normalize_destination(destination)
+        parts = [normalize_destination(p) for p in str(destination).split(",")] if "," in str(destination) else []
+        # Exact dulu (murah): utuh, per bagian koma, per kata; baru fuzzy.
+        # Bagian paling belakang (wilayah) dicoba dulu: "Kuta, Lombok" -> lombok jika
+        # lombok dikenal. Wilayah yang tidak dikenal dilewati ("Ubud, Indonesia" -> bali),
+        # jadi tanpa lombok di katalog "Kuta, Lombok" jatuh ke alias kuta -> bali.
+        parts.reverse()
+        for candidate in (text, *parts, *reversed(text.split())):
+            if candidate in self.names:
+                return self.names[candidate]
+        for candidate in (text, *parts):
+            key = self._fuzzy(candidate)
+            if key:
+                return key
+        return None
+
+    def _fuzzy(self, text: str) -> Optional[str]:
+        limit = _max_distance(text)
+        if limit == 0:
+            return None
+
+        # Kandidat: nama dengan trigram bersama terbanyak
+        shared: dict[str, int] = {}
+        for gram in _trigrams(text):
+            for name in self.trigrams.get(gram, ()):
+                shared[name] = shared.get(name, 0) + 1
+        candidates = heapq.nlargest(_FUZZY_CANDIDATES, shared, key=shared.__getitem__)
+
+        best, best_distance = None, limit + 1
+        for name in candidates:
+            allowed = min(limit, _max_distance(name))
+            if allowed == 0 or abs(len(name) - len(text)) > allowed:
+                continue
+            distance = edit_distance(text, name, allowed)
+            if distance <= allowed and distance < best_distance:
+                best, best_distance = name, distance
+        return self.names[best] if best is not None else None
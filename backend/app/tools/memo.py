@@ -0,0 +1,179 @@
+"""
+Memoization layer untuk tools agent.
+Observation string (hasil yang sudah di-serialize) disimpan per tool dengan
+TTL masing-masing, sehingga panggilan dengan argumen identik - dalam satu run
+maupun antar run - tidak menghitung dan men-serialize ulang hasilnya.
+Di dalam blok shared_lookups() (mis. batch plan), panggilan identik juga
+digabung walau sedang berjalan bersamaan atau memoization tool dimatikan.
+"""
+import functools
+import inspect
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Optional
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+
+_hits = metrics.counter("tool_cache_hits_total", "Tool observation cache hits")
+_misses = metrics.counter("tool_cache_misses_total", "Tool observation cache misses")
+_shared = metrics.counter("tool_lookups_shared_total", "Tool calls answered from a shared lookup scope")
+
+_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y", "%Y%m%d")
+
+# Semua cache tool yang terdaftar, untuk stats() dan clear
+_tool_caches: dict[str, TTLCache] = {}
+
+
+def normalize_text(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return " ".join(str(value).split()).casefold()
+
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """Ubah berbagai format tanggal ke YYYY-MM-DD. Nilai yang tidak dikenal dibiarkan."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return text
+
+
+# param -> (normalizer, apply_to_call)
+# Tanggal juga dinormalisasi untuk pemanggilan karena tools butuh format ISO;
+# teks hanya dinormalisasi untuk key supaya output tetap memakai ejaan asli.
+DEFAULT_NORMALIZERS: dict[str, tuple[Callable, bool]] = {
+    "destination": (normalize_text, False),
+    "origin": (normalize_text, False),
+    "preferences": (normalize_text, False),
+    "travel_type": (normalize_text, True),
+    "user_id": (lambda v: v.strip() if isinstance(v, str) else v, True),
+    "checkin": (normalize_date, True),
+    "checkout": (normalize_date, True),
+    "departure_date": (normalize_date, True),
+    "range_start": (normalize_date, True),
+    "range_end": (normalize_date, True),
+}
+
+
+class LookupScope:
+    """
+    Hasil tool yang dibagi dalam satu scope (thread-safe). Pemanggil kedua
+    dengan key yang sama menunggu Future milik pemanggil pertama.
+    """
+
+    def __init__(self):
+        self._futures: dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], str]) -> tuple[str, bool]:
+        """Mengembalikan (observation, shared)."""
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+        if not owner:
+            return future.result(), True
+
+        try:
+            future.set_result(compute())
+        except BaseException as e:
+            # Error tidak dibagi: pemanggil berikutnya mencoba lagi
+            with self._lock:
+                self._futures.pop(key, None)
+            future.set_exception(e)
+            raise
+        return future.result(), False
+
+
+_current_scope: ContextVar[Optional[LookupScope]] = ContextVar("lookup_scope", default=None)
+
+
+@contextmanager
+def shared_lookups():
+    """Bagikan hasil tool identik untuk semua run di dalam blok ini."""
+    scope = LookupScope()
+    reset_token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(reset_token)
+
+
+def memoize_tool(tool_name: str, ttl: Optional[int] = None):
+    """
+    Decorator untuk fungsi wrapper tool yang mengembalikan observation string.
+    TTL diambil dari settings.TOOL_CACHE_TTLS[tool_name] jika tidak diberikan;
+    TTL 0 berarti memoization dimatikan untuk tool tersebut.
+    """
+    if ttl is None:
+        ttl = settings.TOOL_CACHE_TTLS.get(tool_name, settings.TOOL_CACHE_DEFAULT_TTL_SECONDS)
+
+    cache = TTLCache(maxsize=settings.TOOL_CACHE_MAX_ENTRIES, ttl=ttl)
+    _tool_caches[tool_name] = cache
+
+    def decorator(func: Callable[..., str]) -> Callable[..., str]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            key_parts = []
+            for name, value in bound.arguments.items():
+                normalizer, apply_to_call = DEFAULT_NORMALIZERS.get(name, (None, False))
+                if normalizer is not None:
+                    normalized = normalizer(value)
+                    if apply_to_call:
+                        bound.arguments[name] = normalized
+                    value = normalized
+                key_parts.append((name, value))
+            key = tuple(key_parts)
+
+            if ttl > 0:
+                cached = cache.get(key)
+                if cached is not None:
+                    _hits.inc(tool=tool_name)
+                    return cached
+
+            def compute() -> str:
+                _misses.inc(tool=tool_name)
+                observation = func(*bound.args, **bound.kwargs)
+                cache.set(key, observation)
+                return observation
+
+            scope = _current_scope.get()
+            if scope is None:
+                return compute()
+            observation, shared = scope.get_or_compute((tool_name, key), compute)
+            if shared:
+                _shared.inc(tool=tool_name)
+            return observation
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def tool_cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in _tool_caches.items()}
+
+
+def clear_tool_caches():
+    for cache in _tool_caches.values():
+        cache.clear()
@@ -0,0 +1,124 @@
+"""
+Parser preferensi hotel dari teks bebas.
+"homestay with breakfast and pool under 400k" ->
+    types=("homestay", "guesthouse"), amenities=("breakfast", "pool"), max_price=400000
+Tipe dan amenities dicocokkan ke bitmap index katalog (app.tools.catalog);
+batas harga menjadi range query di index harga.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from app.tools.destinations import normalize_destination
+
+# Kata di preferensi -> tipe hotel yang dicari ("homestay" juga menerima guesthouse)
+TYPE_TERMS: dict[str, tuple[str, ...]] = {
+    "homestay": ("homestay", "guesthouse"),
+    "home stay": ("homestay", "guesthouse"),
+    "guesthouse": ("guesthouse",),
+    "guest house": ("guesthouse",),
+    "resort": ("resort",),
+    "villa": ("villa",),
+    "hostel": ("hostel",),
+    "apartment": ("apartment",),
+}
+
+# Sinonim amenity -> key index. Amenity katalog dan preferensi dinormalisasi dengan tabel yang sama.
+AMENITY_SYNONYMS: dict[str, str] = {
+    "breakfast": "breakfast",
+    "sarapan": "breakfast",
+    "pool": "pool",
+    "swimming pool": "pool",
+    "kolam renang": "pool",
+    "wifi": "wifi",
+    "wi fi": "wifi",
+    "internet": "wifi",
+    "spa": "spa",
+    "parking": "parking",
+    "parkir": "parking",
+    "beach": "beach",
+    "pantai": "beach",
+    "gym": "gym",
+    "fitness": "gym",
+    "ac": "ac",
+    "air conditioning": "ac",
+    "restaurant": "restaurant",
+    "restoran": "restaurant",
+    "yoga": "yoga",
+    "garden": "garden",
+    "taman": "garden",
+    "eco friendly": "eco-friendly",
+    "mountain view": "mountain view",
+    "rice field view": "rice field view",
+}
+
+BUDGET_TERMS = ("budget", "murah", "cheap", "hemat")
+
+_PRICE = re.compile(
+    r"(?:under|below|less than|max(?:imum)?|maks(?:imal)?|up to|at most|di ?bawah|kurang dari|<=?)\s*"
+    r"(rp\.?\s*|idr\s*)?(\d+(?:[.,]\d+)*)\s*(k|rb|ribu|jt|juta|mio)?(?![a-z])"
+)
+_MULTIPLIERS = {"k": 1_000, "rb": 1_000, "ribu": 1_000, "jt": 1_000_000, "juta": 1_000_000, "mio": 1_000_000}
+# Angka tanpa mata uang/satuan baru dianggap harga jika masuk akal sebagai rupiah
+# ("max 2 people", "at most 3 stars" bukan batas harga)
+MIN_BARE_PRICE_IDR = 10_000
+
+
+def _phrase_pattern(phrases) -> re.Pattern:
+    # Frasa terpanjang dulu supaya "swimming pool" menang atas "pool"
+    ordered = sorted(phrases, key=len, reverse=True)
+    return re.compile(r"(?<![0-9a-z])(" + "|".join(re.escape(p) for p in ordered) + r")(?![0-9a-z])")
+
+
+_TYPE_PATTERN = _phrase_pattern(TYPE_TERMS)
+_AMENITY_PATTERN = _phrase_pattern(AMENITY_SYNONYMS)
+
+
+@dataclass(frozen=True)
+class HotelPreferences:
+    types: tuple[str, ...] = ()
+    amenities: tuple[str, ...] = ()
+    max_price: Optional[int] = None
+    budget: bool = False
+
+
+def amenity_keys(amenity: str) -> set[str]:
+    """Key index untuk satu amenity katalog: "Local Breakfast" -> {"local breakfast", "breakfast"}."""
+    text = normalize_destination(amenity)
+    keys = {text} if text else set()
+    keys.update(AMENITY_SYNONYMS[match] for match in _AMENITY_PATTERN.findall(text))
+    return keys
+
+
+def _parse_price(currency: str, number: str, unit: str) -> Optional[int]:
+    """Harga dalam rupiah, atau None jika angkanya bukan harga."""
+    if unit:
+        return int(round(float(number.replace(",", ".")) * _MULTIPLIERS[unit]))
+    # Tanpa satuan: titik/koma adalah pemisah ribuan ("400.000")
+    value = int(re.sub(r"[.,]", "", number))
+    if currency or value >= MIN_BARE_PRICE_IDR:
+        return value
+    return None
+
+
+@lru_cache(maxsize=1024)
+def parse_preferences(text: Optional[str]) -> HotelPreferences:
+    """Tipe, amenities, batas harga, dan flag budget dari teks preferensi."""
+    if not text:
+        return HotelPreferences()
+    lowered = str(text).casefold()
+    normalized = normalize_destination(lowered)
+
+    types: dict[str, None] = {}
+    for term in _TYPE_PATTERN.findall(normalized):
+        types.update(dict.fromkeys(TYPE_TERMS[term]))
+    amenities = dict.fromkeys(AMENITY_SYNONYMS[term] for term in _AMENITY_PATTERN.findall(normalized))
+
+    prices = [p for p in (_parse_price(*match) for match in _PRICE.findall(lowered)) if p is not None]
+    return HotelPreferences(
+        types=tuple(types),
+        amenities=tuple(amenities),
+        max_price=min(prices) if prices else None,
+        budget=any(term in lowered for term in BUDGET_TERMS)
+    )
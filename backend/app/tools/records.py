@@ -0,0 +1,128 @@
+"""
+Representasi baris katalog yang immutable dan hemat memori.
+- Record: tuple nilai + schema (urutan key) yang dipakai bersama oleh semua
+  baris satu jenis katalog, jadi tidak ada dict per baris. List (mis.
+  amenities) disimpan sebagai tuple.
+- ResultView: hasil satu query = record + field per-query (checkin,
+  available, origin, ...). Field per-query tidak pernah ditulis ke record,
+  sehingga request bersamaan tidak saling menimpa data katalog.
+Keduanya read-only Mapping: kode yang membaca dict (r["price"], r.get(...),
+{**r}, dict(r)) tetap bekerja; penulisan item raise TypeError.
+"""
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, Optional
+
+_MISSING = object()
+
+
+class RecordSchema:
+    """Urutan key untuk satu jenis katalog, dipakai bersama oleh semua record-nya."""
+
+    __slots__ = ("keys", "positions")
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys = tuple(keys)
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "RecordSchema":
+        """Gabungan key semua baris, urut kemunculan pertama."""
+        keys: dict[str, None] = {}
+        for row in rows:
+            keys.update(dict.fromkeys(row))
+        return cls(keys)
+
+
+def _freeze(value: Any) -> Any:
+    return tuple(value) if isinstance(value, list) else value
+
+
+class Record(Mapping):
+    """Satu baris katalog yang immutable."""
+
+    __slots__ = ("_schema", "_values")
+
+    def __init__(self, schema: RecordSchema, values: tuple):
+        self._schema = schema
+        self._values = values
+
+    @classmethod
+    def from_dict(cls, schema: RecordSchema, row: dict) -> "Record":
+        return cls(schema, tuple(_freeze(row.get(key, _MISSING)) for key in schema.keys))
+
+    def __getitem__(self, key: str) -> Any:
+        position = self._schema.positions.get(key)
+        value = _MISSING if position is None else self._values[position]
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        position = self._schema.positions.get(key)
+        if position is None:
+            return default
+        value = self._values[position]
+        return default if value is _MISSING else value
+
+    def __contains__(self, key: object) -> bool:
+        position = self._schema.positions.get(key)
+        return position is not None and self._values[position] is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, value in zip(self._schema.keys, self._values) if value is not _MISSING)
+
+    def __len__(self) -> int:
+        return sum(1 for value in self._values if value is not _MISSING)
+
+    def to_dict(self) -> dict:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return f"Record({dict(self)!r})"
+
+    def __reduce__(self):
+        return (_rebuild_record, (self._schema.keys, self._values))
+
+
+def _rebuild_record(keys: tuple, values: tuple) -> Record:
+    return Record(RecordSchema(keys), values)
+
+
+class ResultView(Mapping):
+    """Record katalog + field per-query. `extra` boleh dipakai bersama oleh semua hasil satu query."""
+
+    __slots__ = ("record", "_extra")
+
+    def __init__(self, record: Mapping, extra: Optional[dict] = None):
+        self.record = record
+        self._extra = extra or {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._extra:
+            return self._extra[key]
+        return self.record[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._extra:
+            return self._extra[key]
+        return self.record.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._extra or key in self.record
+
+    def __iter__(self) -> Iterator[str]:
+        yield from (key for key in self.record if key not in self._extra)
+        yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> dict:
+        """Salinan dict biasa, mis. untuk disimpan ke JSON/DB."""
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return f"ResultView({dict(self)!r})"
+
+    def __reduce__(self):
+        return (ResultView, (self.record, dict(self._extra)))
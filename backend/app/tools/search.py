@@ -1,11 +1,19 @@
 """
-Mock search tools untuk hotels, flights, dan activities.
-Untuk PoC, return data dummy yang realistis.
+Search tools untuk hotels, flights, dan activities.
+Data dibaca dari katalog ter-index (app.tools.catalog); MOCK_* di bawah
+adalah seed bawaan jika tidak ada export inventory di CATALOG_DIR.
+Hasil search berupa record katalog read-only; field per-query (checkin,
+available, origin, ...) ada di ResultView, bukan ditulis ke data bersama.
 """
+from itertools import islice
 from typing import Optional
 import random
 
-# === Mock Data ===
+from app.tools.catalog import get_catalog, resolve_destination
+from app.tools.preferences import parse_preferences
+from app.tools.records import ResultView
+
+# === Mock Data (seed katalog) ===
 MOCK_HOTELS = {
     "yogyakarta": [
         {"id": "htl_001", "name": "The Phoenix Hotel Yogyakarta", "type": "hotel", "price_per_night": 850000, "rating": 4.7, "amenities": ["wifi", "pool", "breakfast"]},
@@ -62,54 +70,60 @@ MOCK_FLIGHTS = {
 
 # === Search Functions ===
 def search_hotels(destination: str, checkin: str, checkout: str, preferences: Optional[str] = None, max_price: Optional[int] = None) -> list[dict]:
-    """Search hotels berdasarkan destinasi dan preferensi."""
-    dest_key = destination.lower()
-    hotels = MOCK_HOTELS.get(dest_key, MOCK_HOTELS["default"])
+    """
+    Search hotels berdasarkan destinasi dan preferensi.
+    Preferensi ("homestay with breakfast and pool under 400k") di-parse ke
+    tipe, amenities, dan batas harga, lalu dievaluasi sebagai AND bitmap di
+    index katalog. Preferensi yang tidak punya hasil dilonggarkan: amenities
+    dulu, lalu tipe, lalu harga dari teks; max_price pemanggil tetap dipakai.
+    """
+    index = get_catalog().hotels(destination)
+    wanted = parse_preferences(preferences)
     
-    # Filter by preferences
-    if preferences:
-        pref_lower = preferences.lower()
-        if "homestay" in pref_lower:
-            hotels = [h for h in hotels if h["type"] in ["homestay", "guesthouse"]] or hotels
-        elif "budget" in pref_lower:
-            hotels = sorted(hotels, key=lambda x: x["price_per_night"])[:3]
+    # Filter by preferences (bitmap tipe dan amenities)
+    mask = index.all_mask
+    if wanted.types:
+        mask = index.type_mask(wanted.types) or mask
+    if wanted.amenities:
+        mask = (mask & index.amenity_mask(wanted.amenities)) or mask
     
-    # Filter by max price
-    if max_price:
-        hotels = [h for h in hotels if h["price_per_night"] <= max_price] or hotels[:2]
+    # Batas harga dicoba berurutan: gabungan max_price + harga dari preferensi,
+    # lalu hanya max_price pemanggil (harga dari teks dilonggarkan lebih dulu)
+    limits = [min(max_price, wanted.max_price)] if max_price and wanted.max_price else []
+    limits.append(max_price or wanted.max_price or None)
     
-    # Add availability (mock)
-    for h in hotels:
-        h["available"] = True
-        h["checkin"] = checkin
-        h["checkout"] = checkout
+    hotels = []
+    for limit in limits:
+        # Filter by max price (range query di index harga)
+        selected = mask & index.price_mask(limit)
+        if selected:
+            hotels = index.cheapest(3, selected) if wanted.budget else index.select(selected)
+            break
+    if not hotels:
+        # Tidak ada yang muat di batas harga: beberapa hotel pertama seperti sebelumnya
+        hotels = index.cheapest(2, mask) if wanted.budget else index.select(mask, limit=2)
     
-    return hotels
+    # Add availability (mock); satu dict field per-query untuk semua hasil
+    query = {"available": True, "checkin": checkin, "checkout": checkout}
+    return [ResultView(h, query) for h in hotels]
 
 def search_flights(destination: str, departure_date: str, origin: str = "Jakarta") -> list[dict]:
     """Search flights ke destinasi."""
-    dest_key = destination.lower()
-    flights = MOCK_FLIGHTS.get(dest_key, MOCK_FLIGHTS["default"])
-    
-    for f in flights:
-        f["origin"] = origin
-        f["destination"] = destination
-        f["date"] = departure_date
-        f["available_seats"] = random.randint(5, 50)
-    
-    return flights
+    flights = get_catalog().flights(destination).query()
+    query = {"origin": origin, "destination": destination, "date": departure_date}
+    return [ResultView(f, {**query, "available_seats": random.randint(5, 50)}) for f in flights]
 
 def search_activities(destination: str, travel_type: Optional[str] = None) -> list[dict]:
     """Search aktivitas berdasarkan destinasi dan tipe travel."""
-    dest_key = destination.lower()
-    activities = MOCK_ACTIVITIES.get(dest_key, MOCK_ACTIVITIES["default"])
+    index = get_catalog().activities(destination)
+    activities = index.query()
     
     # Filter by travel type
     if travel_type:
         type_lower = travel_type.lower()
-        filtered = [a for a in activities if a["type"] == type_lower]
+        filtered = index.query([type_lower])
         if filtered:
-            activities = filtered + [a for a in activities if a["type"] != type_lower][:2]
+            activities = filtered + list(islice((a for a in index.rows if a["type"] != type_lower), 2))
     
     return activities
 
@@ -135,4 +149,4 @@ def get_destination_info(destination: str) -> dict:
             "avg_daily_budget": {"budget": 500000, "mid": 1000000, "luxury": 3000000}
         }
     }
-    return info.get(destination.lower(), {"name": destination, "country": "Indonesia"})
\ No newline at end of file
+    return info.get(resolve_destination(destination), {"name": destination, "country": "Indonesia"})
\ No newline at end of file
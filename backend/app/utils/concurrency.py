@@ -0,0 +1,47 @@
+"""
+Helper untuk menjalankan kode sync dari async endpoint.
+Semua pekerjaan blocking dijalankan di thread pool yang ukurannya dibatasi
+supaya event loop uvicorn tetap responsif.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.config import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Thread pool bersama, dibuat lazily dengan ukuran SYNC_WORKERS."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.SYNC_WORKERS,
+                thread_name_prefix="planner-sync"
+            )
+        return _executor
+
+
+async def run_sync(func: Callable, *args, **kwargs) -> Any:
+    """
+    Jalankan fungsi sync di thread pool tanpa memblokir event loop.
+    Context (contextvars) pemanggil ikut dibawa ke thread, seperti asyncio.to_thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_executor():
+    """Matikan thread pool (dipanggil saat shutdown aplikasi)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,156 @@
+"""
+Metrics in-process sederhana (counter, gauge, histogram) tanpa dependency tambahan.
+Di-render dalam format teks Prometheus lewat endpoint GET /metrics.
+"""
+import threading
+from typing import Callable, Optional
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+class Counter:
+    """Counter monoton naik, opsional dengan label."""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge:
+    """Nilai sesaat. Bisa di-set manual atau dibaca dari callback."""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, callback: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.description = description
+        self._callback = callback
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+
+    def value(self) -> float:
+        if self._callback is not None:
+            return self._callback()
+        with self._lock:
+            return self._value
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        return [(self.name, (), self.value())]
+
+
+class Histogram:
+    """Histogram kumulatif ala Prometheus, opsional dengan label."""
+    kind = "histogram"
+
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+    def __init__(self, name: str, description: str, buckets: Optional[tuple] = None):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+        # label key -> [counts per bucket..., sum, count]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(_label_key(labels))
+            return state[-1] if state else 0
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                for bound, count in zip(self.buckets, state):
+                    samples.append((f"{self.name}_bucket", key + (("le", f"{bound:g}"),), count))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), state[-1]))
+                samples.append((f"{self.name}_sum", key, state[-2]))
+                samples.append((f"{self.name}_count", key, state[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """Registry global; metric dengan nama sama hanya dibuat sekali."""
+
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, factory: Callable[[], object]):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self._register(name, lambda: Counter(name, description))
+
+    def gauge(self, name: str, description: str, callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._register(name, lambda: Gauge(name, description, callback))
+
+    def histogram(self, name: str, description: str, buckets: Optional[tuple] = None) -> Histogram:
+        return self._register(name, lambda: Histogram(name, description, buckets))
+
+    def render(self) -> str:
+        """Render semua metric dalam format teks Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Convenience export
+metrics = MetricsRegistry()
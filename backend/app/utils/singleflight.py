@@ -0,0 +1,40 @@
+"""
+Single-flight untuk coroutine: pemanggil konkuren dengan key yang sama
+menunggu satu eksekusi bersama alih-alih menjalankan pekerjaan duplikat.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.utils.metrics import metrics
+
+
+class SingleFlight:
+    """
+    Gabungkan pemanggilan konkuren dengan key yang sama.
+    Task bersama di-shield, jadi pembatalan satu pemanggil (mis. client
+    disconnect) tidak membatalkan hasil untuk pemanggil lain.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._coalesced = metrics.counter(f"{name}_coalesced_total", f"Calls coalesced into an in-flight {name} call")
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Jalankan `func` atau ikut menunggu eksekusi yang sedang berjalan.
+        Mengembalikan (hasil, shared) - shared True jika hasil dari pemanggil lain.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced.inc()
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(func())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), False
@@ -0,0 +1,137 @@
+"""
+Benchmark katalog inventory (app.tools.catalog).
+Membuat export CSV hotel sintetis, lalu mengukur waktu load + build index,
+memori katalog (record immutable vs dict per baris) dan latensi
+search_hotels dengan max_price (bisect) dibanding scan linear.
+
+Usage (dari folder backend):
+    python -m benchmarks.bench_catalog
+    python -m benchmarks.bench_catalog --sizes 1000 100000 --output benchmarks/results/catalog.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Katalog memakai settings saat import
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("LLM_BASE_URL", "bench")
+os.environ.setdefault("LLM_MODEL", "bench")
+
+from app.tools.catalog import load_catalog, read_catalog_file
+from app.tools.search import search_hotels
+
+CITIES = ["yogyakarta", "bali", "bandung"]
+TYPES = ["hotel", "homestay", "guesthouse", "resort", "budget"]
+AMENITIES = ["wifi", "pool", "breakfast", "parking", "spa", "ac"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Catalog index benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Hotel per kota")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--no-memory", action="store_true", help="Lewati pengukuran memori (tracemalloc lambat)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Tulis hasil JSON ke file ini")
+    return parser.parse_args(argv)
+
+
+def write_hotels(path: str, per_city: int, rng: random.Random) -> list[dict]:
+    rows = []
+    for city in CITIES:
+        for i in range(per_city):
+            rows.append({
+                "destination": city,
+                "id": f"htl_{city[:3]}_{i}",
+                "name": f"{city.title()} Stay {i}",
+                "type": rng.choice(TYPES),
+                "price_per_night": rng.randrange(150_000, 3_000_000, 10_000),
+                "rating": round(rng.uniform(3.0, 5.0), 1),
+                "amenities": ";".join(rng.sample(AMENITIES, 3))
+            })
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+def _retained_mb(build) -> float:
+    """Memori yang masih dipegang hasil build() (index + baris)."""
+    tracemalloc.start()
+    result = build()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return round(retained / 1024 / 1024, 1)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    max_prices = [rng.randrange(150_000, 600_000, 10_000) for _ in range(args.queries)]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            raw = write_hotels(os.path.join(directory, "hotels.csv"), size, rng)
+            linear_rows = [r for r in raw if r["destination"] == "bali"]
+
+            started = time.perf_counter()
+            load_catalog(directory)
+            load_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            for max_price in max_prices:
+                search_hotels("Bali", "2025-12-20", "2025-12-24", max_price=max_price)
+            indexed_ms = (time.perf_counter() - started) * 1000 / len(max_prices)
+
+            # Baseline: scan linear + tulis field per-query ke dict bersama (implementasi lama)
+            started = time.perf_counter()
+            for max_price in max_prices:
+                for h in [h for h in linear_rows if h["price_per_night"] <= max_price]:
+                    h["available"], h["checkin"], h["checkout"] = True, "2025-12-20", "2025-12-24"
+            linear_ms = (time.perf_counter() - started) * 1000 / len(max_prices)
+
+            row = {
+                "hotels_per_city": size,
+                "load_ms": round(load_ms, 1),
+                "indexed_query_ms": round(indexed_ms, 3),
+                "linear_query_ms": round(linear_ms, 3)
+            }
+            if not args.no_memory:
+                row["catalog_mb"] = _retained_mb(lambda: load_catalog(directory))
+                row["dict_rows_mb"] = _retained_mb(lambda: read_catalog_file(os.path.join(directory, "hotels.csv")))
+            rows.append(row)
+    load_catalog("")
+
+    print(f"{'per city':>9} {'load ms':>9} {'indexed ms':>11} {'linear ms':>10} {'catalog MB':>11} {'dicts MB':>9}")
+    for row in rows:
+        print(f"{row['hotels_per_city']:>9} {row['load_ms']:>9} {row['indexed_query_ms']:>11} {row['linear_query_ms']:>10} "
+              f"{row.get('catalog_mb', '-'):>11} {row.get('dict_rows_mb', '-'):>9}")
+
+    report = {
+        "benchmark": "catalog",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {"cities": len(CITIES), "queries": args.queries, "seed": args.seed},
+        "results": rows
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
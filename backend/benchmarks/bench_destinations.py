@@ -0,0 +1,98 @@
+"""
+Benchmark resolusi destinasi (app.tools.destinations).
+Mengukur latensi resolve per jenis input (kanonik, alias, typo, tidak
+dikenal), tanpa cache dan dengan cache, pada index dengan banyak destinasi
+sintetis.
+
+Usage (dari folder backend):
+    python -m benchmarks.bench_destinations
+    python -m benchmarks.bench_destinations --sizes 100 10000 --output benchmarks/results/destinations.json
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Package app.tools membaca settings saat import
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("LLM_BASE_URL", "bench")
+os.environ.setdefault("LLM_MODEL", "bench")
+
+from app.tools.destinations import DESTINATION_ALIASES, DestinationResolver
+
+QUERIES = {
+    "canonical": "Yogyakarta",
+    "alias": "Jogja",
+    "typo": "Yogyakrta",
+    "comma": "Ubud, Bali",
+    "unknown": "Zzyzx Springs",
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Destination resolver benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 1000, 10000], help="Destinasi sintetis tambahan")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Tulis hasil JSON ke file ini")
+    return parser.parse_args(argv)
+
+
+def _synthetic_names(count: int, rng: random.Random) -> list[str]:
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12))) for _ in range(count)]
+
+
+def _per_call_us(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - started) / repeat * 1e6, 2)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    rows = []
+    for size in args.sizes:
+        started = time.perf_counter()
+        resolver = DestinationResolver(_synthetic_names(size, rng), DESTINATION_ALIASES)
+        build_ms = (time.perf_counter() - started) * 1000
+        for kind, query in QUERIES.items():
+            rows.append({
+                "extra_destinations": size,
+                "query": kind,
+                "build_ms": round(build_ms, 1),
+                "uncached_us": _per_call_us(lambda: resolver._resolve(query), max(1, args.repeat // 10)),
+                "cached_us": _per_call_us(lambda: resolver.resolve(query), args.repeat),
+                "resolved": resolver.resolve(query)
+            })
+
+    print(f"{'extra':>6} {'query':>10} {'uncached us':>12} {'cached us':>10} {'resolved':>11}")
+    for row in rows:
+        print(f"{row['extra_destinations']:>6} {row['query']:>10} {row['uncached_us']:>12} {row['cached_us']:>10} "
+              f"{str(row['resolved']):>11}")
+
+    report = {
+        "benchmark": "destinations",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {"repeat": args.repeat, "seed": args.seed},
+        "results": rows
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark filter preferensi hotel (bitmap tipe/amenities + index harga).
+Untuk satu kota dengan N hotel sintetis, query preferensi teks bebas
+diukur per tahap:
+- mask: AND bitmap tipe, amenities, dan harga (python int)
+- search: search_hotels lengkap (parse preferensi, mask, baris hasil)
+- linear: list comprehension atas dict per baris (cara sebelum index)
+
+Usage (dari folder backend):
+    python -m benchmarks.bench_hotel_filters
+    python -m benchmarks.bench_hotel_filters --sizes 1000 100000 --output benchmarks/results/hotel_filters.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Katalog memakai settings saat import
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("LLM_BASE_URL", "bench")
+os.environ.setdefault("LLM_MODEL", "bench")
+
+from app.tools.catalog import get_catalog, load_catalog
+from app.tools.preferences import parse_preferences
+from app.tools.search import search_hotels
+
+CITY = "bali"
+TYPES = ["hotel", "homestay", "guesthouse", "resort", "villa", "budget"]
+AMENITIES = ["wifi", "pool", "breakfast", "parking", "spa", "ac", "gym", "beach", "restaurant", "yoga", "garden"]
+QUERIES = [
+    "homestay with breakfast and pool under 400k",
+    "resort with spa and beach",
+    "villa with pool under 1.5jt",
+    "budget",
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Hotel preference filter benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Hotel per kota")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Tulis hasil JSON ke file ini")
+    return parser.parse_args(argv)
+
+
+def write_hotels(path: str, count: int, rng: random.Random) -> list[dict]:
+    rows = [{
+        "destination": CITY,
+        "id": f"htl_{i}",
+        "name": f"Bali Stay {i}",
+        "type": rng.choice(TYPES),
+        "price_per_night": rng.randrange(150_000, 3_000_000, 10_000),
+        "rating": round(rng.uniform(3.0, 5.0), 1),
+        "amenities": rng.sample(AMENITIES, rng.randint(1, 5))
+    } for i in range(count)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows({**r, "amenities": ";".join(r["amenities"])} for r in rows)
+    return rows
+
+
+def linear_filter(rows: list[dict], query: str) -> list[dict]:
+    wanted = parse_preferences(query)
+    matches = [
+        r for r in rows
+        if (not wanted.types or r["type"] in wanted.types)
+        and all(a in r["amenities"] for a in wanted.amenities)
+        and (wanted.max_price is None or r["price_per_night"] <= wanted.max_price)
+    ]
+    if wanted.budget:
+        matches = sorted(matches, key=lambda r: r["price_per_night"])[:3]
+    return matches
+
+
+def _per_call_ms(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - started) / repeat * 1000, 4)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            raw = write_hotels(os.path.join(directory, "hotels.csv"), size, rng)
+            load_catalog(directory)
+            index = get_catalog().hotels(CITY)
+
+            for query in QUERIES:
+                wanted = parse_preferences(query)
+
+                def mask():
+                    result = index.type_mask(wanted.types or None) & index.amenity_mask(wanted.amenities)
+                    return result & index.price_mask(wanted.max_price)
+
+                rows.append({
+                    "hotels": size,
+                    "query": query,
+                    "matches": len(search_hotels(CITY, "2025-12-20", "2025-12-24", preferences=query)),
+                    "mask_ms": _per_call_ms(mask, args.repeat),
+                    "search_ms": _per_call_ms(
+                        lambda: search_hotels(CITY, "2025-12-20", "2025-12-24", preferences=query), args.repeat
+                    ),
+                    "linear_ms": _per_call_ms(lambda: linear_filter(raw, query), max(1, args.repeat // 5))
+                })
+    load_catalog("")
+
+    print(f"{'hotels':>7} {'matches':>8} {'mask ms':>9} {'search ms':>10} {'linear ms':>10}  query")
+    for row in rows:
+        print(f"{row['hotels']:>7} {row['matches']:>8} {row['mask_ms']:>9} {row['search_ms']:>10} "
+              f"{row['linear_ms']:>10}  {row['query']}")
+
+    report = {
+        "benchmark": "hotel_filters",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {"repeat": args.repeat, "seed": args.seed},
+        "results": rows
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
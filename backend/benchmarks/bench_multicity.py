@@ -0,0 +1,115 @@
+"""
+Benchmark solver multi-kota (app.planning.multicity).
+- solver: Held-Karp + pembagian malam pada matriks biaya sintetis
+- end_to_end: plan_multi_city lengkap dengan lookup tool mock
+
+Usage (dari folder backend):
+    python -m benchmarks.bench_multicity
+    python -m benchmarks.bench_multicity --max-cities 8 --nights 21 --output benchmarks/results/multicity.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# plan_multi_city memakai tools yang membaca settings saat import
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("LLM_BASE_URL", "bench")
+os.environ.setdefault("LLM_MODEL", "bench")
+
+import numpy as np
+
+from app.planning.multicity import plan_multi_city, solve_route, split_nights
+
+CITIES = ["Yogyakarta", "Bali", "Bandung", "Surabaya", "Lombok", "Medan", "Makassar", "Malang"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-city solver benchmark")
+    parser.add_argument("--max-cities", type=int, default=8)
+    parser.add_argument("--nights", type=int, default=14)
+    parser.add_argument("--budget", type=int, default=40_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Tulis hasil JSON ke file ini")
+    return parser.parse_args(argv)
+
+
+def _stats(timings: list[float]) -> dict:
+    timings = sorted(timings)
+    return {
+        "median_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3)
+    }
+
+
+def bench_solver(cities: int, nights: int, budget: int, repeat: int, rng: random.Random) -> dict:
+    timings = []
+    for _ in range(repeat):
+        flights = np.array([[0 if i == j else rng.randrange(300_000, 2_000_000, 10_000) for j in range(cities + 1)]
+                            for i in range(cities + 1)])
+        values, costs = [], []
+        for _ in range(cities):
+            gains = sorted((rng.uniform(3, 6.5) for _ in range(2 * nights)), reverse=True)
+            values.append(np.concatenate(([0.0], np.cumsum(gains[::2]) + np.cumsum(gains[1::2]))))
+            costs.append(np.arange(nights + 1) * rng.randrange(200_000, 1_500_000, 10_000))
+
+        started = time.perf_counter()
+        _, flight_cost = solve_route(flights)
+        split_nights(values, costs, nights, budget - flight_cost)
+        timings.append(time.perf_counter() - started)
+    return _stats(timings)
+
+
+def bench_end_to_end(cities: int, nights: int, budget: int, repeat: int) -> dict:
+    start = datetime(2025, 12, 1)
+    end = (start + timedelta(days=nights)).strftime("%Y-%m-%d")
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        plan_multi_city(CITIES[:cities], start.strftime("%Y-%m-%d"), end, budget, travel_type="culture", travelers=2)
+        timings.append(time.perf_counter() - started)
+    return _stats(timings)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    rows = []
+    for cities in range(2, min(args.max_cities, len(CITIES)) + 1):
+        nights = max(args.nights, cities)
+        rows.append({
+            "cities": cities,
+            "nights": nights,
+            "solver": bench_solver(cities, nights, args.budget, args.repeat, rng),
+            "end_to_end": bench_end_to_end(cities, nights, args.budget, args.repeat)
+        })
+
+    print(f"{'cities':>6} {'nights':>6} {'solver p50 ms':>14} {'solver max ms':>14} {'e2e p50 ms':>11} {'e2e max ms':>11}")
+    for row in rows:
+        print(f"{row['cities']:>6} {row['nights']:>6} {row['solver']['median_ms']:>14} {row['solver']['max_ms']:>14} "
+              f"{row['end_to_end']['median_ms']:>11} {row['end_to_end']['max_ms']:>11}")
+
+    report = {
+        "benchmark": "multi_city",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {"nights": args.nights, "budget_idr": args.budget, "repeat": args.repeat, "seed": args.seed},
+        "results": rows
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
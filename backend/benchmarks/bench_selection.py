@@ -0,0 +1,150 @@
+"""
+Benchmark engine pemilihan aktivitas (app.planning.selection).
+Membandingkan knapsack DP dengan greedy lama (urutan list, berhenti saat
+budget harian habis) pada kandidat sintetis: waktu eksekusi, total skor
+dan apakah budget total/harian dilanggar.
+
+Usage (dari folder backend):
+    python -m benchmarks.bench_selection
+    python -m benchmarks.bench_selection --sizes 10 1000 10000 100000 --days 7 --output benchmarks/results/selection.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.planning.selection import score_activities, select_activities
+
+TYPES = ["culture", "nature", "adventure", "beach", "city"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Activity selection benchmark (knapsack vs greedy)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000], help="Jumlah kandidat aktivitas")
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--per-day", type=int, default=2)
+    parser.add_argument("--budget", type=int, default=3_000_000, help="Budget aktivitas total (IDR)")
+    parser.add_argument("--travel-type", default="culture")
+    parser.add_argument("--repeat", type=int, default=5, help="Jumlah pengulangan per ukuran")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Tulis hasil JSON ke file ini")
+    return parser.parse_args(argv)
+
+
+def make_activities(n: int, rng: random.Random) -> list[dict]:
+    return [
+        {
+            "id": f"act_{i:06d}",
+            "name": f"Activity {i}",
+            "price": rng.randrange(0, 1_000_001, 5000),
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "type": rng.choice(TYPES),
+            "description": "Synthetic activity"
+        }
+        for i in range(n)
+    ]
+
+
+def greedy_baseline(activities: list[dict], num_days: int, total_budget: int, per_day: int) -> list[list[dict]]:
+    """Perilaku generate_itinerary_fallback sebelum engine knapsack."""
+    daily_budget = total_budget // num_days
+    days, index = [], 0
+    for _ in range(num_days):
+        day, cost = [], 0
+        while index < len(activities) and len(day) < per_day and (not day or cost < daily_budget):
+            day.append(activities[index])
+            cost += activities[index]["price"]
+            index += 1
+        days.append(day)
+    return days
+
+
+def evaluate(days: list[list[dict]], total_budget: int, num_days: int, travel_type: str) -> dict:
+    chosen = [a for day in days for a in day]
+    daily_budget = total_budget // num_days
+    return {
+        "activities": len(chosen),
+        "score": round(float(score_activities(chosen, travel_type).sum()), 2) if chosen else 0.0,
+        "cost": sum(a["price"] for a in chosen),
+        "over_total_budget": sum(a["price"] for a in chosen) > total_budget,
+        "days_over_daily_budget": sum(1 for day in days if sum(a["price"] for a in day) > daily_budget)
+    }
+
+
+def time_call(fn, repeat: int) -> tuple[dict, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "min_ms": round(timings[0] * 1000, 3),
+        "median_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3)
+    }, result
+
+
+def run_benchmark(args) -> list[dict]:
+    rng = random.Random(args.seed)
+    daily_budget = args.budget // args.days
+    rows = []
+    for size in args.sizes:
+        activities = make_activities(size, rng)
+        timing, days = time_call(
+            lambda: select_activities(
+                activities, args.days, args.budget, daily_budget, per_day=args.per_day, travel_type=args.travel_type
+            ),
+            args.repeat
+        )
+        greedy_timing, greedy_days = time_call(
+            lambda: greedy_baseline(activities, args.days, args.budget, args.per_day), args.repeat
+        )
+        rows.append({
+            "candidates": size,
+            "knapsack": {**timing, **evaluate(days, args.budget, args.days, args.travel_type)},
+            "greedy": {**greedy_timing, **evaluate(greedy_days, args.budget, args.days, args.travel_type)}
+        })
+    return rows
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows = run_benchmark(args)
+
+    report = {
+        "benchmark": "activity_selection",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "days": args.days,
+            "per_day": args.per_day,
+            "budget_idr": args.budget,
+            "travel_type": args.travel_type,
+            "repeat": args.repeat,
+            "seed": args.seed
+        },
+        "results": rows
+    }
+
+    print(f"{'candidates':>10} {'engine':<9} {'median ms':>10} {'score':>8} {'cost':>10} {'over total':>10} {'days over':>9}")
+    for row in rows:
+        for engine in ("knapsack", "greedy"):
+            stats = row[engine]
+            print(f"{row['candidates']:>10} {engine:<9} {stats['median_ms']:>10} {stats['score']:>8} "
+                  f"{stats['cost']:>10} {str(stats['over_total_budget']):>10} {stats['days_over_daily_budget']:>9}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
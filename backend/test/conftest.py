@@ -14,7 +14,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_session_factory
 
 # Test database
 TEST_DATABASE_URL = "sqlite:///./test_vacation_planner.db"
@@ -31,6 +31,7 @@ def override_get_db():
 
 # Override the dependency
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_session_factory] = lambda: TestSessionLocal
 
 @pytest.fixture(scope="function")
 def client():
@@ -55,6 +56,11 @@ def db_session():
     session.close()
     Base.metadata.drop_all(bind=test_engine)
 
+@pytest.fixture
+def test_session_factory():
+    """Session factory for code that opens its own sessions (e.g. job workers)."""
+    return TestSessionLocal
+
 @pytest.fixture
 def sample_plan_request():
     """Sample plan request data."""
@@ -0,0 +1,888 @@
+# tests/test_agents.py
+"""
+Unit tests for planner agent infrastructure.
+"""
+import pytest
+
+
+class TestAgentPool:
+    """Tests for the planner agent pool."""
+
+    def _make_pool(self, size=2):
+        from app.agents.pool import AgentPool, PooledAgent
+        return AgentPool(factory=lambda: PooledAgent(llm=object(), executor=object()), size=size)
+
+    def test_start_warms_agents(self):
+        pool = self._make_pool(size=3)
+        pool.start()
+
+        assert pool.stats()["idle"] == 3
+        assert pool.stats()["created"] == 3
+
+    def test_acquire_reuses_agent(self):
+        pool = self._make_pool(size=1)
+
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pass
+
+        assert first is second
+        assert pool.stats()["created"] == 1
+
+    def test_overflow_is_not_kept(self):
+        pool = self._make_pool(size=1)
+
+        with pool.acquire():
+            with pool.acquire():
+                assert pool.stats()["in_use"] == 2
+
+        stats = pool.stats()
+        assert stats["in_use"] == 0
+        assert stats["idle"] == 1
+        assert stats["created"] == 2
+
+    @pytest.mark.asyncio
+    async def test_async_overflow_is_built_off_the_loop(self):
+        import threading
+        from app.agents.pool import AgentPool, PooledAgent
+
+        threads = []
+
+        def factory():
+            threads.append(threading.current_thread())
+            return PooledAgent(llm=object(), executor=object())
+
+        pool = AgentPool(factory=factory, size=1)
+        pool.start()
+
+        async with pool.aacquire() as first:
+            async with pool.aacquire() as second:
+                assert first is not second
+
+        assert threads[0] is threading.current_thread()
+        assert threads[1] is not threading.current_thread()
+        assert pool.stats()["in_use"] == 0
+
+    def test_overflow_is_bounded(self):
+        from app.agents.pool import AgentPool, PooledAgent, PoolExhaustedError
+
+        pool = AgentPool(lambda: PooledAgent(llm=object(), executor=object()), size=1, max_overflow=1, timeout=0.05)
+
+        with pool.acquire(), pool.acquire():
+            with pytest.raises(PoolExhaustedError):
+                with pool.acquire():
+                    pass
+
+        assert pool.stats()["in_use"] == 0
+        assert pool.stats()["created"] == 2
+
+    @pytest.mark.asyncio
+    async def test_async_acquire_waits_for_returned_agent(self):
+        import asyncio
+        from app.agents.pool import AgentPool, PooledAgent
+
+        pool = AgentPool(lambda: PooledAgent(llm=object(), executor=object()), size=1, max_overflow=0, timeout=2)
+
+        async def hold():
+            async with pool.aacquire() as agent:
+                await asyncio.sleep(0.05)
+                return agent
+
+        async def borrow_after_hold():
+            await asyncio.sleep(0.01)
+            async with pool.aacquire() as agent:
+                return agent
+
+        first, second = await asyncio.gather(hold(), borrow_after_hold())
+
+        assert first is second
+        assert pool.stats()["created"] == 1
+
+    @pytest.mark.asyncio
+    async def test_waiters_do_not_starve_the_sync_executor(self, monkeypatch):
+        import asyncio
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        import app.utils.concurrency as concurrency
+        from app.agents.pool import AgentPool, PooledAgent
+
+        executor = ThreadPoolExecutor(max_workers=2)
+        monkeypatch.setattr(concurrency, "_executor", executor)
+        pool = AgentPool(lambda: PooledAgent(llm=object(), executor=object()), size=1, max_overflow=0, timeout=2)
+        pool.start()
+
+        async def waiter():
+            async with pool.aacquire():
+                return True
+
+        async with pool.aacquire():
+            waiters = [asyncio.create_task(waiter()) for _ in range(4)]
+            await asyncio.sleep(0.01)
+            # Tool call pemegang agent tetap dapat thread walau ada yang menunggu
+            started = time.perf_counter()
+            await concurrency.run_sync(time.sleep, 0.01)
+            assert time.perf_counter() - started < 0.5
+
+        assert await asyncio.gather(*waiters) == [True] * 4
+        assert pool.stats()["in_use"] == 0
+        executor.shutdown()
+
+    def test_close_drops_agents(self):
+        pool = self._make_pool(size=2)
+        pool.start()
+        pool.close()
+
+        with pool.acquire():
+            pass
+
+        assert pool.stats()["idle"] == 0
+
+
+class TestAsyncTools:
+    """Tests for the async tool wrappers used by agenerate_itinerary."""
+
+    @pytest.mark.asyncio
+    async def test_async_tools_match_sync(self):
+        from app.agents.planner import tools
+
+        hotels = next(t for t in tools if t.name == "search_hotels")
+        args = {"destination": "Bali", "checkin": "2025-12-20", "checkout": "2025-12-24"}
+
+        assert await hotels.ainvoke(args) == hotels.invoke(args)
+
+    @pytest.mark.asyncio
+    async def test_run_sync_uses_thread_pool(self):
+        import threading
+        from app.utils.concurrency import run_sync
+
+        thread_name = await run_sync(lambda: threading.current_thread().name)
+        assert thread_name.startswith("planner-sync")
+
+
+class TestItineraryCache:
+    """Tests for the normalized itinerary cache."""
+
+    def _params(self, **overrides):
+        params = {
+            "user_id": "user_3",
+            "destination": "Yogyakarta",
+            "start_date": "2025-12-20",
+            "end_date": "2025-12-24",
+            "budget_idr": 5_000_000,
+            "travel_type": "culture",
+            "travelers": 2,
+            "preferences": "prefer homestay, local food"
+        }
+        params.update(overrides)
+        return params
+
+    def test_canonicalize_preferences(self):
+        from app.agents.itinerary_cache import canonicalize_preferences
+
+        assert canonicalize_preferences("Prefer homestay, local food") == \
+            canonicalize_preferences("local food and homestay")
+        assert canonicalize_preferences(None) == ""
+
+    def test_fingerprint_normalizes_request(self):
+        from app.agents.itinerary_cache import plan_fingerprint
+
+        base = plan_fingerprint(**self._params())
+        assert plan_fingerprint(**self._params(destination=" yogyakarta ", budget_idr=5_050_000)) == base
+        assert plan_fingerprint(**self._params(travel_type="adventure")) != base
+
+    def test_fingerprint_uses_busy_dates_not_user_id(self):
+        from app.agents.itinerary_cache import plan_fingerprint
+
+        # user_3 dan user_4 sama-sama tidak punya event
+        assert plan_fingerprint(**self._params(user_id="user_4")) == plan_fingerprint(**self._params())
+        # user_1 punya meeting tanggal 22
+        assert plan_fingerprint(**self._params(user_id="user_1")) != plan_fingerprint(**self._params())
+
+    @pytest.mark.asyncio
+    async def test_plan_itinerary_uses_cache(self, monkeypatch):
+        import app.agents.orchestrator as orchestrator
+        from app.agents.itinerary_cache import itinerary_cache
+
+        itinerary_cache.clear()
+        calls = []
+
+        async def fake_agent(**params):
+            calls.append(params)
+            return {"success": True, "itinerary": {"destination": "Yogyakarta", "total_estimated_cost": 4_000_000}}
+
+        monkeypatch.setattr(orchestrator, "agenerate_itinerary", fake_agent)
+
+        first = await orchestrator.plan_itinerary(**self._params())
+        second = await orchestrator.plan_itinerary(**self._params(preferences="local food and homestay"))
+        bypassed = await orchestrator.plan_itinerary(**self._params(), bypass_cache=True)
+
+        assert first["cache_hit"] is False
+        assert second["cache_hit"] is True
+        assert bypassed["cache_hit"] is False
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_plan_itinerary_falls_back_and_caches(self, monkeypatch):
+        import app.agents.orchestrator as orchestrator
+        from app.agents.itinerary_cache import itinerary_cache
+
+        itinerary_cache.clear()
+
+        async def failing_agent(**params):
+            return {"success": False, "error": "Failed to parse itinerary from agent output."}
+
+        monkeypatch.setattr(orchestrator, "agenerate_itinerary", failing_agent)
+
+        first = await orchestrator.plan_itinerary(**self._params())
+        second = await orchestrator.plan_itinerary(**self._params())
+
+        assert first["tools_used"] == ["fallback_generator"]
+        assert second["cache_hit"] is True
+
+    @pytest.mark.asyncio
+    async def test_plan_itinerary_resolves_destination_alias(self, monkeypatch):
+        import app.agents.orchestrator as orchestrator
+        from app.agents.itinerary_cache import itinerary_cache
+
+        itinerary_cache.clear()
+        calls = []
+
+        async def fake_agent(**params):
+            calls.append(params)
+            return {"success": True, "itinerary": {"destination": params["destination"], "total_estimated_cost": 4_000_000}}
+
+        monkeypatch.setattr(orchestrator, "agenerate_itinerary", fake_agent)
+
+        first = await orchestrator.plan_itinerary(**self._params(destination="Jogja"))
+        second = await orchestrator.plan_itinerary(**self._params(destination="Yogyakarta"))
+
+        # Alias di-resolve sebelum tool dipanggil, dan berbagi entry cache dengan nama kanonik
+        assert calls[0]["destination"] == "Yogyakarta"
+        assert first["itinerary"]["destination"] == "Yogyakarta"
+        assert second["cache_hit"] is True
+        assert len(calls) == 1
+
+
+class TestHedgedPlanning:
+    """Tests for racing the LLM planner against the fallback under a deadline."""
+
+    PARAMS = {
+        "user_id": "user_5",
+        "destination": "Yogyakarta",
+        "start_date": "2025-12-20",
+        "end_date": "2025-12-24",
+        "budget_idr": 5_000_000,
+        "bypass_cache": True
+    }
+
+    @pytest.mark.asyncio
+    async def test_slow_llm_returns_provisional_then_upgrades(self, monkeypatch):
+        import asyncio
+        import app.agents.orchestrator as orchestrator
+
+        async def slow_agent(**params):
+            await asyncio.sleep(0.2)
+            return {"success": True, "itinerary": {"destination": "Yogyakarta", "total_estimated_cost": 1}}
+
+        upgraded = asyncio.Event()
+        upgrades = []
+
+        async def on_upgrade(result):
+            upgrades.append(result)
+            upgraded.set()
+
+        monkeypatch.setattr(orchestrator, "agenerate_itinerary", slow_agent)
+
+        result = await orchestrator.plan_itinerary(**self.PARAMS, hedge_deadline=0.05, on_upgrade=on_upgrade)
+
+        assert result["provisional"] is True
+        assert result["tools_used"] == ["fallback_generator"]
+        assert not upgrades
+
+        await asyncio.wait_for(upgraded.wait(), timeout=2)
+        assert upgrades[0]["itinerary"]["total_estimated_cost"] == 1
+        assert upgrades[0]["fallback"] is False
+
+    @pytest.mark.asyncio
+    async def test_missed_deadline_without_upgrade_is_not_provisional(self, monkeypatch):
+        import asyncio
+        import app.agents.orchestrator as orchestrator
+
+        async def slow_agent(**params):
+            await asyncio.sleep(0.2)
+            return {"success": True, "itinerary": {"destination": "Yogyakarta", "total_estimated_cost": 1}}
+
+        monkeypatch.setattr(orchestrator, "agenerate_itinerary", slow_agent)
+
+        result = await orchestrator.plan_itinerary(**self.PARAMS, hedge_deadline=0.05)
+
+        assert result["provisional"] is False
+        assert result["fallback"] is True
+        await asyncio.gather(*orchestrator._background_tasks)
+
+    @pytest.mark.asyncio
+    async def test_failed_upgrade_still_finalizes(self):
+        import asyncio
+        import app.agents.orchestrator as orchestrator
+
+        async def crash():
+            raise RuntimeError("boom")
+
+        upgrades = []
+        delivered = asyncio.Event()
+
+        async def on_upgrade(result):
+            upgrades.append(result)
+            delivered.set()
+
+        task = asyncio.ensure_future(crash())
+        task.add_done_callback(lambda t: orchestrator._deliver_upgrade(t, on_upgrade))
+        await asyncio.wait_for(delivered.wait(), timeout=2)
+
+        assert upgrades[0]["success"] is False
+        assert "boom" in upgrades[0]["error"]
+
+    @pytest.mark.asyncio
+    async def test_fast_llm_is_not_provisional(self, monkeypatch):
+        import app.agents.orchestrator as orchestrator
+
+        async def fast_agent(**params):
+            return {"success": True, "itinerary": {"destination": "Yogyakarta", "total_estimated_cost": 1}}
+
+        monkeypatch.setattr(orchestrator, "agenerate_itinerary", fast_agent)
+
+        result = await orchestrator.plan_itinerary(**self.PARAMS, hedge_deadline=1)
+
+        assert "provisional" not in result
+        assert result["itinerary"]["total_estimated_cost"] == 1
+
+
+class TestPrefetchPlanner:
+    """Tests for the single-shot prefetch planner mode."""
+
+    @pytest.mark.asyncio
+    async def test_prefetch_uses_single_llm_call(self, monkeypatch):
+        import json
+        import app.agents.planner as planner
+        from langchain_core.language_models import FakeListChatModel
+        from app.agents.pool import AgentPool, PooledAgent
+
+        itinerary = {"trip_name": "Culture Trip", "destination": "Yogyakarta", "days": [], "total_estimated_cost": 0}
+        llm = FakeListChatModel(responses=[json.dumps(itinerary), "unused"])
+        monkeypatch.setattr(planner, "planner_pool", AgentPool(lambda: PooledAgent(llm=llm, executor=None), size=1))
+
+        result = await planner.agenerate_itinerary_prefetch(
+            user_id="user_1",
+            destination="Yogyakarta",
+            start_date="2025-12-20",
+            end_date="2025-12-24",
+            budget_idr=5_000_000
+        )
+
+        assert result["success"] is True
+        assert result["itinerary"]["destination"] == "Yogyakarta"
+        assert result["llm_calls"] == 1
+        assert "check_calendar" in result["tools_used"]
+        # FakeListChatModel berputar ke response berikutnya di setiap panggilan
+        assert llm.i == 1
+
+    def test_resolve_planner_mode(self):
+        import app.agents.orchestrator as orchestrator
+
+        assert orchestrator._resolve_planner("prefetch") is orchestrator.agenerate_itinerary_prefetch
+        assert orchestrator._resolve_planner("react") is orchestrator.agenerate_itinerary
+        assert orchestrator._resolve_planner("plan_execute") is orchestrator.agenerate_itinerary_plan_execute
+
+
+class TestPlanJobQueue:
+    """Tests for fair scheduling and backpressure in the plan job queue."""
+
+    def test_round_robin_between_users(self):
+        from app.agents.jobs import PlanJobQueue, PlanJob
+
+        queue = PlanJobQueue(workers=1, max_depth=10, max_per_user=5)
+        for plan_id in ("a1", "a2", "a3"):
+            queue.submit(PlanJob(plan_id=plan_id, user_id="alice"))
+        queue.submit(PlanJob(plan_id="b1", user_id="bob"))
+
+        order = [queue._next_job().plan_id for _ in range(4)]
+
+        assert order == ["a1", "b1", "a2", "a3"]
+        assert queue.depth == 0
+
+    def test_backpressure(self):
+        from app.agents.jobs import PlanJobQueue, PlanJob, QueueFullError, UserQueueFullError
+
+        queue = PlanJobQueue(workers=1, max_depth=2, max_per_user=1)
+        queue.submit(PlanJob(plan_id="a1", user_id="alice"))
+
+        with pytest.raises(UserQueueFullError):
+            queue.submit(PlanJob(plan_id="a2", user_id="alice"))
+
+        queue.submit(PlanJob(plan_id="b1", user_id="bob"))
+        with pytest.raises(QueueFullError):
+            queue.submit(PlanJob(plan_id="c1", user_id="carol"))
+
+
+class TestSingleFlight:
+    """Tests for request coalescing of identical in-flight plans."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        import asyncio
+        from app.utils.singleflight import SingleFlight
+
+        flight = SingleFlight("test_flight")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+        assert len(calls) == 1
+        assert [r for r, _ in results] == ["done"] * 5
+        assert sum(shared for _, shared in results) == 4
+        assert flight.inflight == 0
+
+    @pytest.mark.asyncio
+    async def test_plan_itinerary_coalesces_identical_requests(self, monkeypatch):
+        import asyncio
+        import app.agents.orchestrator as orchestrator
+        from app.agents.itinerary_cache import itinerary_cache
+
+        itinerary_cache.clear()
+        calls = []
+
+        async def slow_agent(**params):
+            calls.append(params)
+            await asyncio.sleep(0.01)
+            return {"success": True, "itinerary": {"destination": "Bali", "total_estimated_cost": 1_000_000}}
+
+        monkeypatch.setattr(orchestrator, "agenerate_itinerary", slow_agent)
+        params = dict(user_id="user_3", destination="Bali", start_date="2025-12-20",
+                      end_date="2025-12-22", budget_idr=3_000_000, bypass_cache=True)
+
+        results = await asyncio.gather(*(orchestrator.plan_itinerary(**params) for _ in range(3)))
+
+        assert len(calls) == 1
+        assert sorted(r["coalesced"] for r in results) == [False, True, True]
+        # Setiap pemanggil mendapat salinan sendiri
+        assert results[0]["itinerary"] is not results[1]["itinerary"]
+
+
+class TestObservationEncoding:
+    """Tests for the compact tool observation encoder."""
+
+    def test_hotels_table_projection_and_top_k(self, monkeypatch):
+        from app.config import settings
+        from app.agents.observations import encode_observation
+        from app.tools.search import search_hotels
+
+        monkeypatch.setattr(settings, "OBSERVATION_FORMAT", "table")
+        monkeypatch.setattr(settings, "OBSERVATION_TOP_K", {"search_hotels": 2})
+        hotels = search_hotels("Yogyakarta", "2025-12-20", "2025-12-24")
+
+        text = encode_observation("search_hotels", hotels, max_price=400000)
+        lines = text.split("\n")
+
+        assert lines[0] == f"search_hotels: 2 of {len(hotels)} results"
+        assert lines[1] == "id|name|type|price_per_night|rating|amenities"
+        # Hotel dalam budget dengan rating tertinggi di urutan pertama
+        assert lines[2].startswith("htl_003|")
+        assert "checkin" not in text and "available" not in text
+        assert len(lines) == 4
+
+    def test_hotels_without_cap_keep_cheapest(self, monkeypatch):
+        from app.config import settings
+        from app.agents.observations import encode_observation
+
+        monkeypatch.setattr(settings, "OBSERVATION_FORMAT", "table")
+        monkeypatch.setattr(settings, "OBSERVATION_TOP_K", {"search_hotels": 2})
+        hotels = [
+            {"id": "lux1", "price_per_night": 3000000, "rating": 4.9},
+            {"id": "lux2", "price_per_night": 2500000, "rating": 4.8},
+            {"id": "cheap", "price_per_night": 300000, "rating": 4.1},
+        ]
+
+        lines = encode_observation("search_hotels", hotels).split("\n")
+
+        assert lines[2].startswith("cheap|")
+        assert lines[3].startswith("lux2|")
+
+    def test_json_format_is_compact(self, monkeypatch):
+        import json
+        from app.config import settings
+        from app.agents.observations import encode_observation
+
+        monkeypatch.setattr(settings, "OBSERVATION_FORMAT", "json")
+        flights = [
+            {"id": "f1", "airline": "A", "price": 900, "date": "2025-12-20"},
+            {"id": "f2", "airline": "B", "price": 500, "date": "2025-12-20"},
+        ]
+
+        lines = encode_observation("search_flights", flights).split("\n")
+
+        assert json.loads(lines[1]) == {"id": "f2", "airline": "B", "price": 500}
+        assert " " not in lines[1]
+
+    def test_budget_trims_rows(self):
+        from app.agents.observations import fit_to_budget, observation_budget
+
+        observation = "\n".join(["search_hotels: 20 of 20 results", "id|name"] + [f"htl_{i:03d}|Hotel {i}" for i in range(20)])
+
+        with observation_budget(30) as budget:
+            first = fit_to_budget(observation)
+            second = fit_to_budget(observation)
+
+        assert "more rows omitted" in first
+        assert first.startswith("search_hotels: 20 of 20 results\nid|name\nhtl_000")
+        assert budget.used >= 30
+        assert second.startswith("Observation omitted")
+
+    def test_no_budget_passthrough(self):
+        from app.agents.observations import fit_to_budget, observation_budget
+
+        with observation_budget(0):
+            assert fit_to_budget("a\nb") == "a\nb"
+
+
+class TestPlanInstrumentation:
+    """Tests for per-step agent instrumentation."""
+
+    @pytest.mark.asyncio
+    async def test_react_run_records_steps(self, monkeypatch):
+        import json
+        import app.agents.planner as planner
+        from langchain_core.language_models import FakeListChatModel
+        from app.agents.pool import AgentPool, PooledAgent
+
+        itinerary = {"trip_name": "Culture Trip", "destination": "Yogyakarta", "days": [], "total_estimated_cost": 0}
+        llm = FakeListChatModel(responses=[
+            "Thought: I need destination info\nAction: get_destination_info\nAction Input: Yogyakarta",
+            "I am not following the format",
+            f"Thought: I now know the final answer\nFinal Answer: {json.dumps(itinerary)}",
+        ])
+        agent = PooledAgent(llm=llm, executor=planner.create_planner_agent(llm=llm))
+        monkeypatch.setattr(planner, "planner_pool", AgentPool(lambda: agent, size=1))
+
+        result = await planner.agenerate_itinerary(
+            user_id="user_1",
+            destination="Yogyakarta",
+            start_date="2025-12-20",
+            end_date="2025-12-24",
+            budget_idr=5_000_000
+        )
+
+        assert result["success"] is True
+        agent_metrics = result["metrics"]
+        assert agent_metrics["mode"] == "react"
+        assert len(agent_metrics["llm_calls"]) == 3
+        assert [c["tool"] for c in agent_metrics["tool_calls"]] == ["get_destination_info"]
+        assert agent_metrics["parse_errors"] == 1
+        assert agent_metrics["iterations"] == 3
+
+    def test_usage_metadata_and_histograms(self):
+        from uuid import uuid4
+        from langchain_core.messages import AIMessage
+        from langchain_core.outputs import ChatGeneration, LLMResult
+        from app.agents.instrumentation import PlanInstrumentation
+        from app.utils.metrics import metrics
+
+        handler = PlanInstrumentation(mode="prefetch")
+        run_id = uuid4()
+        handler.on_chat_model_start({}, [[]], run_id=run_id)
+        message = AIMessage(content="{}", usage_metadata={"input_tokens": 1200, "output_tokens": 300, "total_tokens": 1500})
+        handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+
+        tool_run = uuid4()
+        handler.on_tool_start({"name": "search_hotels"}, "{}", run_id=tool_run)
+        handler.on_tool_end("ok", run_id=tool_run)
+
+        before = metrics.histogram("plan_tool_call_seconds", "").count(tool="search_hotels")
+        summary = handler.observe()
+
+        assert summary["total_prompt_tokens"] == 1200
+        assert summary["total_completion_tokens"] == 300
+        assert summary["tool_calls"][0]["tool"] == "search_hotels"
+        assert metrics.histogram("plan_tool_call_seconds", "").count(tool="search_hotels") == before + 1
+        assert 'plan_llm_call_tokens_bucket{kind="prompt",le="2000"}' in metrics.render()
+
+
+class TestPromptCache:
+    """Tests for static prompt prefixes and cached-token reporting."""
+
+    def test_static_prefix_leads_rendered_prompts(self):
+        import app.agents.planner as planner
+        from app.agents.prompt_cache import match_prefix
+
+        prompt = planner._prefetch_prompt.format(
+            input="Trip to Bali", calendar="free", hotels="h", activities="a", destination_info="d"
+        )
+        assert match_prefix(prompt).name == "prefetch"
+        assert "{input}" not in match_prefix(prompt).text
+
+        react = planner._react_prompt.format(input="Trip to Bali", agent_scratchpad="")
+        assert react == planner.REACT_PROMPT.format(
+            input="Trip to Bali", agent_scratchpad="", **planner._react_tools
+        )
+        assert match_prefix(react).name == "react"
+
+    def test_local_cache_warms_then_hits(self, monkeypatch):
+        from uuid import uuid4
+        from langchain_core.messages import AIMessage, HumanMessage
+        from langchain_core.outputs import ChatGeneration, LLMResult
+        import app.agents.instrumentation as instrumentation
+        import app.agents.planner as planner
+        from app.agents.prompt_cache import LocalPromptCache, match_prefix
+
+        monkeypatch.setattr(instrumentation, "prompt_cache", LocalPromptCache(ttl=60))
+        prompt = planner._synthesis_prompt.format(input="Trip to Bali", tool_results="none")
+        handler = instrumentation.PlanInstrumentation(mode="plan_execute")
+        for _ in range(2):
+            run_id = uuid4()
+            handler.on_chat_model_start({}, [[HumanMessage(content=prompt)]], run_id=run_id)
+            handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=AIMessage(content="{}"))]]), run_id=run_id)
+
+        expected = match_prefix(prompt).tokens
+        assert [c["cached_prompt_tokens"] for c in handler.llm_calls] == [0, expected]
+        assert handler.summary()["total_cached_prompt_tokens"] == expected
+
+    def test_provider_reported_cached_tokens(self):
+        from uuid import uuid4
+        from langchain_core.outputs import Generation, LLMResult
+        from app.agents.instrumentation import PlanInstrumentation
+
+        handler = PlanInstrumentation(mode="prefetch")
+        run_id = uuid4()
+        handler.on_llm_start({}, ["prompt"], run_id=run_id)
+        usage = {"prompt_token_count": 900, "candidates_token_count": 100, "cached_content_token_count": 640}
+        handler.on_llm_end(
+            LLMResult(generations=[[Generation(text="{}", generation_info={"usage_metadata": usage})]]),
+            run_id=run_id
+        )
+
+        assert handler.llm_calls[0]["cached_prompt_tokens"] == 640
+        assert handler.summary()["total_prompt_tokens"] == 900
+
+
+class TestJSONExtract:
+    """Tests for the single-pass JSON extractor used on agent output."""
+
+    def test_nested_object_in_markdown_fence(self):
+        from app.agents.planner import _extract_json_from_output
+
+        output = (
+            "Thought: I now know the final answer\nFinal Answer: ```json\n"
+            '{"destination": "Bali", "days": [{"date": "2025-12-20", "lodging": {"name": "Ubud {Villa}"}}],'
+            ' "note": "quote \\" and } inside"}\n```'
+        )
+        parsed = _extract_json_from_output(output)
+
+        assert parsed["destination"] == "Bali"
+        assert parsed["days"][0]["lodging"]["name"] == "Ubud {Villa}"
+        assert parsed["note"] == 'quote " and } inside'
+
+    def test_trailing_commas_and_prose_braces(self):
+        from app.agents.json_extract import extract_json_object
+
+        text = 'Use {placeholders} carefully. {"destination": "Bali", "days": [1, 2, ], "x": {"a": 1,},\n}'
+
+        assert extract_json_object(text) == {"destination": "Bali", "days": [1, 2], "x": {"a": 1}}
+        assert extract_json_object("no json here") is None
+
+    def test_resync_after_stray_brace(self):
+        from app.agents.json_extract import extract_json_object, iter_json_objects
+
+        text = 'Thought: budget is {tight\nFinal Answer: {"destination": "Bali", "days": []}'
+        assert extract_json_object(text) == {"destination": "Bali", "days": []}
+
+        # Tanpa penanda: kandidat gagal di-scan ulang dari "{" berikutnya
+        assert extract_json_object('Thought: {"unterminated {"destination": "Bali"}') == {"destination": "Bali"}
+        chunks = ['note {tig', 'ht {"a": 1} ', 'x']
+        assert list(iter_json_objects(chunks)) == [{"a": 1}]
+
+    def test_fence_inside_string_value(self):
+        from app.agents.planner import _extract_json_from_output
+
+        output = 'Final Answer: {"destination": "Bali", "note": "bring ```code``` and Final Answer: x", "days": []}'
+
+        assert _extract_json_from_output(output)["note"] == "bring ```code``` and Final Answer: x"
+
+    def test_stray_braces_stay_linear(self):
+        import time
+        from app.agents.json_extract import extract_json_object
+
+        valid = '{"destination": "Bali", "days": []}'
+        started = time.perf_counter()
+
+        assert extract_json_object("{" * 8000) is None
+        assert extract_json_object("{tight " * 2000 + valid) == {"destination": "Bali", "days": []}
+        assert time.perf_counter() - started < 1
+
+    def test_incremental_feed(self):
+        from app.agents.json_extract import JSONObjectExtractor
+
+        text = 'prefix {"destination": "Bali", "s": "a,}"} tail {"b": 2}'
+        extractor = JSONObjectExtractor()
+        candidates = []
+        for i in range(0, len(text), 3):
+            candidates.extend(extractor.feed(text[i:i + 3]))
+
+        assert candidates == ['{"destination": "Bali", "s": "a,}"}', '{"b": 2}']
+        assert extractor.partial is False
+
+
+class TestLLMBackends:
+    """Tests for the record/replay LLM backends."""
+
+    RESPONSES = [
+        "Thought: I need destination info\nAction: get_destination_info\nAction Input: Yogyakarta",
+        'Thought: I now know the final answer\nFinal Answer: {"destination": "Yogyakarta", "days": []}',
+    ]
+
+    def _run_agent(self, llm):
+        from app.agents.planner import create_planner_agent
+
+        executor = create_planner_agent(llm=llm)
+        return executor.invoke({"input": "Plan a trip to Yogyakarta"})["output"]
+
+    def test_record_then_replay_agent_run(self, tmp_path):
+        import os
+        from langchain_core.language_models import FakeListChatModel
+        from app.agents.llm_backends import Cassette, RecordingChatModel, ReplayChatModel
+
+        path = str(tmp_path / "planner.json")
+        recorder = RecordingChatModel(inner=FakeListChatModel(responses=self.RESPONSES), cassette=Cassette(path))
+        recorded_output = self._run_agent(recorder)
+        assert not os.path.exists(path)  # Rekaman di-buffer sampai flush
+        recorder.cassette.flush()
+
+        cassette = Cassette(path)
+        replayed_output = self._run_agent(ReplayChatModel(cassette=cassette))
+
+        assert len(cassette) == 2
+        assert replayed_output == recorded_output
+        assert '"destination": "Yogyakarta"' in replayed_output
+
+    def test_loose_match_and_miss(self, tmp_path):
+        from langchain_core.messages import HumanMessage
+        from app.agents.llm_backends import Cassette, CassetteMissError, ReplayChatModel
+
+        cassette = Cassette(str(tmp_path / "c.json"))
+        cassette.record("human: " + "x" * 600 + "\nObservation: hotels v1", "step one")
+        llm = ReplayChatModel(cassette=cassette)
+
+        # Data observation berubah, tapi template dan jumlah langkah sama
+        assert llm.invoke([HumanMessage(content="x" * 600 + "\nObservation: hotels v2")]).content == "step one"
+        with pytest.raises(CassetteMissError):
+            llm.invoke([HumanMessage(content="something else")])
+
+    def test_loose_key_separates_prompts_with_same_prefix(self, tmp_path):
+        from app.agents.llm_backends import Cassette
+
+        prefix = "human: " + "x" * 600
+        cassette = Cassette(str(tmp_path / "c.json"))
+        cassette.record(prefix + "\nRequest:\nA\n\nHotels (search_hotels):\nv1", "prefetch")
+        cassette.record(prefix + "\nRequest:\nA\n\nTool results:\nv1", "synthesis")
+
+        assert cassette.lookup(prefix + "\nRequest:\nB\n\nHotels (search_hotels):\nv2")["completion"] == "prefetch"
+        assert cassette.lookup(prefix + "\nRequest:\nB\n\nTool results:\nv2")["completion"] == "synthesis"
+
+    @pytest.mark.asyncio
+    async def test_replay_streams_with_latency(self, tmp_path):
+        import time
+        from langchain_core.messages import HumanMessage
+        from app.agents.llm_backends import Cassette, ReplayChatModel
+
+        cassette = Cassette(str(tmp_path / "c.json"))
+        cassette.record("human: hi", "hello there friend")
+        llm = ReplayChatModel(cassette=cassette, latency_seconds=0.05)
+
+        started = time.perf_counter()
+        chunks = [chunk.content async for chunk in llm.astream([HumanMessage(content="hi")])]
+
+        assert time.perf_counter() - started >= 0.05
+        assert chunks == ["hello ", "there ", "friend"]
+
+
+class TestPlanExecutePlanner:
+    """Tests for the plan-and-execute planner with an LLM call cap."""
+
+    PARAMS = dict(
+        user_id="user_1",
+        destination="Yogyakarta",
+        start_date="2025-12-20",
+        end_date="2025-12-24",
+        budget_idr=5_000_000
+    )
+
+    def _use_llm(self, monkeypatch, responses):
+        import app.agents.planner as planner
+        from langchain_core.language_models import FakeListChatModel
+        from app.agents.pool import AgentPool, PooledAgent
+
+        llm = FakeListChatModel(responses=responses)
+        monkeypatch.setattr(planner, "planner_pool", AgentPool(lambda: PooledAgent(llm=llm, executor=None), size=1))
+        return planner
+
+    @pytest.mark.asyncio
+    async def test_plans_tools_then_synthesizes(self, monkeypatch):
+        import json
+
+        plan = {"tool_calls": [
+            {"tool": "check_calendar", "args": {"user_id": "someone_else", "range_start": "2025-12-20", "range_end": "2025-12-24"}},
+            {"tool": "search_hotels", "args": {"destination": "Yogyakarta", "checkin": "2025-12-20", "checkout": "2025-12-24"}},
+            {"tool": "get_destination_info", "args": {"destination": "Yogyakarta"}},
+            {"tool": "rm_rf", "args": {}},
+        ]}
+        itinerary = {"trip_name": "Trip", "destination": "Yogyakarta", "days": [], "total_estimated_cost": 0}
+        planner = self._use_llm(monkeypatch, [json.dumps(plan), json.dumps(itinerary)])
+
+        result = await planner.agenerate_itinerary_plan_execute(**self.PARAMS, max_llm_calls=3)
+
+        assert result["success"] is True
+        assert result["llm_calls"] == 2
+        assert result["tools_used"] == ["check_calendar", "search_hotels", "get_destination_info"]
+        assert len(result["metrics"]["tool_calls"]) == 3
+
+    @pytest.mark.asyncio
+    async def test_cap_is_never_exceeded(self, monkeypatch):
+        planner = self._use_llm(monkeypatch, ["not json", "still not json", "nope"])
+
+        result = await planner.agenerate_itinerary_plan_execute(**self.PARAMS, max_llm_calls=2)
+
+        # Planning gagal -> tool default; sintesis gagal dan kuota habis
+        assert result["success"] is False
+        assert result["llm_calls"] == 2
+        assert "check_calendar" in result["tools_used"]
+
+    @pytest.mark.asyncio
+    async def test_single_call_skips_planning(self, monkeypatch):
+        import json
+
+        itinerary = {"trip_name": "Trip", "destination": "Yogyakarta", "days": [], "total_estimated_cost": 0}
+        planner = self._use_llm(monkeypatch, [json.dumps(itinerary), "unused"])
+
+        result = await planner.agenerate_itinerary_plan_execute(**self.PARAMS, max_llm_calls=1)
+
+        assert result["success"] is True
+        assert result["llm_calls"] == 1
+        assert result["tools_used"] == ["check_calendar", "search_hotels", "search_activities", "get_destination_info"]
+
+    @pytest.mark.asyncio
+    async def test_failed_call_is_counted(self, monkeypatch):
+        planner = self._use_llm(monkeypatch, [])
+
+        async def failing_complete(llm, prompt, config, stream=False):
+            raise TimeoutError("LLM timed out")
+
+        monkeypatch.setattr(planner, "_complete", failing_complete)
+
+        result = await planner.agenerate_itinerary_plan_execute(**self.PARAMS, max_llm_calls=3)
+
+        assert result["success"] is False
+        assert result["llm_calls"] == 1
@@ -0,0 +1,357 @@
+# tests/test_api.py
+"""
+API tests for plan endpoints (LLM replaced with fake chat models).
+"""
+import json
+import pytest
+
+SAMPLE_ITINERARY = {
+    "trip_name": "Culture Trip to Yogyakarta",
+    "destination": "Yogyakarta",
+    "start_date": "2025-12-20",
+    "end_date": "2025-12-21",
+    "days": [
+        {
+            "date": "2025-12-20",
+            "activities": [
+                {"time": "09:00", "name": "Prambanan Temple Visit", "description": "Hindu temple", "estimated_cost": 350000}
+            ],
+            "lodging": {"name": "Rumah Palagan Homestay", "price": 350000},
+            "transport": {"type": "Local transport", "estimated_cost": 50000},
+            "daily_cost": 750000
+        }
+    ],
+    "total_estimated_cost": 750000,
+    "recommended_hotels": [{"id": "htl_003", "name": "Rumah Palagan Homestay", "price_per_night": 350000, "rating": 4.8}]
+}
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Ganti pool planner dengan fake chat model yang mengembalikan SAMPLE_ITINERARY."""
+    import app.agents.planner as planner
+    from langchain_core.language_models import FakeListChatModel
+    from app.agents.pool import AgentPool, PooledAgent
+    from app.agents.itinerary_cache import itinerary_cache
+
+    itinerary_cache.clear()
+    llm = FakeListChatModel(responses=[json.dumps(SAMPLE_ITINERARY)])
+    monkeypatch.setattr(planner, "planner_pool", AgentPool(lambda: PooledAgent(llm=llm, executor=None), size=1))
+    return llm
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestPlanStream:
+    """Tests for POST /api/v1/plan/stream."""
+
+    def test_stream_emits_progress_and_final_plan(self, client, fake_llm, sample_plan_request):
+        sample_plan_request["planner_mode"] = "prefetch"
+
+        response = client.post("/api/v1/plan/stream", json=sample_plan_request)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = _parse_sse(response.text)
+        names = [name for name, _ in events]
+        assert names[0] == "plan_started"
+        assert "tool_start" in names and "tool_end" in names
+        assert "token" in names
+        assert names[-1] == "plan_completed"
+
+        final = events[-1][1]
+        assert final["itinerary"]["destination"] == "Yogyakarta"
+
+        stored = client.get(f"/api/v1/plan/{final['plan_id']}")
+        assert stored.status_code == 200
+
+    def test_plan_saved_after_client_disconnect(self, client, fake_llm, sample_plan_request):
+        import time
+
+        sample_plan_request["planner_mode"] = "prefetch"
+
+        with client.stream("POST", "/api/v1/plan/stream", json=sample_plan_request) as response:
+            first = next(response.iter_text())
+        plan_id = _parse_sse(first)[0][1]["plan_id"]
+
+        status = None
+        for _ in range(50):
+            status = client.get(f"/api/v1/plan/{plan_id}").status_code
+            if status == 200:
+                break
+            time.sleep(0.1)
+
+        assert status == 200
+
+
+class TestPlanJobs:
+    """Tests for async plan jobs (POST /api/v1/plan with async_job)."""
+
+    def test_async_job_returns_202_and_completes(self, client, fake_llm, sample_plan_request, monkeypatch, test_session_factory):
+        import time
+        from app.agents.jobs import plan_job_queue
+
+        monkeypatch.setattr(plan_job_queue, "session_factory", test_session_factory)
+        sample_plan_request.update({"planner_mode": "prefetch", "async_job": True})
+
+        response = client.post("/api/v1/plan", json=sample_plan_request)
+
+        assert response.status_code == 202
+        body = response.json()
+        assert body["status"] == "queued"
+
+        status = None
+        for _ in range(50):
+            status = client.get(f"/api/v1/plan/{body['plan_id']}").json()["status"]
+            if status not in ("queued", "running"):
+                break
+            time.sleep(0.1)
+
+        assert status == "draft"
+
+    def test_user_limit_returns_429(self, client, sample_plan_request, monkeypatch):
+        from app.agents.jobs import plan_job_queue
+
+        monkeypatch.setattr(plan_job_queue, "max_per_user", 0)
+        sample_plan_request["async_job"] = True
+
+        response = client.post("/api/v1/plan", json=sample_plan_request)
+
+        assert response.status_code == 429
+
+
+class TestHedgedPlan:
+    """Tests for hedged POST /api/v1/plan with a latency deadline."""
+
+    def test_provisional_plan_is_upgraded(self, client, sample_plan_request, monkeypatch, test_session_factory):
+        import asyncio
+        import time
+        import app.agents.orchestrator as orchestrator
+        from app.agents.jobs import plan_job_queue
+
+        async def slow_agent(**params):
+            await asyncio.sleep(0.3)
+            return {"success": True, "itinerary": SAMPLE_ITINERARY, "tools_used": ["search_hotels"]}
+
+        monkeypatch.setattr(orchestrator, "agenerate_itinerary", slow_agent)
+        monkeypatch.setattr(plan_job_queue, "session_factory", test_session_factory)
+        sample_plan_request.update({"hedge_deadline_seconds": 0.05, "bypass_cache": True})
+
+        response = client.post("/api/v1/plan", json=sample_plan_request)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["provisional"] is True
+        assert body["status"] == "provisional"
+        assert body["itinerary"] is not None
+
+        plan = None
+        for _ in range(50):
+            plan = client.get(f"/api/v1/plan/{body['plan_id']}").json()
+            if plan["status"] != "provisional":
+                break
+            time.sleep(0.1)
+
+        assert plan["status"] == "draft"
+        assert plan["provisional"] is False
+        assert plan["itinerary"]["trip_name"] == SAMPLE_ITINERARY["trip_name"]
+
+
+class TestPlanBatch:
+    """Tests for POST /api/v1/plan/batch."""
+
+    def test_batch_shares_lookups_and_persists_all(self, client, sample_plan_request, monkeypatch):
+        from app.agents import planner
+        from app.tools.memo import clear_tool_caches
+
+        clear_tool_caches()
+        hotel_searches = []
+        original = planner.search_hotels
+
+        def counting_search_hotels(*args, **kwargs):
+            hotel_searches.append(args)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(planner, "search_hotels", counting_search_hotels)
+
+        async def prefetch_tools_only(**params):
+            # Jalankan tool seperti mode prefetch tanpa LLM
+            calls = planner._default_tool_calls(
+                params["user_id"], params["destination"], params["start_date"], params["end_date"],
+                params["travel_type"], params["preferences"]
+            )
+            await planner._run_tool_calls(calls, config={})
+            return {"success": True, "itinerary": SAMPLE_ITINERARY}
+
+        import app.agents.orchestrator as orchestrator
+        monkeypatch.setattr(orchestrator, "agenerate_itinerary", prefetch_tools_only)
+
+        plans = []
+        for i in range(4):
+            # Budget berbeda supaya tidak digabung oleh single-flight
+            plan = dict(sample_plan_request, user_id=f"group_user_{i}", budget_idr=5_000_000 + i * 1_000_000, bypass_cache=True)
+            plans.append(plan)
+        plans.append(dict(sample_plan_request, destination="Bali", bypass_cache=True))
+
+        response = client.post("/api/v1/plan/batch", json={"plans": plans})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 5
+        assert body["groups"] == 2
+        assert body["succeeded"] == 5
+        assert [item["index"] for item in body["items"]] == list(range(5))
+        # Satu pencarian hotel per kelompok (Yogyakarta, Bali)
+        assert len(hotel_searches) == 2
+
+        plan_id = body["items"][0]["plan"]["plan_id"]
+        assert client.get(f"/api/v1/plan/{plan_id}").json()["status"] == "draft"
+
+    def test_empty_batch_rejected(self, client):
+        response = client.post("/api/v1/plan/batch", json={"plans": []})
+
+        assert response.status_code == 422
+
+
+class TestRegenerateDay:
+    """Tests for POST /api/v1/plan/{plan_id}/days/{date}/regenerate."""
+
+    def _create_plan(self, client, sample_plan_request) -> str:
+        response = client.post("/api/v1/plan", json=dict(sample_plan_request, bypass_cache=True, planner_mode="prefetch"))
+        assert response.status_code == 200
+        return response.json()["plan_id"]
+
+    def _use_llm_responses(self, monkeypatch, responses: list[str]):
+        import app.agents.planner as planner
+        from langchain_core.language_models import FakeListChatModel
+        from app.agents.pool import AgentPool, PooledAgent
+
+        llm = FakeListChatModel(responses=responses)
+        monkeypatch.setattr(planner, "planner_pool", AgentPool(lambda: PooledAgent(llm=llm, executor=None), size=1))
+
+    def test_llm_replaces_only_that_day(self, client, fake_llm, sample_plan_request, monkeypatch):
+        plan_id = self._create_plan(client, sample_plan_request)
+        new_activities = [
+            {"time": "08:00", "name": "Sultan Palace (Kraton) Tour", "description": "Palace", "estimated_cost": 25000},
+            {"time": "13:00", "name": "Batik Workshop", "description": "Batik", "estimated_cost": 200000}
+        ]
+        self._use_llm_responses(monkeypatch, [json.dumps({"activities": new_activities})])
+
+        response = client.post(f"/api/v1/plan/{plan_id}/days/2025-12-20/regenerate", json={"travelers": 2})
+
+        assert response.status_code == 200
+        body = response.json()
+        day = body["itinerary"]["days"][0]
+        assert [a["name"] for a in day["activities"]] == ["Sultan Palace (Kraton) Tour", "Batik Workshop"]
+        assert day["lodging"] == SAMPLE_ITINERARY["days"][0]["lodging"]
+        # 750000 - 350000 (Prambanan) + 225000
+        assert day["daily_cost"] == 625000
+        assert body["itinerary"]["total_estimated_cost"] == 625000
+        assert body["llm_calls"] == 1
+
+        stored = client.get(f"/api/v1/plan/{plan_id}").json()["itinerary"]
+        assert stored["total_estimated_cost"] == 625000
+
+    def test_over_budget_llm_output_uses_fallback(self, client, fake_llm, sample_plan_request, monkeypatch):
+        plan_id = self._create_plan(client, dict(sample_plan_request, budget_idr=1_000_000))
+        expensive = [{"time": "09:00", "name": "Private Helicopter", "description": "Tour", "estimated_cost": 5_000_000}]
+        self._use_llm_responses(monkeypatch, [json.dumps({"activities": expensive})])
+
+        response = client.post(f"/api/v1/plan/{plan_id}/days/2025-12-20/regenerate", json={})
+
+        assert response.status_code == 200
+        itinerary = response.json()["itinerary"]
+        names = [a["name"] for a in itinerary["days"][0]["activities"]]
+        assert "Private Helicopter" not in names
+        assert "Prambanan Temple Visit" not in names
+        assert itinerary["total_estimated_cost"] <= 1_000_000
+
+    def test_concurrent_change_is_merged(self, client, fake_llm, sample_plan_request, monkeypatch, test_session_factory):
+        import app.routers.plans as plans
+        from app.database import PlanDB
+
+        plan_id = self._create_plan(client, sample_plan_request)
+        other_day = {"date": "2025-12-21", "activities": [], "daily_cost": 100000}
+        regenerate_day = plans.regenerate_day
+
+        async def racing_regenerate(*args, **kwargs):
+            result = await regenerate_day(*args, **kwargs)
+            # Regenerasi lain tersimpan selagi request ini menunggu LLM
+            db = test_session_factory()
+            plan = db.query(PlanDB).filter(PlanDB.id == plan_id).first()
+            stored = json.loads(plan.itinerary_json)
+            stored["days"].append(other_day)
+            stored["total_estimated_cost"] += 100000
+            plan.itinerary_json = json.dumps(stored)
+            db.commit()
+            db.close()
+            return result
+
+        monkeypatch.setattr(plans, "regenerate_day", racing_regenerate)
+        new_activities = [{"time": "08:00", "name": "Batik Workshop", "description": "Batik", "estimated_cost": 200000}]
+        self._use_llm_responses(monkeypatch, [json.dumps({"activities": new_activities})])
+
+        response = client.post(f"/api/v1/plan/{plan_id}/days/2025-12-20/regenerate", json={})
+
+        assert response.status_code == 200
+        stored = client.get(f"/api/v1/plan/{plan_id}").json()["itinerary"]
+        assert [a["name"] for a in stored["days"][0]["activities"]] == ["Batik Workshop"]
+        assert stored["days"][1]["date"] == "2025-12-21"
+        # 750000 + 100000 (hari lain) - 350000 + 200000
+        assert stored["total_estimated_cost"] == 700000
+        assert response.json()["itinerary"] == stored
+
+    def test_unknown_day_returns_404(self, client, fake_llm, sample_plan_request):
+        plan_id = self._create_plan(client, sample_plan_request)
+
+        response = client.post(f"/api/v1/plan/{plan_id}/days/2026-01-01/regenerate", json={})
+
+        assert response.status_code == 404
+
+
+class TestMultiCityPlan:
+    """Tests for POST /api/v1/plan/multi-city."""
+
+    def test_route_with_itineraries(self, client, monkeypatch):
+        import app.agents.orchestrator as orchestrator
+        from app.agents.itinerary_cache import itinerary_cache
+
+        async def offline_planner(**params):
+            return {"success": False, "error": "offline"}
+
+        # Setiap kota jatuh ke fallback rule-based
+        itinerary_cache.clear()
+        monkeypatch.setattr(orchestrator, "_resolve_planner", lambda mode: offline_planner)
+
+        response = client.post("/api/v1/plan/multi-city", json={
+            "destinations": ["Yogyakarta", "Bali"],
+            "start_date": "2025-12-20",
+            "end_date": "2025-12-26",
+            "budget_idr": 10_000_000,
+            "travelers": 2,
+            "generate_itineraries": True
+        })
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [stop["city"] for stop in body["stops"]] == [it["destination"] for it in body["itineraries"]]
+        assert body["flights"][0]["origin"] == "Jakarta"
+        assert body["flights"][-1]["destination"] == "Jakarta"
+
+    def test_duplicate_destinations_rejected(self, client):
+        response = client.post("/api/v1/plan/multi-city", json={
+            "destinations": ["Bali", "Bali"],
+            "start_date": "2025-12-20",
+            "end_date": "2025-12-26",
+            "budget_idr": 10_000_000
+        })
+
+        assert response.status_code == 400
@@ -0,0 +1,258 @@
+# tests/test_planning.py
+"""
+Unit tests for the deterministic planning engines (app.planning).
+"""
+import pytest
+
+
+def _activity(i, price, rating=4.0, type_="culture"):
+    return {"id": f"act_{i}", "name": f"Activity {i}", "price": price, "rating": rating, "type": type_, "description": ""}
+
+
+class TestActivitySelection:
+    """Tests for the multi-day knapsack activity selection."""
+
+    def test_knapsack_matches_brute_force(self):
+        import itertools
+        import random
+        import numpy as np
+        from app.planning.selection import knapsack_select
+
+        rng = random.Random(7)
+        for _ in range(50):
+            n, max_items, budget = rng.randint(1, 8), rng.randint(1, 3), rng.randint(0, 500)
+            costs = np.array([rng.randint(0, 300) for _ in range(n)])
+            scores = np.array([rng.uniform(1, 6) for _ in range(n)])
+
+            selected = knapsack_select(costs, scores, budget, max_items)
+
+            best = max(
+                scores[list(combo)].sum()
+                for k in range(max_items + 1)
+                for combo in itertools.combinations(range(n), k)
+                if costs[list(combo)].sum() <= budget
+            )
+            assert costs[selected].sum() <= budget
+            assert len(selected) <= max_items
+            assert scores[selected].sum() == pytest.approx(best)
+
+    def test_respects_daily_and_total_budget(self):
+        from app.planning.selection import select_activities
+
+        activities = [_activity(i, price=(i % 10) * 100_000, rating=3 + (i % 3) * 0.5) for i in range(200)]
+
+        days = select_activities(activities, num_days=4, total_budget=1_000_000, daily_budget=300_000, per_day=2)
+
+        chosen = [a["id"] for day in days for a in day]
+        assert len(days) == 4
+        assert len(chosen) == len(set(chosen))
+        assert all(len(day) <= 2 for day in days)
+        assert all(sum(a["price"] for a in day) <= 300_000 for day in days)
+        assert sum(a["price"] for day in days for a in day) <= 1_000_000
+
+    def test_prefers_matching_type(self):
+        from app.planning.selection import select_activities
+
+        activities = [
+            _activity(1, 100_000, rating=4.5, type_="beach"),
+            _activity(2, 150_000, rating=4.2, type_="culture"),
+        ]
+
+        (day,) = select_activities(activities, num_days=1, total_budget=200_000, per_day=1, travel_type="culture")
+
+        assert [a["id"] for a in day] == ["act_2"]
+
+    def test_fallback_itinerary_within_budget(self):
+        from app.agents.planner import generate_itinerary_fallback
+
+        result = generate_itinerary_fallback(
+            user_id="user_1",
+            destination="Yogyakarta",
+            start_date="2025-12-20",
+            end_date="2025-12-24",
+            budget_idr=3_000_000,
+            travel_type="culture",
+            travelers=2
+        )
+
+        itinerary = result["itinerary"]
+        names = [a["name"] for day in itinerary["days"] for a in day["activities"]]
+        assert len(names) == len(set(names))
+        assert itinerary["total_estimated_cost"] <= 3_000_000
+
+
+class TestMultiCity:
+    """Tests for the multi-city route and night split solver."""
+
+    def test_route_matches_brute_force(self):
+        import itertools
+        import random
+        import numpy as np
+        from app.planning.multicity import solve_route
+
+        rng = random.Random(3)
+        for _ in range(20):
+            n = rng.randint(1, 6)
+            costs = np.array([[0 if i == j else rng.randint(1, 100) for j in range(n + 1)] for i in range(n + 1)])
+            for round_trip in (True, False):
+                order, total = solve_route(costs, round_trip=round_trip)
+
+                best = min(
+                    sum(costs[a][b] for a, b in zip((0,) + path, path)) + (costs[path[-1]][0] if round_trip else 0)
+                    for path in itertools.permutations(range(1, n + 1))
+                )
+                assert total == best
+                assert sorted(order) == list(range(1, n + 1))
+
+    def test_split_nights_prefers_value_within_budget(self):
+        import numpy as np
+        from app.planning.multicity import split_nights
+
+        # Kota A: nilai berhenti naik setelah 1 malam; kota B terus naik
+        values = [np.array([0, 5, 5, 5, 5]), np.array([0, 3, 6, 9, 12])]
+        costs = [np.array([0, 100, 200, 300, 400]), np.array([0, 100, 200, 300, 400])]
+
+        assert split_nights(values, costs, total_nights=4, budget=400) == [1, 3]
+        assert split_nights(values, costs, total_nights=4, budget=399) is None
+
+    def test_plan_multi_city_within_budget(self):
+        from app.planning.multicity import plan_multi_city
+
+        route = plan_multi_city(
+            ["Yogyakarta", "Bali"], "2025-12-20", "2025-12-27", 10_000_000, travel_type="culture", travelers=2
+        )
+
+        assert sorted(s["city"] for s in route["stops"]) == ["Bali", "Yogyakarta"]
+        assert sum(s["nights"] for s in route["stops"]) == 7
+        assert all(s["nights"] >= 1 for s in route["stops"])
+        assert route["stops"][0]["checkin"] == "2025-12-20"
+        assert route["stops"][-1]["checkout"] == "2025-12-27"
+        assert len(route["flights"]) == 3
+        assert route["within_budget"] is True
+        assert route["total_estimated_cost"] <= 10_000_000
+
+    def test_route_order_changes_flight_cost(self):
+        from app.planning.multicity import leg_fare, plan_multi_city
+
+        # Tarif bergantung asal: Yogyakarta -> Bali lebih dekat daripada Jakarta -> Bali
+        assert leg_fare("Yogyakarta", "Bali", "2025-12-20")[1] != leg_fare("Bali", "Yogyakarta", "2025-12-20")[1]
+
+        routes = [
+            plan_multi_city(cities, "2025-12-20", "2025-12-27", 10_000_000, round_trip=False)
+            for cities in (["Yogyakarta", "Bali"], ["Bali", "Yogyakarta"])
+        ]
+        for route in routes:
+            assert [s["city"] for s in route["stops"]] == ["Yogyakarta", "Bali"]
+
+        legs = {(f["origin"], f["destination"]): f["price"] for f in routes[0]["flights"]}
+        reversed_cost = leg_fare("Jakarta", "Bali", "2025-12-20")[1] + leg_fare("Bali", "Yogyakarta", "2025-12-20")[1]
+        assert routes[0]["flight_cost"] == sum(legs.values()) < reversed_cost
+
+    def test_missing_legs_are_infeasible(self):
+        import numpy as np
+        from app.planning.multicity import solve_route
+
+        costs = np.array([[0, 1, np.inf], [np.inf, 0, np.inf], [np.inf, np.inf, 0]])
+        with pytest.raises(ValueError):
+            solve_route(costs, round_trip=False)
+
+        # Leg yang ada tetap dipilih walau leg lain tidak tersedia
+        costs = np.array([[0, 5, np.inf], [np.inf, 0, 2], [1, np.inf, 0]])
+        assert solve_route(costs, round_trip=True) == ([1, 2], 8)
+
+    def test_eight_cities_solve_fast(self):
+        from app.planning.multicity import plan_multi_city
+
+        cities = ["Yogyakarta", "Bali", "Bandung", "Surabaya", "Lombok", "Medan", "Makassar", "Malang"]
+        route = plan_multi_city(cities, "2025-12-01", "2025-12-15", 40_000_000)
+
+        assert len(route["stops"]) == 8
+        assert route["solver_ms"] < 100
+
+    def test_too_few_nights_rejected(self):
+        from app.planning.multicity import plan_multi_city
+
+        with pytest.raises(ValueError):
+            plan_multi_city(["Yogyakarta", "Bali"], "2025-12-20", "2025-12-21", 5_000_000)
+
+
+class TestScheduling:
+    """Tests for duration parsing and interval scheduling."""
+
+    def test_parse_duration(self):
+        from app.planning.scheduling import DEFAULT_DURATION_MINUTES, parse_duration
+
+        assert parse_duration("4 hours") == 240
+        assert parse_duration("full day") == 480
+        assert parse_duration("1h30m") == 90
+        assert parse_duration("2-3 hours") == 180
+        assert parse_duration("45 minutes") == 45
+        assert parse_duration("sometime") == DEFAULT_DURATION_MINUTES
+
+    def test_max_weight_schedule_matches_brute_force(self):
+        import itertools
+        import random
+        from app.planning.scheduling import max_weight_schedule
+
+        rng = random.Random(11)
+        for _ in range(50):
+            intervals = []
+            for _ in range(rng.randint(1, 8)):
+                start = rng.randrange(0, 600, 15)
+                intervals.append((start, start + rng.randrange(30, 240, 15)))
+            weights = [rng.uniform(1, 5) for _ in intervals]
+
+            chosen = max_weight_schedule(intervals, weights, buffer=30)
+
+            def compatible(subset):
+                ordered = sorted(subset, key=lambda i: intervals[i][0])
+                return all(intervals[a][1] + 30 <= intervals[b][0] for a, b in zip(ordered, ordered[1:]))
+
+            best = max(
+                sum(weights[i] for i in subset)
+                for k in range(len(intervals) + 1)
+                for subset in itertools.combinations(range(len(intervals)), k)
+                if compatible(subset)
+            )
+            assert compatible(chosen)
+            assert sum(weights[i] for i in chosen) == pytest.approx(best)
+
+    def test_fallback_days_have_no_overlaps(self):
+        from app.agents.planner import generate_itinerary_fallback
+        from app.planning.scheduling import TRAVEL_BUFFER_MINUTES, parse_time
+
+        result = generate_itinerary_fallback(
+            user_id="user_1", destination="Bali", start_date="2025-12-20", end_date="2025-12-22",
+            budget_idr=9_000_000, travel_type="beach"
+        )
+
+        for day in result["itinerary"]["days"]:
+            spans = [(parse_time(a["time"]), parse_time(a["end_time"])) for a in day["activities"]]
+            assert all(end + TRAVEL_BUFFER_MINUTES <= start for (_, end), (start, _) in zip(spans, spans[1:]))
+            assert all(end <= 21 * 60 for _, end in spans)
+
+    def test_overlapping_llm_activities_dropped(self):
+        from app.agents.planner import _enforce_schedule
+
+        itinerary = {
+            "destination": "Yogyakarta",
+            "days": [{
+                "date": "2025-12-20",
+                "activities": [
+                    {"time": "05:00", "name": "Sunrise at Borobudur Temple", "estimated_cost": 450000},
+                    {"time": "07:00", "name": "Batik Workshop", "estimated_cost": 200000},
+                    {"time": "10:00", "name": "Prambanan Temple Visit", "estimated_cost": 350000},
+                ],
+                "daily_cost": 1000000
+            }],
+            "total_estimated_cost": 1000000
+        }
+
+        dropped = _enforce_schedule(itinerary)
+
+        # Borobudur (4 jam) bentrok dengan Batik Workshop jam 07:00
+        assert len(dropped) == 1
+        assert len(itinerary["days"][0]["activities"]) == 2
+        removed = 450000 if dropped == ["Sunrise at Borobudur Temple"] else 200000
+        assert itinerary["total_estimated_cost"] == 1000000 - removed
+        assert itinerary["days"][0]["daily_cost"] == 1000000 - removed
@@ -229,4 +229,271 @@ class TestBookingTools:
         from app.tools.booking import validate_booking_request
         
         result = validate_booking_request("user_1", "", True)
-        assert result["valid"] == False
\ No newline at end of file
+        assert result["valid"] == False
+
+class TestToolMemo:
+    """Tests for the tool observation memoization layer."""
+    
+    def _counting_tool(self, name, ttl=60):
+        from app.tools.memo import memoize_tool
+        calls = []
+        
+        @memoize_tool(name, ttl=ttl)
+        def tool(destination: str, checkin: str, preferences: str = None) -> str:
+            calls.append((destination, checkin, preferences))
+            return f"{destination}|{checkin}"
+        
+        return tool, calls
+    
+    def test_identical_calls_are_cached(self):
+        tool, calls = self._counting_tool("test_tool_identical")
+        
+        first = tool("Bali", "2025-12-20")
+        second = tool("Bali", "2025-12-20")
+        
+        assert first == second
+        assert len(calls) == 1
+        assert tool.cache.stats()["hits"] == 1
+    
+    def test_arguments_are_normalized(self):
+        tool, calls = self._counting_tool("test_tool_normalized")
+        
+        tool("Bali", "2025-12-20", preferences="Homestay")
+        result = tool(" bali ", "2025/12/20", preferences="homestay")
+        
+        assert len(calls) == 1
+        assert result == "Bali|2025-12-20"
+    
+    def test_dates_normalized_before_call(self):
+        tool, calls = self._counting_tool("test_tool_dates")
+        
+        tool("Bali", "20/12/2025")
+        
+        assert calls[0][1] == "2025-12-20"
+    
+    def test_zero_ttl_disables_cache(self):
+        tool, calls = self._counting_tool("test_tool_disabled", ttl=0)
+        
+        tool("Bali", "2025-12-20")
+        tool("Bali", "2025-12-20")
+        
+        assert len(calls) == 2
+    
+    def test_shared_lookups_dedupe_without_ttl(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from app.tools.memo import shared_lookups
+        import contextvars
+        
+        tool, calls = self._counting_tool("test_tool_shared", ttl=0)
+        
+        with shared_lookups() as scope:
+            context = contextvars.copy_context()
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(lambda _: context.copy().run(tool, "Bali", "2025-12-20"), range(4)))
+        tool("Bali", "2025-12-20")
+        
+        assert results == ["Bali|2025-12-20"] * 4
+        assert len(scope) == 1
+        # 1x di dalam scope, 1x lagi setelah scope selesai
+        assert len(calls) == 2
+
+
+class TestCatalog:
+    """Tests for the file-backed, indexed travel catalog."""
+    
+    @pytest.fixture
+    def catalog_dir(self, tmp_path):
+        import json
+        from app.tools.catalog import load_catalog
+        
+        (tmp_path / "hotels.csv").write_text(
+            "destination,id,name,type,price_per_night,rating,amenities\n"
+            "lombok,htl_l1,Senggigi Beach Hotel,hotel,750000,4.3,wifi;pool;beach\n"
+            "lombok,htl_l2,Kuta Lombok Homestay,homestay,250000,4.6,wifi;breakfast\n"
+            "lombok,htl_l3,Gili Eco Guesthouse,guesthouse,300000,4.4,wifi\n",
+            encoding="utf-8"
+        )
+        (tmp_path / "activities.json").write_text(json.dumps({
+            "lombok": [
+                {"id": "act_l1", "name": "Rinjani Trek", "duration": "full day", "price": 900000, "type": "adventure"},
+                {"id": "act_l2", "name": "Gili Snorkeling", "duration": "4 hours", "price": 300000, "type": "beach"},
+            ]
+        }), encoding="utf-8")
+        yield tmp_path
+        # Kembali ke seed bawaan
+        load_catalog("")
+    
+    def test_price_index_matches_linear_scan(self):
+        import random
+        from app.tools.catalog import DestinationIndex
+        
+        rng = random.Random(5)
+        rows = [{"id": i, "type": rng.choice(["hotel", "homestay"]), "price_per_night": rng.randrange(0, 2_000_000, 50_000)}
+                for i in range(500)]
+        index = DestinationIndex(rows, "price_per_night")
+        
+        for max_price in (0, 275_000, 1_000_000, 5_000_000):
+            assert index.query(max_price=max_price) == [r for r in rows if r["price_per_night"] <= max_price]
+            assert index.query(["homestay"], max_price) == [
+                r for r in rows if r["type"] == "homestay" and r["price_per_night"] <= max_price
+            ]
+        assert index.cheapest(3) == sorted(rows, key=lambda r: r["price_per_night"])[:3]
+    
+    def test_search_uses_loaded_files(self, catalog_dir):
+        from app.tools.catalog import load_catalog
+        from app.tools.search import search_activities, search_flights, search_hotels
+        
+        load_catalog(str(catalog_dir))
+        
+        hotels = search_hotels("Lombok", "2025-12-20", "2025-12-24", preferences="homestay", max_price=280000)
+        assert [h["id"] for h in hotels] == ["htl_l2"]
+        assert hotels[0]["amenities"] == ("wifi", "breakfast")
+        assert hotels[0]["rating"] == 4.6
+        assert [a["id"] for a in search_activities("lombok", travel_type="beach")] == ["act_l2", "act_l1"]
+        # Kota di luar file memakai destinasi default dari seed
+        assert search_hotels("UnknownCity", "2025-12-20", "2025-12-24")[0]["id"] == "htl_999"
+        # Jenis tanpa file (flights) tetap memakai seed
+        assert search_flights("Yogyakarta", "2025-12-20")[0]["id"] == "flt_001"
+    
+    def test_searches_do_not_mutate_catalog(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from app.tools.catalog import get_catalog
+        from app.tools.search import search_flights, search_hotels
+        
+        def search(day):
+            checkin = f"2025-12-{day:02d}"
+            hotels = search_hotels("Yogyakarta", checkin, "2025-12-28")
+            return checkin, {h["checkin"] for h in hotels}
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(search, range(1, 25)))
+        
+        # Setiap request hanya melihat field per-query miliknya sendiri
+        assert all(seen == {checkin} for checkin, seen in results)
+        assert search_flights("Bali", "2025-12-20", origin="Surabaya")[0]["origin"] == "Surabaya"
+        record = get_catalog().hotels("Yogyakarta").rows[0]
+        assert "checkin" not in record and "available" not in record
+        assert "origin" not in get_catalog().flights("Bali").rows[0]
+        with pytest.raises(TypeError):
+            record["price_per_night"] = 1
+
+
+class TestDestinationResolver:
+    """Tests for alias and fuzzy destination resolution."""
+    
+    def test_aliases_and_typos(self):
+        from app.tools.catalog import resolve_destination
+        
+        for name in ("Jogja", "YOGYA", "DIY", "Yogyakrta", "Daerah Istimewa Yogyakarta"):
+            assert resolve_destination(name) == "yogyakarta"
+        for name in ("Denpasar", "Ubud", "Kuta", "Ubud, Bali", "Seminyk"):
+            assert resolve_destination(name) == "bali"
+        # Nama yang tidak mirip destinasi mana pun tidak ditebak
+        assert resolve_destination("Bandung") is None
+        assert resolve_destination("UnknownCity") is None
+    
+    def test_custom_aliases(self):
+        from app.tools.destinations import DestinationResolver
+        
+        resolver = DestinationResolver(["lombok"], {"lombok": ["mataram", "gili trawangan"]})
+        
+        assert resolver.resolve("Mataram") == "lombok"
+        assert resolver.resolve("Gili Trawangn") == "lombok"
+        assert resolver.display_name("gili trawangan") == "Lombok"
+        assert resolver.display_name("Surabaya") == "Surabaya"
+    
+    def test_last_comma_part_wins(self):
+        from app.tools.destinations import DESTINATION_ALIASES, DestinationResolver
+        
+        resolver = DestinationResolver(["lombok"], DESTINATION_ALIASES)
+        
+        # Kuta di Lombok, bukan alias kuta -> bali
+        assert resolver.resolve("Kuta, Lombok") == "lombok"
+        assert resolver.resolve("Kuta, Bali") == "bali"
+        # Wilayah yang tidak dikenal dilewati, bagian sebelumnya dipakai
+        assert resolver.resolve("Ubud, Indonesia") == "bali"
+    
+    def test_tools_use_resolved_destination(self):
+        from app.tools.search import get_destination_info, search_activities, search_hotels
+        
+        hotels = search_hotels("Jogja", "2025-12-20", "2025-12-24")
+        
+        assert hotels[0]["id"] == "htl_001"
+        assert search_activities("Denpasar")[0]["id"] == "act_101"
+        assert get_destination_info("Yogya")["name"] == "Yogyakarta"
+
+
+class TestHotelPreferences:
+    """Tests for the preference parser and bitmap hotel filters."""
+    
+    def test_parse_preferences(self):
+        from app.tools.preferences import parse_preferences
+        
+        wanted = parse_preferences("Homestay with breakfast and swimming pool under 400k")
+        assert wanted.types == ("homestay", "guesthouse")
+        assert wanted.amenities == ("breakfast", "pool")
+        assert wanted.max_price == 400_000
+        assert wanted.budget is False
+        
+        assert parse_preferences("villa dengan kolam renang di bawah 1,5 juta").max_price == 1_500_000
+        assert parse_preferences("max Rp 350.000, sarapan").amenities == ("breakfast",)
+        assert parse_preferences("max Rp 350.000, sarapan").max_price == 350_000
+        assert parse_preferences("budget trip").budget is True
+        assert parse_preferences(None) == parse_preferences("")
+    
+    def test_bare_small_numbers_are_not_prices(self):
+        from app.tools.preferences import parse_preferences
+        
+        assert parse_preferences("max 2 people per room").max_price is None
+        assert parse_preferences("less than 5 minutes from the beach").max_price is None
+        assert parse_preferences("at most 3 stars").max_price is None
+        # Dengan mata uang atau satuan tetap dianggap harga
+        assert parse_preferences("under Rp 500").max_price == 500
+        assert parse_preferences("under 500 ribu").max_price == 500_000
+    
+    def test_bitmap_filters_match_linear_scan(self):
+        import random
+        from app.tools.catalog import DestinationIndex
+        from app.tools.records import Record, RecordSchema
+        
+        rng = random.Random(9)
+        rows = [{
+            "id": i,
+            "type": rng.choice(["hotel", "homestay", "resort"]),
+            "price_per_night": rng.randrange(100_000, 2_000_000, 50_000),
+            "amenities": rng.sample(["wifi", "pool", "breakfast", "spa"], rng.randint(0, 4))
+        } for i in range(300)]
+        schema = RecordSchema.from_rows(rows)
+        index = DestinationIndex([Record.from_dict(schema, r) for r in rows], "price_per_night")
+        
+        for types, amenities, max_price in ((["homestay"], ["breakfast"], 800_000), (None, ["pool", "spa"], None),
+                                            (["hotel", "resort"], [], 300_000)):
+            mask = index.type_mask(types) & index.amenity_mask(amenities) & index.price_mask(max_price)
+            expected = [
+                r["id"] for r in rows
+                if (types is None or r["type"] in types)
+                and set(amenities) <= set(r["amenities"])
+                and (max_price is None or r["price_per_night"] <= max_price)
+            ]
+            assert [r["id"] for r in index.select(mask)] == expected
+            cheapest = sorted((r for r in rows if r["id"] in set(expected)), key=lambda r: (r["price_per_night"], r["id"]))
+            assert [r["id"] for r in index.cheapest(3, mask)] == [r["id"] for r in cheapest[:3]]
+    
+    def test_search_hotels_with_natural_language_preferences(self):
+        from app.tools.search import search_hotels
+        
+        # Homestay dengan sarapan (amenity "local breakfast") di bawah 400rb
+        results = search_hotels("Yogyakarta", "2025-12-20", "2025-12-24", preferences="homestay with breakfast under 400k")
+        assert [h["id"] for h in results] == ["htl_003"]
+        
+        # Amenity yang tidak ada dilonggarkan, filter tipe tetap dipakai
+        results = search_hotels("Yogyakarta", "2025-12-20", "2025-12-24", preferences="homestay with spa")
+        assert {h["type"] for h in results} == {"homestay"}
+    
+    def test_preference_price_relaxed_before_caller_max_price(self):
+        from app.tools.search import search_hotels
+        
+        # Harga dari teks tidak punya hasil: dilonggarkan, max_price pemanggil tetap berlaku
+        results = search_hotels("Yogyakarta", "2025-12-20", "2025-12-24", preferences="under Rp 1000", max_price=600000)
+        
+        assert [h["id"] for h in results] == ["htl_003", "htl_004", "htl_005"]
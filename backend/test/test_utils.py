@@ -0,0 +1,80 @@
+# tests/test_utils.py
+"""
+Unit tests for utility modules (cache, metrics).
+"""
+import pytest
+
+
+class TestTTLCache:
+    """Tests for the TTL + LRU cache."""
+
+    def test_get_set(self):
+        from app.utils.cache import TTLCache
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        from app.utils.cache import TTLCache
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" sekarang paling lama tidak dipakai
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_expired_entry(self, monkeypatch):
+        import app.utils.cache as cache_module
+        cache = cache_module.TTLCache(maxsize=2, ttl=10)
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+
+        cache.set("a", 1)
+        now[0] += 11
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestMetrics:
+    """Tests for the in-process metrics registry."""
+
+    def test_counter_render(self):
+        from app.utils.metrics import MetricsRegistry
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "Test counter")
+        counter.inc(tool="search_hotels")
+        counter.inc(2, tool="search_hotels")
+
+        assert counter.value(tool="search_hotels") == 3
+        assert 'test_total{tool="search_hotels"} 3' in registry.render()
+
+    def test_gauge_callback(self):
+        from app.utils.metrics import MetricsRegistry
+        registry = MetricsRegistry()
+        registry.gauge("queue_depth", "Depth", callback=lambda: 7)
+
+        assert "queue_depth 7" in registry.render()
+
+    def test_histogram_render(self):
+        from app.utils.metrics import MetricsRegistry
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(3)
+
+        rendered = registry.render()
+        assert histogram.count() == 3
+        assert "# TYPE latency_seconds histogram" in rendered
+        assert 'latency_seconds_bucket{le="0.1"} 1' in rendered
+        assert 'latency_seconds_bucket{le="1"} 2' in rendered
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in rendered
+        assert "latency_seconds_count 3" in rendered